@@ -1,526 +1,1120 @@
 # app.py
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, url_for
 from flask_cors import CORS
-from db_config import get_db_connection
+from db_config import db_connection, DatabaseUnavailable, pool
+from list_query import ListQuery, ListQueryError
+from listings import (
+    DONOR_LIST, RECIPIENT_LIST, REQUEST_LIST, DONATION_LIST, ORGAN_LIST,
+    AVAILABLE_DONATIONS_SQL, AVAILABLE_ORGANS_SQL,
+)
+from export import stream_export, MIMETYPES
+from cache import create_cache, WEB_WORKERS
+from conditional import TableVersions, conditional, init_app as init_conditional
+from matching import load_candidates, plan_allocations
+from organ_allocation import allocate, allocate_batch, AllocationConflict
+import expiry
+import inventory
+from search import SearchSpec, SearchError, SEARCH_MAX_LIMIT, SEARCH_MAX_OFFSET, parse_query, search, suggest
+import metrics
+from datetime import date
+from transactions import in_transaction
+from idempotency import IdempotencyStore, IDEMPOTENCY_MAX_KEYS
+from changefeed import ChangeFeed, TooManySubscribers, TOPICS
+import audit
+from bundles import load_bundle
+from json_provider import FastJSONProvider
+from compression import init_app as init_compression
+from bulk_import import (
+    ImportSpec, BulkImportError, RowsRejected, BULK_BATCH_SIZE, read_rows, validate, insert_rows,
+    text, optional_text, positive_int, iso_date, blood_group,
+)
+import os
 import mysql.connector
 from mysql.connector import Error
 
 # Initialize the Flask app
 app = Flask(__name__)
+app.json = FastJSONProvider(app)   # orjson when installed; ISO dates, Decimals as strings
 CORS(app)
 
+# Latency / query instrumentation and GET /metrics. Registered first so its
+# timer starts before any other before_request hook can answer early.
+metrics.init_app(app, pool)
+
+# Pool exhausted or MySQL unreachable
+@app.errorhandler(DatabaseUnavailable)
+def handle_db_unavailable(e):
+    return jsonify({"error": "DB connection failed"}), 500
+
+# --- Cache (in-process LRU, or Redis when CACHE_URL is set) ---
+cache = create_cache()
+STATS_CACHE_TTL = float(os.environ.get("STATS_CACHE_TTL", 5))
+REFERENCE_CACHE_TTL = float(os.environ.get("REFERENCE_CACHE_TTL", 300))   # admins, hospitals
+ENTITY_CACHE_TTL = float(os.environ.get("ENTITY_CACHE_TTL", 60))         # single donor/recipient
+
+# Latest reports of the scheduled jobs (expiry sweep, inventory reconcile)
+job_reports = create_cache(max_entries=16)
+
+# Idempotency-Key replay store for the write endpoints (@idempotent)
+idempotent = IdempotencyStore(create_cache(max_entries=IDEMPOTENCY_MAX_KEYS))
+
+# gzip / brotli for large buffered responses
+init_compression(app)
+
+# ETag / If-None-Match support for the GETs marked @conditional(...)
+table_versions = TableVersions()
+init_conditional(app, table_versions)
+
+# Live change events for /api/events (write handlers publish after commit)
+changes = ChangeFeed()
+
+# Inventory / request state transitions, written to inventory_event in the
+# background (handlers record after commit; see audit.py)
+audit_log = audit.AuditLog()
+
+# --- Write bookkeeping ---
+# Write handlers call this after a successful commit with the tables they
+# changed; bumping their versions retires every cached() entry and ETag
+# derived from them.
+def tables_changed(*tables):
+    table_versions.bump(*tables)
+
+# Read-through cache for data that write handlers change. The key carries the
+# current versions of `tables`, taken before loading, so a write (which bumps
+# them after commit) makes every worker miss, and a load that raced with the
+# write can only have filled a key nobody reads any more. Per-process versions
+# or an in-process cache are only used when there is a single worker;
+# otherwise this loads directly.
+def cached(key, tables, loader, ttl):
+    if WEB_WORKERS > 1 and not (cache.shared and table_versions.shared):
+        return loader()
+    versions, _ = table_versions.snapshot(tables)
+    if versions is None:
+        return loader()
+    return cache.get_or_load(f"{key}@{table_versions.boot_id}.{'.'.join(map(str, versions))}", loader, ttl)
+
+# Query-string integers. werkzeug's type=int quietly falls back to the default
+# on a bad value; here it is a ValueError the handler turns into a 400.
+def int_arg(name, default=None):
+    value = request.args.get(name, '')
+    if value == '':
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be an integer")
+
+# --- List helper: ?fields= projection, filters and keyset pagination ---
+# Without ?limit/?cursor the full (filtered) list is returned as before.
+# With them the response is {"data": [...], "next_cursor": id, "next": url}.
+# ?format=columnar returns {"columns": [...], "rows": [[...], ...]} instead
+# (plus next_cursor / next when paginated): tuples straight from the cursor,
+# without a dict per row or the keys repeated in every row.
+def list_response(spec):
+    fmt = request.args.get('format', 'json')
+    if fmt not in ('json', 'columnar'):
+        return jsonify({"error": "'format' must be json or columnar"}), 400
+    try:
+        query = ListQuery(spec, request.args)
+    except ListQueryError as e:
+        return jsonify({"error": str(e)}), 400
+
+    columnar = fmt == 'columnar'
+    with db_connection() as conn, conn.cursor(dictionary=not columnar) as cursor:
+        cursor.execute(query.sql, query.params)
+        rows = cursor.fetchall()
+        columns = list(cursor.column_names)
+
+    if not query.paginated:
+        if columnar:
+            return jsonify({"columns": columns, "rows": rows})
+        return jsonify(rows)
+
+    rows, next_cursor = query.page(rows, columns if columnar else None)
+    next_url = None
+    if next_cursor is not None:
+        args = request.args.to_dict()
+        args['cursor'] = next_cursor
+        next_url = url_for(request.endpoint, **args)
+    if columnar:
+        return jsonify({"columns": columns, "rows": rows, "next_cursor": next_cursor, "next": next_url})
+    return jsonify({"data": rows, "next_cursor": next_cursor, "next": next_url})
+
 # --- NEW: Dashboard Stats Endpoint ---
+# One round trip: every counter and breakdown comes back as (metric, key, value)
+# rows of a single UNION ALL, and the result is cached for STATS_CACHE_TTL
+# seconds (a write to the underlying tables retires it at once, see cached()).
+STATS_SQL = """
+    SELECT 'pending_requests' AS metric, request_type AS k, COUNT(*) AS n
+        FROM requests WHERE status = 'Pending' GROUP BY request_type
+    UNION ALL
+    SELECT 'available_organs', organ_type, COUNT(*)
+        FROM organ WHERE status = 'Available' GROUP BY organ_type
+    UNION ALL
+    SELECT 'donors', blood_group, COUNT(*) FROM donor GROUP BY blood_group
+    UNION ALL
+    SELECT 'recipients', blood_group, COUNT(*) FROM recipient GROUP BY blood_group
+    UNION ALL
+    SELECT 'available_blood_ml', dn.blood_group, SUM(d.quantity_ml)
+        FROM donation d
+        JOIN donor dn ON d.donor_id = dn.donor_id
+        WHERE d.donation_type = 'Blood' AND d.expiry_date > CURDATE()
+          AND NOT EXISTS (SELECT 1 FROM donation_request dr WHERE dr.donation_id = d.donation_id)
+        GROUP BY dn.blood_group
+"""
+STATS_TABLES = ("requests", "organ", "donor", "recipient", "donation")
+
 @app.route('/api/stats', methods=['GET'])
+@conditional("requests", "organ", "donor", "recipient", "donation", daily=True)
 def get_stats():
-    conn = get_db_connection()
-    if conn is None:
-        return jsonify({"error": "Database connection failed"}), 500
-    cursor = conn.cursor(dictionary=True)
-    
     try:
-        # 1. Pending Requests
-        cursor.execute("SELECT COUNT(*) as count FROM requests WHERE status = 'Pending'")
-        pending_requests = cursor.fetchone()['count']
-        
-        # 2. Available Organs
-        cursor.execute("SELECT COUNT(*) as count FROM organ WHERE status = 'Available'")
-        available_organs = cursor.fetchone()['count']
-        
-        # 3. Total Donors
-        cursor.execute("SELECT COUNT(*) as count FROM donor")
-        total_donors = cursor.fetchone()['count']
-        
-        # 4. Total Recipients
-        cursor.execute("SELECT COUNT(*) as count FROM recipient")
-        total_recipients = cursor.fetchone()['count']
-        
-        cursor.close()
-        conn.close()
-        return jsonify({
-            "pending_requests": pending_requests,
-            "available_organs": available_organs,
-            "total_donors": total_donors,
-            "total_recipients": total_recipients
-        })
-    except Exception as e:
-        cursor.close()
-        conn.close()
+        stats = cached('stats', STATS_TABLES, load_stats, STATS_CACHE_TTL)
+    except Error as e:
         return jsonify({"error": str(e)}), 500
+    return jsonify(stats)
+
+def load_stats():
+    with db_connection() as conn, conn.cursor() as cursor:
+        cursor.execute(STATS_SQL)
+        rows = cursor.fetchall()
+
+    breakdown = {
+        "pending_requests": {},
+        "available_organs": {},
+        "donors": {},
+        "recipients": {},
+        "available_blood_ml": {},
+    }
+    for metric, key, value in rows:
+        breakdown[metric][key if key is not None else "Unknown"] = int(value or 0)
+
+    return {
+        "pending_requests": sum(breakdown["pending_requests"].values()),
+        "available_organs": sum(breakdown["available_organs"].values()),
+        "total_donors": sum(breakdown["donors"].values()),
+        "total_recipients": sum(breakdown["recipients"].values()),
+        "pending_requests_by_type": breakdown["pending_requests"],
+        "available_organs_by_type": breakdown["available_organs"],
+        "donors_by_blood_group": breakdown["donors"],
+        "recipients_by_blood_group": breakdown["recipients"],
+        "available_blood_ml_by_group": breakdown["available_blood_ml"],
+    }
 
 # --- FUNCTION Endpoints (Calling Stored Functions) ---
 
 # 1. Check if a specific blood donation is expired
 # Calls SQL Function: fn_IsBloodUnitExpired
 @app.route('/api/donations/<int:id>/check_expiry', methods=['GET'])
+@conditional("donation", daily=True)
 def check_donation_expiry(id):
-    conn = get_db_connection()
-    if conn is None: return jsonify({"error": "DB connection failed"}), 500
-    cursor = conn.cursor(dictionary=True)
-    try:
-        # We select the result of the function directly
-        cursor.execute("SELECT fn_IsBloodUnitExpired(%s) as status", (id,))
-        result = cursor.fetchone()
-        
-        cursor.close()
-        conn.close()
-        
-        # If the donation ID doesn't exist, the function might return None or we handle empty result
-        if result:
-            return jsonify(result) # Returns {"status": "Valid"} or {"status": "Expired"}
-        return jsonify({"error": "Donation not found"}), 404
-        
-    except Exception as e:
-        return jsonify({"error": str(e)}), 400
+    with db_connection() as conn, conn.cursor(dictionary=True) as cursor:
+        try:
+            # We select the result of the function directly
+            cursor.execute("SELECT fn_IsBloodUnitExpired(%s) as status", (id,))
+            result = cursor.fetchone()
+        except Exception as e:
+            return jsonify({"error": str(e)}), 400
+
+    # If the donation ID doesn't exist, the function might return None or we handle empty result
+    if result:
+        return jsonify(result) # Returns {"status": "Valid"} or {"status": "Expired"}
+    return jsonify({"error": "Donation not found"}), 404
 
 # 2. Get the count of pending requests for a specific recipient
 # Calls SQL Function: fn_GetPendingRequestCount
 @app.route('/api/recipients/<int:id>/pending_count', methods=['GET'])
+@conditional("requests", "recipient")
 def get_recipient_pending_count(id):
-    conn = get_db_connection()
-    if conn is None: return jsonify({"error": "DB connection failed"}), 500
-    cursor = conn.cursor(dictionary=True)
+    with db_connection() as conn, conn.cursor(dictionary=True) as cursor:
+        try:
+            cursor.execute("SELECT fn_GetPendingRequestCount(%s) as pending_count", (id,))
+            result = cursor.fetchone()
+        except Exception as e:
+            return jsonify({"error": str(e)}), 400
+
+    if result:
+        return jsonify(result) # Returns {"pending_count": 2}
+    return jsonify({"error": "Recipient not found"}), 404
+
+# --- NEW: Batch versions of the two function endpoints ---
+# One set-based query for any number of IDs instead of one call (and one
+# connection) per ID. IDs come from ?ids=1,2,3 or a JSON body {"ids": [...]}.
+def _batch_ids():
+    if request.method == 'POST':
+        return expiry.parse_ids((request.get_json(silent=True) or {}).get('ids'))
+    return expiry.parse_ids(request.args.get('ids', ''))
+
+# Either ids, or a window of expiry dates (?expiry_from=&expiry_to=)
+@app.route('/api/donations/check_expiry', methods=['GET', 'POST'])
+@conditional("donation", daily=True)
+def check_donations_expiry():
+    window = request.method == 'GET' and 'ids' not in request.args
     try:
-        cursor.execute("SELECT fn_GetPendingRequestCount(%s) as pending_count", (id,))
-        result = cursor.fetchone()
-        
-        cursor.close()
-        conn.close()
-        
-        if result:
-            return jsonify(result) # Returns {"pending_count": 2}
-        return jsonify({"error": "Recipient not found"}), 404
-
-    except Exception as e:
+        if window:
+            expiry_from = request.args.get('expiry_from')
+            expiry_to = request.args.get('expiry_to')
+            if not expiry_from and not expiry_to:
+                return jsonify({"error": "Pass ids, or expiry_from/expiry_to"}), 400
+            expiry_from = date.fromisoformat(expiry_from) if expiry_from else None
+            expiry_to = date.fromisoformat(expiry_to) if expiry_to else None
+        else:
+            ids = _batch_ids()
+    except ValueError as e:
         return jsonify({"error": str(e)}), 400
 
+    with db_connection() as conn, conn.cursor(dictionary=True) as cursor:
+        if window:
+            results = expiry.expiry_status_by_window(cursor, expiry_from, expiry_to)
+        else:
+            results = expiry.expiry_status_by_ids(cursor, ids)
+
+    response = {"results": results}
+    if not window:
+        found = {row['donation_id'] for row in results}
+        response["not_found"] = [i for i in ids if i not in found]
+    return jsonify(response)
+
+@app.route('/api/recipients/pending_counts', methods=['GET', 'POST'])
+@conditional("requests", "recipient")
+def get_recipients_pending_counts():
+    try:
+        ids = _batch_ids()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    with db_connection() as conn, conn.cursor(dictionary=True) as cursor:
+        results = expiry.pending_counts(cursor, ids)
+    found = {row['recipient_id'] for row in results}
+    return jsonify({"results": results, "not_found": [i for i in ids if i not in found]})
+
+# --- NEW: Expiry sweep ---
+# Unused blood units expiring within ?horizon_days= (default EXPIRY_HORIZON_DAYS),
+# plus those already expired. /expiry_report returns the last scheduled sweep.
+@app.route('/api/donations/expiring', methods=['GET'])
+@conditional("donation", "donor", "requests", daily=True)
+def get_expiring_donations():
+    try:
+        horizon_days = int_arg('horizon_days', expiry.EXPIRY_HORIZON_DAYS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if horizon_days < 0:
+        return jsonify({"error": "'horizon_days' must be a non-negative integer"}), 400
+    with db_connection() as conn, conn.cursor(dictionary=True) as cursor:
+        report = expiry.sweep(cursor, horizon_days)
+    return jsonify(report)
+
+@app.route('/api/donations/expiry_report', methods=['GET'])
+def get_expiry_report():
+    report = job_reports.get(expiry.REPORT_KEY)
+    if report is None:
+        return jsonify({"error": "No scheduled sweep has run yet"}), 404
+    return jsonify(report)
+
+# Runs in one worker at a time (MySQL advisory lock, see jobs.py)
+if os.environ.get("EXPIRY_SWEEP_INTERVAL"):
+    expiry.start_sweeper(float(os.environ["EXPIRY_SWEEP_INTERVAL"]), job_reports)
+
+# --- NEW: Inventory summary ---
+# Usable blood by group and expiry day, and organ counts by type and status,
+# read from the trigger-maintained summary tables (migration 0003).
+# Optional ?blood_group=, ?expiry_from= / ?expiry_to= (inclusive dates).
+@app.route('/api/inventory/summary', methods=['GET'])
+@conditional("donation", "donor", "organ", daily=True)
+def get_inventory_summary():
+    try:
+        expiry_from = request.args.get('expiry_from')
+        expiry_to = request.args.get('expiry_to')
+        expiry_from = date.fromisoformat(expiry_from) if expiry_from else None
+        expiry_to = date.fromisoformat(expiry_to) if expiry_to else None
+        group = blood_group(request.args['blood_group']) if request.args.get('blood_group') else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    with db_connection() as conn, conn.cursor(dictionary=True) as cursor:
+        result = inventory.summary(cursor, expiry_from, expiry_to, group)
+    return jsonify(result)
+
+@app.route('/api/inventory/reconcile_report', methods=['GET'])
+def get_inventory_reconcile_report():
+    report = job_reports.get(inventory.REPORT_KEY)
+    if report is None:
+        return jsonify({"error": "No scheduled reconciliation has run yet"}), 404
+    return jsonify(report)
+
+# Runs in one worker at a time (MySQL advisory lock, see jobs.py)
+if os.environ.get("INVENTORY_RECONCILE_INTERVAL"):
+    inventory.start_reconciler(float(os.environ["INVENTORY_RECONCILE_INTERVAL"]), job_reports)
+
+# --- NEW: Live updates (Server-Sent Events) ---
+# GET /api/events?topics=donor,organ streams {"entity", "op", "ids", ...}
+# change events; without ?topics= every entity is sent. Use EventSource on the
+# client: it reconnects on its own and resumes from Last-Event-ID. A "reset"
+# event means events were missed and the client should refetch.
+@app.route('/api/events', methods=['GET'])
+def stream_events():
+    topics = [t.strip() for t in request.args.get('topics', '').split(',') if t.strip()] or list(TOPICS)
+    unknown = sorted(set(topics) - set(TOPICS))
+    if unknown:
+        return jsonify({"error": f"Unknown topics: {', '.join(unknown)}; use {', '.join(TOPICS)}"}), 400
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        frames = changes.stream(topics, changes.parse_last_event_id(last_event_id))
+    except TooManySubscribers as e:
+        response = jsonify({"error": str(e)})
+        response.status_code = 503
+        response.headers['Retry-After'] = '5'
+        return response
+    response = app.response_class(frames, mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'   # don't let nginx buffer the stream
+    return response
+
+# --- NEW: Audit log of inventory transitions ---
+# GET /api/audit/events?from=&to=&entity=&entity_id=&action=&limit=&cursor=
+# from / to are ISO dates or datetimes (UTC, end exclusive; default: the last
+# 24 hours) and the window may not exceed AUDIT_MAX_QUERY_DAYS, so only that
+# many monthly partitions are read. Events show up within about
+# AUDIT_FLUSH_INTERVAL seconds of the change.
+@app.route('/api/audit/events', methods=['GET'])
+def get_audit_events():
+    try:
+        start, end = audit.parse_window(request.args.get('from'), request.args.get('to'))
+    except audit.AuditQueryError as e:
+        return jsonify({"error": str(e)}), 400
+    entity = request.args.get('entity')
+    if entity is not None and entity not in audit.ENTITIES:
+        return jsonify({"error": f"'entity' must be one of {', '.join(audit.ENTITIES)}"}), 400
+    try:
+        entity_id = int_arg('entity_id')
+        after = int_arg('cursor')
+        limit = int_arg('limit', 100)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not 1 <= limit <= audit.AUDIT_MAX_LIMIT:
+        return jsonify({"error": f"'limit' must be between 1 and {audit.AUDIT_MAX_LIMIT}"}), 400
+
+    with db_connection() as conn, conn.cursor(dictionary=True) as cursor:
+        events, next_cursor = audit.query(cursor, start, end, entity, entity_id,
+                                          request.args.get('action'), after, limit)
+    next_url = None
+    if next_cursor is not None:
+        args = request.args.to_dict()
+        args.update({'cursor': next_cursor, 'from': start.isoformat(), 'to': end.isoformat()})
+        next_url = url_for(request.endpoint, **args)
+    return jsonify({"data": events, "next_cursor": next_cursor, "next": next_url})
+
 # --- READ Endpoints (GET requests) ---
 
+# Loaders for the read-through cache
+def fetch_all(sql, args=()):
+    with db_connection() as conn, conn.cursor(dictionary=True) as cursor:
+        cursor.execute(sql, args)
+        return cursor.fetchall()
+
+def fetch_one(sql, args=()):
+    with db_connection() as conn, conn.cursor(dictionary=True) as cursor:
+        cursor.execute(sql, args)
+        return cursor.fetchone()
+
 @app.route('/api/admins', methods=['GET'])
+@conditional("admin")
 def get_admins():
-    conn = get_db_connection()
-    if conn is None: return jsonify({"error": "DB connection failed"}), 500
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM admin")
-    admins = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    return jsonify(admins)
+    return jsonify(cache.get_or_load('admins', lambda: fetch_all("SELECT * FROM admin"), REFERENCE_CACHE_TTL))
 
 @app.route('/api/hospitals', methods=['GET'])
+@conditional("hospital")
 def get_hospitals():
-    conn = get_db_connection()
-    if conn is None: return jsonify({"error": "DB connection failed"}), 500
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM hospital")
-    hospitals = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    return jsonify(hospitals)
+    return jsonify(cache.get_or_load('hospitals', lambda: fetch_all("SELECT * FROM hospital"), REFERENCE_CACHE_TTL))
 
 @app.route('/api/donors', methods=['GET'])
+@conditional("donor")
 def get_donors():
-    conn = get_db_connection()
-    if conn is None: return jsonify({"error": "DB connection failed"}), 500
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM donor ORDER BY donor_id DESC")
-    donors = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    return jsonify(donors)
+    return list_response(DONOR_LIST)
 
 # --- NEW: Get single donor (for edit form) ---
 @app.route('/api/donors/<int:id>', methods=['GET'])
+@conditional("donor")
 def get_donor(id):
-    conn = get_db_connection()
-    if conn is None: return jsonify({"error": "DB connection failed"}), 500
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM donor WHERE donor_id = %s", (id,))
-    donor = cursor.fetchone()
-    cursor.close()
-    conn.close()
+    donor = cached(
+        f'donor:{id}', ("donor",), lambda: fetch_one("SELECT * FROM donor WHERE donor_id = %s", (id,)),
+        ENTITY_CACHE_TTL,
+    )
     if donor:
         return jsonify(donor)
     return jsonify({"error": "Donor not found"}), 404
 
 @app.route('/api/recipients', methods=['GET'])
+@conditional("recipient")
 def get_recipients():
-    conn = get_db_connection()
-    if conn is None: return jsonify({"error": "DB connection failed"}), 500
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM recipient ORDER BY recipient_id DESC")
-    recipients = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    return jsonify(recipients)
+    return list_response(RECIPIENT_LIST)
 
 # --- NEW: Get single recipient (for edit form) ---
 @app.route('/api/recipients/<int:id>', methods=['GET'])
+@conditional("recipient")
 def get_recipient(id):
-    conn = get_db_connection()
-    if conn is None: return jsonify({"error": "DB connection failed"}), 500
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM recipient WHERE recipient_id = %s", (id,))
-    recipient = cursor.fetchone()
-    cursor.close()
-    conn.close()
+    recipient = cached(
+        f'recipient:{id}', ("recipient",),
+        lambda: fetch_one("SELECT * FROM recipient WHERE recipient_id = %s", (id,)), ENTITY_CACHE_TTL,
+    )
     if recipient:
         return jsonify(recipient)
     return jsonify({"error": "Recipient not found"}), 404
 
+# --- NEW: Search and typeahead ---
+# GET /api/<donors|recipients>/search?q=&limit=&offset=  ranked FULLTEXT search
+# GET /api/<donors|recipients>/suggest?q=&limit=          name/contact prefix
+# Results are cached per table version, so a write is visible on the next
+# keystroke while repeated prefixes from a debounced input are served from
+# the cache.
+DONOR_SEARCH = SearchSpec(
+    "donor", "donor_id",
+    fulltext=("name", "contact", "medical_history"),
+    columns=("donor_id", "name", "age", "gender", "blood_group", "contact"),
+    suggest_columns=("donor_id", "name", "blood_group"),
+)
+RECIPIENT_SEARCH = SearchSpec(
+    "recipient", "recipient_id",
+    fulltext=("name", "contact", "organ_required"),
+    columns=("recipient_id", "name", "age", "gender", "blood_group", "organ_required", "contact"),
+    suggest_columns=("recipient_id", "name", "blood_group"),
+)
+SEARCH_CACHE_TTL = float(os.environ.get("SEARCH_CACHE_TTL", 30))
+
+def search_response(spec, mode):
+    try:
+        q = parse_query(request.args.get('q'))
+        default_limit = 20 if mode == 'search' else 10
+        limit = int_arg('limit', default_limit)
+        offset = int_arg('offset', 0)
+        if not 1 <= limit <= SEARCH_MAX_LIMIT:
+            raise SearchError(f"'limit' must be between 1 and {SEARCH_MAX_LIMIT}")
+        if not 0 <= offset <= SEARCH_MAX_OFFSET:
+            raise SearchError(f"'offset' must be between 0 and {SEARCH_MAX_OFFSET}")
+    except ValueError as e:   # SearchError, or a non-integer limit / offset
+        return jsonify({"error": str(e)}), 400
+
+    def load():
+        with db_connection() as conn, conn.cursor(dictionary=True) as cursor:
+            if mode == 'search':
+                rows, has_more = search(cursor, spec, q, limit, offset)
+                return {"results": rows, "has_more": has_more}
+            return suggest(cursor, spec, q, limit, offset)
+
+    key = f'{mode}:{spec.table}:{limit}:{offset}:{q.lower()}'
+    return jsonify(cached(key, (spec.table,), load, SEARCH_CACHE_TTL))
+
+@app.route('/api/donors/search', methods=['GET'])
+@conditional("donor")
+def search_donors():
+    return search_response(DONOR_SEARCH, 'search')
+
+@app.route('/api/donors/suggest', methods=['GET'])
+@conditional("donor")
+def suggest_donors():
+    return search_response(DONOR_SEARCH, 'suggest')
+
+@app.route('/api/recipients/search', methods=['GET'])
+@conditional("recipient")
+def search_recipients():
+    return search_response(RECIPIENT_SEARCH, 'search')
+
+@app.route('/api/recipients/suggest', methods=['GET'])
+@conditional("recipient")
+def suggest_recipients():
+    return search_response(RECIPIENT_SEARCH, 'suggest')
+
 @app.route('/api/requests', methods=['GET'])
+@conditional("requests", "recipient", "hospital")
 def get_requests():
-    conn = get_db_connection()
-    if conn is None: return jsonify({"error": "DB connection failed"}), 500
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("""
-        SELECT 
-            r.request_id, r.request_date, r.request_type, r.status,
-            rec.name AS recipient_name,
-            h.name AS hospital_name
-        FROM requests r
-        JOIN recipient rec ON r.recipient_id = rec.recipient_id
-        JOIN hospital h ON r.hospital_id = h.hospital_id
-        ORDER BY r.request_id DESC
-    """)
-    requests_data = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    return jsonify(requests_data)
+    return list_response(REQUEST_LIST)
 
 # --- NEW: Inventory Endpoints (Donations) ---
 @app.route('/api/donations', methods=['GET'])
+@conditional("donation", "donor")
 def get_donations():
-    conn = get_db_connection()
-    if conn is None: return jsonify({"error": "DB connection failed"}), 500
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("""
-        SELECT d.donation_id, d.quantity_ml, d.donation_date, d.expiry_date, d.donation_type, dn.name as donor_name
-        FROM donation d
-        JOIN donor dn ON d.donor_id = dn.donor_id
-        ORDER BY d.donation_id DESC
-    """)
-    donations = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    return jsonify(donations)
+    return list_response(DONATION_LIST)
 
 # --- NEW: Inventory Endpoints (Organs) ---
 @app.route('/api/organs', methods=['GET'])
+@conditional("organ", "donor", "requests", "recipient")
 def get_organs():
-    conn = get_db_connection()
-    if conn is None: return jsonify({"error": "DB connection failed"}), 500
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("""
-        SELECT o.organ_id, o.organ_type, o.status, dn.name as donor_name, r.name as recipient_name
-        FROM organ o
-        JOIN donor dn ON o.donor_id = dn.donor_id
-        LEFT JOIN requests req ON o.request_id = req.request_id
-        LEFT JOIN recipient r ON req.recipient_id = r.recipient_id
-        ORDER BY o.organ_id DESC
-    """)
-    organs = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    return jsonify(organs)
+    return list_response(ORGAN_LIST)
+
+# --- NEW: Streaming export for bulk consumers ---
+# GET /api/<resource>/export?format=ndjson|json|csv, with the same fields and
+# filters as the list endpoint. Rows are streamed in batches, so memory use
+# stays flat no matter how large the table is.
+EXPORTS = {
+    "donors": DONOR_LIST,
+    "recipients": RECIPIENT_LIST,
+    "requests": REQUEST_LIST,
+    "donations": DONATION_LIST,
+    "organs": ORGAN_LIST,
+}
+
+@app.route('/api/<resource>/export', methods=['GET'])
+@conditional("donor", "recipient", "requests", "hospital", "donation", "organ")
+def export_list(resource):
+    spec = EXPORTS.get(resource)
+    if spec is None:
+        return jsonify({"error": "Unknown resource"}), 404
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in MIMETYPES:
+        return jsonify({"error": "format must be one of: " + ", ".join(MIMETYPES)}), 400
+    try:
+        query = ListQuery(spec, request.args)
+    except ListQueryError as e:
+        return jsonify({"error": str(e)}), 400
+    if query.paginated:
+        return jsonify({"error": "Exports are not paginated; drop limit/cursor"}), 400
+    try:
+        return stream_export(query, fmt, app.json.dumps, resource)
+    except Error as e:
+        return jsonify({"error": str(e)}), 400
 
 # --- Fulfillment Dropdown Endpoints (no change) ---
 @app.route('/api/donations/available', methods=['GET'])
+@conditional("donation", "donor", daily=True)
 def get_available_donations():
-    conn = get_db_connection()
-    if conn is None: return jsonify({"error": "DB connection failed"}), 500
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("""
-        SELECT d.donation_id, dn.name, dn.blood_group
-        FROM donation d
-        JOIN donor dn ON d.donor_id = dn.donor_id
-        WHERE d.donation_type = 'Blood' AND d.expiry_date > CURDATE()
-    """)
-    donations = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    return jsonify(donations)
+    return jsonify(fetch_all(AVAILABLE_DONATIONS_SQL))
 
 @app.route('/api/organs/available', methods=['GET'])
+@conditional("organ", "donor")
 def get_available_organs():
-    conn = get_db_connection()
-    if conn is None: return jsonify({"error": "DB connection failed"}), 500
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("""
-        SELECT o.organ_id, o.organ_type, dn.name AS donor_name, dn.blood_group
-        FROM organ o
-        JOIN donor dn ON o.donor_id = dn.donor_id
-        WHERE o.status = 'Available' AND o.request_id IS NULL
-    """)
-    organs = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    return jsonify(organs)
+    return jsonify(fetch_all(AVAILABLE_ORGANS_SQL))
+
+# --- NEW: Page bundles ---
+# GET /api/pages/<donors|recipients|donations|organs|requests> returns
+# everything one screen renders in a single response, e.g.
+# {"donations": [...], "donors": [...]}. The queries run concurrently on
+# separate pooled connections (bundles.py). Lists are the same rows as the
+# plain list endpoints; dropdown sources carry only the id and the label
+# columns the screen shows.
+def list_rows(spec):
+    query = ListQuery(spec, {})
+    return fetch_all(query.sql, query.params)
+
+def admin_options():
+    return cache.get_or_load(
+        'admins:options', lambda: fetch_all("SELECT admin_code, username FROM admin"), REFERENCE_CACHE_TTL
+    )
+
+def hospital_options():
+    return cache.get_or_load(
+        'hospitals:options', lambda: fetch_all("SELECT hospital_id, name FROM hospital"), REFERENCE_CACHE_TTL
+    )
+
+def donor_options():
+    return fetch_all("SELECT donor_id, name, blood_group FROM donor ORDER BY donor_id")
+
+def recipient_options():
+    return fetch_all("SELECT recipient_id, name, organ_required FROM recipient ORDER BY recipient_id")
+
+# page -> (tables it reads, {key: loader})
+PAGE_BUNDLES = {
+    "donors": (("donor", "admin"), {
+        "donors": lambda: list_rows(DONOR_LIST),
+        "admins": admin_options,
+    }),
+    "recipients": (("recipient", "admin"), {
+        "recipients": lambda: list_rows(RECIPIENT_LIST),
+        "admins": admin_options,
+    }),
+    "donations": (("donation", "donor"), {
+        "donations": lambda: list_rows(DONATION_LIST),
+        "donors": donor_options,
+    }),
+    "organs": (("organ", "donor", "requests", "recipient"), {
+        "organs": lambda: list_rows(ORGAN_LIST),
+        "donors": donor_options,
+    }),
+    "requests": (("requests", "recipient", "hospital", "donation", "donor", "organ"), {
+        "requests": lambda: list_rows(REQUEST_LIST),
+        "recipients": recipient_options,
+        "hospitals": hospital_options,
+        "available_donations": lambda: fetch_all(AVAILABLE_DONATIONS_SQL),
+        "available_organs": lambda: fetch_all(AVAILABLE_ORGANS_SQL),
+    }),
+}
+
+def _page_view(loaders):
+    return lambda: jsonify(load_bundle(loaders))
+
+for _page, (_tables, _loaders) in PAGE_BUNDLES.items():
+    app.add_url_rule(
+        f'/api/pages/{_page}', endpoint=f'page_{_page}', methods=['GET'],
+        view_func=conditional(*_tables, daily="donation" in _tables)(_page_view(_loaders)),
+    )
 
 # --- CREATE Endpoints (POST requests) ---
 
 @app.route('/api/donors', methods=['POST'])
+@idempotent
 def add_donor():
     data = request.json
-    try:
-        conn = get_db_connection()
-        if conn is None: return jsonify({"error": "DB connection failed"}), 500
-        cursor = conn.cursor()
-        sql = "INSERT INTO donor (admin_code, name, age, gender, blood_group, contact, medical_history) VALUES (%s, %s, %s, %s, %s, %s, %s)"
-        args = (data['admin_code'], data['name'], data['age'], data['gender'], data['blood_group'], data['contact'], data['medical_history'])
-        cursor.execute(sql, args)
-        conn.commit()
-        cursor.close()
-        conn.close()
-        return jsonify({"message": "Donor added successfully"}), 201
-    except Exception as e:
-        return jsonify({"error": str(e)}), 400
+    with db_connection() as conn, conn.cursor() as cursor:
+        try:
+            sql = "INSERT INTO donor (admin_code, name, age, gender, blood_group, contact, medical_history) VALUES (%s, %s, %s, %s, %s, %s, %s)"
+            args = (data['admin_code'], data['name'], data['age'], data['gender'], data['blood_group'], data['contact'], data['medical_history'])
+            in_transaction(conn, lambda: cursor.execute(sql, args))
+            new_id = cursor.lastrowid
+        except Exception as e:
+            conn.rollback()
+            return jsonify({"error": str(e)}), 400
+    tables_changed("donor")
+    changes.publish("donor", "create", [new_id])
+    audit_log.record("donor", new_id, "created", blood_group=data['blood_group'])
+    return jsonify({"message": "Donor added successfully"}), 201
 
 @app.route('/api/recipients', methods=['POST'])
+@idempotent
 def add_recipient():
     data = request.json
-    try:
-        conn = get_db_connection()
-        if conn is None: return jsonify({"error": "DB connection failed"}), 500
-        cursor = conn.cursor()
-        sql = "INSERT INTO recipient (admin_code, name, age, gender, blood_group, organ_required, contact) VALUES (%s, %s, %s, %s, %s, %s, %s)"
-        args = (data['admin_code'], data['name'], data['age'], data['gender'], data['blood_group'], data['organ_required'], data['contact'])
-        cursor.execute(sql, args)
-        conn.commit()
-        cursor.close()
-        conn.close()
-        return jsonify({"message": "Recipient added successfully"}), 201
-    except Exception as e:
-        return jsonify({"error": str(e)}), 400
+    with db_connection() as conn, conn.cursor() as cursor:
+        try:
+            sql = "INSERT INTO recipient (admin_code, name, age, gender, blood_group, organ_required, contact) VALUES (%s, %s, %s, %s, %s, %s, %s)"
+            args = (data['admin_code'], data['name'], data['age'], data['gender'], data['blood_group'], data['organ_required'], data['contact'])
+            in_transaction(conn, lambda: cursor.execute(sql, args))
+            new_id = cursor.lastrowid
+        except Exception as e:
+            conn.rollback()
+            return jsonify({"error": str(e)}), 400
+    tables_changed("recipient")
+    changes.publish("recipient", "create", [new_id])
+    audit_log.record("recipient", new_id, "created", blood_group=data['blood_group'],
+                     organ_required=data['organ_required'])
+    return jsonify({"message": "Recipient added successfully"}), 201
 
 @app.route('/api/requests', methods=['POST'])
+@idempotent
 def add_request():
     data = request.json
-    try:
-        conn = get_db_connection()
-        if conn is None: return jsonify({"error": "DB connection failed"}), 500
-        cursor = conn.cursor()
-        sql = "INSERT INTO requests (recipient_id, hospital_id, request_type, request_date, status) VALUES (%s, %s, %s, %s, 'Pending')"
-        args = (data['recipient_id'], data['hospital_id'], data['request_type'], data['request_date'])
-        cursor.execute(sql, args)
-        conn.commit()
-        cursor.close()
-        conn.close()
-        return jsonify({"message": "Request added successfully"}), 201
-    except Exception as e:
-        return jsonify({"error": str(e)}), 400
+    with db_connection() as conn, conn.cursor() as cursor:
+        try:
+            sql = "INSERT INTO requests (recipient_id, hospital_id, request_type, request_date, status) VALUES (%s, %s, %s, %s, 'Pending')"
+            args = (data['recipient_id'], data['hospital_id'], data['request_type'], data['request_date'])
+            in_transaction(conn, lambda: cursor.execute(sql, args))
+            new_id = cursor.lastrowid
+        except Exception as e:
+            conn.rollback()
+            return jsonify({"error": str(e)}), 400
+    tables_changed("requests")
+    changes.publish("requests", "create", [new_id])
+    audit_log.record("requests", new_id, "created", recipient_id=data['recipient_id'],
+                     hospital_id=data['hospital_id'], request_type=data['request_type'])
+    return jsonify({"message": "Request added successfully"}), 201
 
 # --- NEW: Inventory CREATE Endpoints ---
 @app.route('/api/donations', methods=['POST'])
+@idempotent
 def add_donation():
     data = request.json
-    try:
-        conn = get_db_connection()
-        if conn is None: return jsonify({"error": "DB connection failed"}), 500
-        cursor = conn.cursor()
-        # Use the trigger to set expiry_date
-        sql = "INSERT INTO donation (donor_id, quantity_ml, donation_date, donation_type) VALUES (%s, %s, %s, 'Blood')"
-        args = (data['donor_id'], data['quantity_ml'], data['donation_date'])
-        cursor.execute(sql, args)
-        conn.commit()
-        cursor.close()
-        conn.close()
-        return jsonify({"message": "Donation added successfully"}), 201
-    except Exception as e:
-        return jsonify({"error": str(e)}), 400
+    with db_connection() as conn, conn.cursor() as cursor:
+        try:
+            # Use the trigger to set expiry_date
+            sql = "INSERT INTO donation (donor_id, quantity_ml, donation_date, donation_type) VALUES (%s, %s, %s, 'Blood')"
+            args = (data['donor_id'], data['quantity_ml'], data['donation_date'])
+            in_transaction(conn, lambda: cursor.execute(sql, args))
+            new_id = cursor.lastrowid
+        except Exception as e:
+            conn.rollback()
+            return jsonify({"error": str(e)}), 400
+    tables_changed("donation")
+    changes.publish("donation", "create", [new_id])
+    audit_log.record("donation", new_id, "created", donor_id=data['donor_id'],
+                     quantity_ml=data['quantity_ml'], donation_date=data['donation_date'])
+    return jsonify({"message": "Donation added successfully"}), 201
 
 @app.route('/api/organs', methods=['POST'])
+@idempotent
 def add_organ():
     data = request.json
+    auto_allocate = data.get('auto_allocate', True)
+    if not isinstance(auto_allocate, bool):
+        return jsonify({"error": "'auto_allocate' must be true or false"}), 400
+    with db_connection() as conn, conn.cursor() as cursor:
+        try:
+            sql = "INSERT INTO organ (donor_id, organ_type, status) VALUES (%s, %s, 'Available')"
+            args = (data['donor_id'], data['organ_type'])
+            def work():
+                cursor.execute(sql, args)
+                organ_id = cursor.lastrowid
+                # Offer the new organ to the waitlist in the same transaction
+                # unless the caller opts out with "auto_allocate": false
+                allocations = []
+                if auto_allocate:
+                    allocations, _ = allocate_batch(cursor, [organ_id])
+                return organ_id, allocations
+            organ_id, allocations = in_transaction(conn, work)
+        except Exception as e:
+            conn.rollback()
+            return jsonify({"error": str(e)}), 400
+    changes.publish("organ", "create", [organ_id], status="Transplanted" if allocations else "Available")
+    audit_log.record("organ", organ_id, "created", donor_id=data['donor_id'],
+                     organ_type=data['organ_type'], status="Available")
+    if allocations:
+        tables_changed("organ", "requests")
+        changes.publish("requests", "update", [allocations[0]['request_id']], status="Fulfilled")
+        audit_log.fulfilled("organ", organ_id, allocations[0]['request_id'])
+        return jsonify({
+            "message": "Organ added and allocated successfully",
+            "organ_id": organ_id,
+            "request_id": allocations[0]['request_id'],
+        }), 201
+    tables_changed("organ")
+    return jsonify({"message": "Organ added successfully", "organ_id": organ_id}), 201
+
+# --- NEW: Bulk CREATE Endpoints ---
+# POST a JSON array (or {"rows": [...]}) or a CSV file (multipart field "file",
+# or a text/csv body). Every row is validated first; the import then runs as one
+# transaction in batches of ?batch_size= rows. By default any bad row aborts the
+# whole import; with ?skip_invalid=true the good rows are kept. Either way the
+# response lists the rejected rows and why. Every inserted row gets an audit
+# event carrying its new id and the audit_fields columns.
+def bulk_response(spec, table, audit_fields):
     try:
-        conn = get_db_connection()
-        if conn is None: return jsonify({"error": "DB connection failed"}), 500
-        cursor = conn.cursor()
-        sql = "INSERT INTO organ (donor_id, organ_type, status) VALUES (%s, %s, 'Available')"
-        args = (data['donor_id'], data['organ_type'])
-        cursor.execute(sql, args)
-        conn.commit()
-        cursor.close()
-        conn.close()
-        return jsonify({"message": "Organ added successfully"}), 201
-    except Exception as e:
+        rows = read_rows(request)
+    except BulkImportError as e:
         return jsonify({"error": str(e)}), 400
+    try:
+        batch_size = int_arg('batch_size', BULK_BATCH_SIZE)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if batch_size < 1:
+        return jsonify({"error": "'batch_size' must be a positive integer"}), 400
+    skip_invalid = request.args.get('skip_invalid', '').lower() in ('1', 'true', 'yes')
+
+    valid, errors = validate(spec, rows)
+    if errors and not skip_invalid:
+        return jsonify({"inserted": 0, "errors": errors}), 400
+
+    with db_connection() as conn, conn.cursor() as cursor:
+        try:
+            def work():
+                inserted, db_errors = insert_rows(cursor, spec, valid, batch_size)
+                if db_errors and not skip_invalid:
+                    raise RowsRejected(db_errors)
+                return inserted, db_errors
+            inserted, db_errors = in_transaction(conn, work)
+            errors = sorted(errors + db_errors, key=lambda e: e["row"])
+        except RowsRejected as e:
+            conn.rollback()
+            return jsonify({"inserted": 0, "errors": sorted(errors + e.errors, key=lambda err: err["row"])}), 400
+        except Exception as e:
+            conn.rollback()
+            return jsonify({"error": str(e)}), 400
+    if inserted:
+        tables_changed(table)
+        changes.publish(table, "create", count=len(inserted))
+        columns = [spec.field_names.index(name) for name in audit_fields]
+        audit_log.record_many(table, "created", [
+            (row_id, {name: args[i] for name, i in zip(audit_fields, columns)}) for row_id, args in inserted
+        ])
+    return jsonify({"inserted": len(inserted), "skipped": len(errors), "errors": errors}), 201
+
+DONOR_IMPORT = ImportSpec(
+    "INSERT INTO donor (admin_code, name, age, gender, blood_group, contact, medical_history) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+    [("admin_code", text), ("name", text), ("age", positive_int), ("gender", text),
+     ("blood_group", blood_group), ("contact", text), ("medical_history", optional_text)],
+)
+
+RECIPIENT_IMPORT = ImportSpec(
+    "INSERT INTO recipient (admin_code, name, age, gender, blood_group, organ_required, contact) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+    [("admin_code", text), ("name", text), ("age", positive_int), ("gender", text),
+     ("blood_group", blood_group), ("organ_required", optional_text), ("contact", text)],
+)
+
+# Use the trigger to set expiry_date (it fires per row in multi-row INSERTs too)
+DONATION_IMPORT = ImportSpec(
+    "INSERT INTO donation (donor_id, quantity_ml, donation_date, donation_type) VALUES (%s, %s, %s, 'Blood')",
+    [("donor_id", positive_int), ("quantity_ml", positive_int), ("donation_date", iso_date)],
+)
+
+@app.route('/api/donors/bulk', methods=['POST'])
+@idempotent
+def add_donors_bulk():
+    return bulk_response(DONOR_IMPORT, "donor", ("blood_group",))
+
+@app.route('/api/recipients/bulk', methods=['POST'])
+@idempotent
+def add_recipients_bulk():
+    return bulk_response(RECIPIENT_IMPORT, "recipient", ("blood_group", "organ_required"))
+
+@app.route('/api/donations/bulk', methods=['POST'])
+@idempotent
+def add_donations_bulk():
+    return bulk_response(DONATION_IMPORT, "donation", ("donor_id", "quantity_ml", "donation_date"))
 
 # --- UPDATE Endpoints (PUT/POST) ---
 
 # --- NEW: Update Donor ---
 @app.route('/api/donors/<int:id>', methods=['PUT'])
+@idempotent
 def update_donor(id):
     data = request.json
-    try:
-        conn = get_db_connection()
-        if conn is None: return jsonify({"error": "DB connection failed"}), 500
-        cursor = conn.cursor()
-        sql = """
-            UPDATE donor SET
-            admin_code = %s, name = %s, age = %s, gender = %s, 
-            blood_group = %s, contact = %s, medical_history = %s
-            WHERE donor_id = %s
-        """
-        args = (
-            data['admin_code'], data['name'], data['age'], data['gender'],
-            data['blood_group'], data['contact'], data['medical_history'], id
-        )
-        cursor.execute(sql, args)
-        conn.commit()
-        cursor.close()
-        conn.close()
-        return jsonify({"message": "Donor updated successfully"}), 200
-    except Exception as e:
-        return jsonify({"error": str(e)}), 400
+    with db_connection() as conn, conn.cursor() as cursor:
+        try:
+            sql = """
+                UPDATE donor SET
+                admin_code = %s, name = %s, age = %s, gender = %s,
+                blood_group = %s, contact = %s, medical_history = %s
+                WHERE donor_id = %s
+            """
+            args = (
+                data['admin_code'], data['name'], data['age'], data['gender'],
+                data['blood_group'], data['contact'], data['medical_history'], id
+            )
+            in_transaction(conn, lambda: cursor.execute(sql, args))
+        except Exception as e:
+            conn.rollback()
+            return jsonify({"error": str(e)}), 400
+    tables_changed("donor")
+    changes.publish("donor", "update", [id])
+    audit_log.record("donor", id, "updated", blood_group=data['blood_group'])
+    return jsonify({"message": "Donor updated successfully"}), 200
 
 # --- NEW: Update Recipient ---
 @app.route('/api/recipients/<int:id>', methods=['PUT'])
+@idempotent
 def update_recipient(id):
     data = request.json
-    try:
-        conn = get_db_connection()
-        if conn is None: return jsonify({"error": "DB connection failed"}), 500
-        cursor = conn.cursor()
-        sql = """
-            UPDATE recipient SET
-            admin_code = %s, name = %s, age = %s, gender = %s, 
-            blood_group = %s, organ_required = %s, contact = %s
-            WHERE recipient_id = %s
-        """
-        args = (
-            data['admin_code'], data['name'], data['age'], data['gender'],
-            data['blood_group'], data['organ_required'], data['contact'], id
-        )
-        cursor.execute(sql, args)
-        conn.commit()
-        cursor.close()
-        conn.close()
-        return jsonify({"message": "Recipient updated successfully"}), 200
-    except Exception as e:
-        return jsonify({"error": str(e)}), 400
+    with db_connection() as conn, conn.cursor() as cursor:
+        try:
+            sql = """
+                UPDATE recipient SET
+                admin_code = %s, name = %s, age = %s, gender = %s,
+                blood_group = %s, organ_required = %s, contact = %s
+                WHERE recipient_id = %s
+            """
+            args = (
+                data['admin_code'], data['name'], data['age'], data['gender'],
+                data['blood_group'], data['organ_required'], data['contact'], id
+            )
+            in_transaction(conn, lambda: cursor.execute(sql, args))
+        except Exception as e:
+            conn.rollback()
+            return jsonify({"error": str(e)}), 400
+    tables_changed("recipient")
+    changes.publish("recipient", "update", [id])
+    audit_log.record("recipient", id, "updated", blood_group=data['blood_group'],
+                     organ_required=data['organ_required'])
+    return jsonify({"message": "Recipient updated successfully"}), 200
 
 @app.route('/api/fulfill_blood_request', methods=['POST'])
+@idempotent
 def fulfill_blood_request():
     data = request.json
+    with db_connection() as conn, conn.cursor() as cursor:
+        try:
+            args = (data['donation_id'], data['request_id'])
+            def work():
+                cursor.callproc('sp_FulfillBloodRequest', args)
+                return next(cursor.stored_results()).fetchone()
+            result = in_transaction(conn, work)
+        except Exception as e:
+            conn.rollback()
+            return jsonify({"error": str(e)}), 400
+    tables_changed("donation", "requests")
+    changes.publish("donation", "update", [data['donation_id']], used=True)
+    changes.publish("requests", "update", [data['request_id']], status="Fulfilled")
+    audit_log.fulfilled("donation", data['donation_id'], data['request_id'])
+    return jsonify({"message": result[0]}), 200
+
+# --- NEW: Blood matching engine ---
+# Plans compatible, first-expiring-first allocations for every pending blood
+# request at once (see matching.py). GET is a dry run; POST applies the plan
+# through sp_FulfillBloodRequest in a single transaction, with the candidate
+# rows locked so concurrent fulfillments cannot take the same units.
+def _matching_limit(value):
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        raise ValueError("'limit' must be a positive integer")
+    return value
+
+@app.route('/api/matching/blood', methods=['GET'])
+@conditional("donation", "donor", "requests", "recipient", daily=True)
+def preview_blood_matching():
     try:
-        conn = get_db_connection()
-        if conn is None: return jsonify({"error": "DB connection failed"}), 500
-        cursor = conn.cursor()
-        args = (data['donation_id'], data['request_id'])
-        cursor.callproc('sp_FulfillBloodRequest', args)
-        result = next(cursor.stored_results()).fetchone()
-        conn.commit()
-        cursor.close()
-        conn.close()
-        return jsonify({"message": result[0]}), 200
-    except Exception as e:
+        limit = _matching_limit(int_arg('limit'))
+    except ValueError as e:
         return jsonify({"error": str(e)}), 400
+    with db_connection() as conn, conn.cursor() as cursor:
+        units, pending = load_candidates(cursor)
+    allocations, unmatched = plan_allocations(units, pending, limit)
+    return jsonify({"dry_run": True, "allocations": allocations, "unmatched": unmatched})
+
+@app.route('/api/matching/blood', methods=['POST'])
+@idempotent
+def commit_blood_matching():
+    data = request.get_json(silent=True) or {}
+    try:
+        limit = _matching_limit(data.get('limit'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    dry_run = data.get('dry_run', False)
+    if not isinstance(dry_run, bool):
+        return jsonify({"error": "'dry_run' must be true or false"}), 400
+
+    with db_connection() as conn, conn.cursor() as cursor:
+        try:
+            def work():
+                units, pending = load_candidates(cursor, lock=not dry_run)
+                allocations, unmatched = plan_allocations(units, pending, limit)
+                if not dry_run:
+                    for allocation in allocations:
+                        cursor.callproc('sp_FulfillBloodRequest', (allocation['donation_id'], allocation['request_id']))
+                        allocation['message'] = next(cursor.stored_results()).fetchone()[0]
+                return allocations, unmatched
+            # A retry re-plans from scratch against the rows as they are now
+            allocations, unmatched = in_transaction(conn, work)
+        except Exception as e:
+            conn.rollback()
+            return jsonify({"error": str(e)}), 400
+
+    if not dry_run and allocations:
+        tables_changed("donation", "requests")
+        changes.publish("donation", "update", [a['donation_id'] for a in allocations], used=True)
+        changes.publish("requests", "update", [a['request_id'] for a in allocations], status="Fulfilled")
+        for a in allocations:
+            audit_log.fulfilled("donation", a['donation_id'], a['request_id'])
+    return jsonify({
+        "dry_run": dry_run,
+        "fulfilled": 0 if dry_run else len(allocations),
+        "allocations": allocations,
+        "unmatched": unmatched,
+    })
 
 @app.route('/api/allocate_organ', methods=['POST'])
+@idempotent
 def allocate_organ():
     data = request.json
-    try:
-        conn = get_db_connection()
-        if conn is None: return jsonify({"error": "DB connection failed"}), 500
-        cursor = conn.cursor()
-        
-        sql_organ = "UPDATE organ SET request_id = %s, status = 'Transplanted' WHERE organ_id = %s"
-        cursor.execute(sql_organ, (data['request_id'], data['organ_id']))
-        
-        sql_request = "UPDATE requests SET status = 'Fulfilled' WHERE request_id = %s"
-        cursor.execute(sql_request, (data['request_id'],))
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
-        return jsonify({"message": "Organ allocated successfully"}), 200
-    except Exception as e:
-        conn.rollback()
-        return jsonify({"error": str(e)}), 400
+    with db_connection() as conn, conn.cursor() as cursor:
+        try:
+            # Both UPDATEs only match rows that are still open
+            in_transaction(conn, lambda: allocate(cursor, data['organ_id'], data['request_id']))
+        except AllocationConflict as e:
+            conn.rollback()
+            return jsonify({"error": str(e)}), 409
+        except Exception as e:
+            conn.rollback()
+            return jsonify({"error": str(e)}), 400
+    tables_changed("organ", "requests")
+    changes.publish("organ", "update", [data['organ_id']], status="Transplanted")
+    changes.publish("requests", "update", [data['request_id']], status="Fulfilled")
+    audit_log.fulfilled("organ", data['organ_id'], data['request_id'])
+    return jsonify({"message": "Organ allocated successfully"}), 200
+
+# --- NEW: Batch organ allocation against the waitlist ---
+# Body: {"organ_ids": [...]} to restrict the run, or empty for every available
+# organ. All allocations happen in one transaction with the rows locked.
+@app.route('/api/organs/allocate_batch', methods=['POST'])
+@idempotent
+def allocate_organs_batch():
+    data = request.get_json(silent=True) or {}
+    organ_ids = data.get('organ_ids')
+    if organ_ids is not None and (
+            not isinstance(organ_ids, list) or not all(isinstance(i, int) for i in organ_ids)):
+        return jsonify({"error": "'organ_ids' must be a list of integers"}), 400
+    if organ_ids == []:
+        return jsonify({"allocations": [], "unallocated": []}), 200
+
+    with db_connection() as conn, conn.cursor() as cursor:
+        try:
+            allocations, unallocated = in_transaction(conn, lambda: allocate_batch(cursor, organ_ids))
+        except Exception as e:
+            conn.rollback()
+            return jsonify({"error": str(e)}), 400
+    if allocations:
+        tables_changed("organ", "requests")
+        changes.publish("organ", "update", [a['organ_id'] for a in allocations], status="Transplanted")
+        changes.publish("requests", "update", [a['request_id'] for a in allocations], status="Fulfilled")
+        for a in allocations:
+            audit_log.fulfilled("organ", a['organ_id'], a['request_id'])
+    return jsonify({"allocations": allocations, "unallocated": unallocated}), 200
 
 # --- DELETE Endpoints ---
 
 @app.route('/api/donors/<int:id>', methods=['DELETE'])
+@idempotent
 def delete_donor(id):
-    try:
-        conn = get_db_connection()
-        if conn is None: return jsonify({"error": "DB connection failed"}), 500
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM donor WHERE donor_id = %s", (id,))
-        conn.commit()
-        cursor.close()
-        conn.close()
-        return jsonify({"message": "Donor deleted successfully"}), 200
-    except mysql.connector.Error as err:
-        if err.errno == 1451:
-            return jsonify({"error": "Cannot delete: Donor has existing donations or organs."}), 400
-        return jsonify({"error": str(err)}), 400
+    with db_connection() as conn, conn.cursor() as cursor:
+        try:
+            in_transaction(conn, lambda: cursor.execute("DELETE FROM donor WHERE donor_id = %s", (id,)))
+        except mysql.connector.Error as err:
+            conn.rollback()
+            if err.errno == 1451:
+                return jsonify({"error": "Cannot delete: Donor has existing donations or organs."}), 400
+            return jsonify({"error": str(err)}), 400
+    tables_changed("donor")
+    changes.publish("donor", "delete", [id])
+    audit_log.record("donor", id, "deleted")
+    return jsonify({"message": "Donor deleted successfully"}), 200
 
 @app.route('/api/recipients/<int:id>', methods=['DELETE'])
+@idempotent
 def delete_recipient(id):
-    try:
-        conn = get_db_connection()
-        if conn is None: return jsonify({"error": "DB connection failed"}), 500
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM recipient WHERE recipient_id = %s", (id,))
-        conn.commit()
-        cursor.close()
-        conn.close()
-        return jsonify({"message": "Recipient deleted successfully"}), 200
-    except mysql.connector.Error as err:
-        if err.errno == 1451:
-            return jsonify({"error": "Cannot delete: Recipient has existing requests."}), 400
-        return jsonify({"error": str(err)}), 400
+    with db_connection() as conn, conn.cursor() as cursor:
+        try:
+            in_transaction(conn, lambda: cursor.execute("DELETE FROM recipient WHERE recipient_id = %s", (id,)))
+        except mysql.connector.Error as err:
+            conn.rollback()
+            if err.errno == 1451:
+                return jsonify({"error": "Cannot delete: Recipient has existing requests."}), 400
+            return jsonify({"error": str(err)}), 400
+    tables_changed("recipient")
+    changes.publish("recipient", "delete", [id])
+    audit_log.record("recipient", id, "deleted")
+    return jsonify({"message": "Recipient deleted successfully"}), 200
 
 @app.route('/api/requests/<int:id>', methods=['DELETE'])
+@idempotent
 def delete_request(id):
-    try:
-        conn = get_db_connection()
-        if conn is None: return jsonify({"error": "DB connection failed"}), 500
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM requests WHERE request_id = %s", (id,))
-        conn.commit()
-        cursor.close()
-        conn.close()
-        return jsonify({"message": "Request deleted successfully"}), 200
-    except mysql.connector.Error as err:
-        if err.errno == 1451:
-            return jsonify({"error": "Cannot delete: Request is linked to a donation or organ."}), 400
-        return jsonify({"error": str(err)}), 400
+    with db_connection() as conn, conn.cursor() as cursor:
+        try:
+            in_transaction(conn, lambda: cursor.execute("DELETE FROM requests WHERE request_id = %s", (id,)))
+        except mysql.connector.Error as err:
+            conn.rollback()
+            if err.errno == 1451:
+                return jsonify({"error": "Cannot delete: Request is linked to a donation or organ."}), 400
+            return jsonify({"error": str(err)}), 400
+    tables_changed("requests")
+    changes.publish("requests", "delete", [id])
+    audit_log.record("requests", id, "deleted")
+    return jsonify({"message": "Request deleted successfully"}), 200
 
 # --- NEW: Inventory DELETE Endpoints ---
 @app.route('/api/donations/<int:id>', methods=['DELETE'])
+@idempotent
 def delete_donation(id):
-    try:
-        conn = get_db_connection()
-        if conn is None: return jsonify({"error": "DB connection failed"}), 500
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM donation WHERE donation_id = %s", (id,))
-        conn.commit()
-        cursor.close()
-        conn.close()
-        return jsonify({"message": "Donation deleted successfully"}), 200
-    except mysql.connector.Error as err:
-        if err.errno == 1451:
-            return jsonify({"error": "Cannot delete: Donation is linked to a request."}), 400
-        return jsonify({"error": str(err)}), 400
+    with db_connection() as conn, conn.cursor() as cursor:
+        try:
+            in_transaction(conn, lambda: cursor.execute("DELETE FROM donation WHERE donation_id = %s", (id,)))
+        except mysql.connector.Error as err:
+            conn.rollback()
+            if err.errno == 1451:
+                return jsonify({"error": "Cannot delete: Donation is linked to a request."}), 400
+            return jsonify({"error": str(err)}), 400
+    tables_changed("donation")
+    changes.publish("donation", "delete", [id])
+    audit_log.record("donation", id, "deleted")
+    return jsonify({"message": "Donation deleted successfully"}), 200
 
 @app.route('/api/organs/<int:id>', methods=['DELETE'])
+@idempotent
 def delete_organ(id):
-    try:
-        conn = get_db_connection()
-        if conn is None: return jsonify({"error": "DB connection failed"}), 500
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM organ WHERE organ_id = %s", (id,))
-        conn.commit()
-        cursor.close()
-        conn.close()
-        return jsonify({"message": "Organ deleted successfully"}), 200
-    except mysql.connector.Error as err:
-        if err.errno == 1451:
-            return jsonify({"error": "Cannot delete: Organ is allocated to a request."}), 400
-        return jsonify({"error": str(err)}), 400
+    with db_connection() as conn, conn.cursor() as cursor:
+        try:
+            in_transaction(conn, lambda: cursor.execute("DELETE FROM organ WHERE organ_id = %s", (id,)))
+        except mysql.connector.Error as err:
+            conn.rollback()
+            if err.errno == 1451:
+                return jsonify({"error": "Cannot delete: Organ is allocated to a request."}), 400
+            return jsonify({"error": str(err)}), 400
+    tables_changed("organ")
+    changes.publish("organ", "delete", [id])
+    audit_log.record("organ", id, "deleted")
+    return jsonify({"message": "Organ deleted successfully"}), 200
 
 # --- Main entry point ---
+# Development server only; use serve.py (gunicorn / waitress) in production.
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,454 @@
+# audit.py
+# Append-only history of inventory and request state transitions
+# (inventory_event, migration 0005).
+#
+# Write handlers call record() after their transaction commits. record() only
+# puts the event on an in-process queue, so fulfillment and allocation calls
+# do not wait on the log; a daemon thread drains the queue and writes events
+# in batches of up to AUDIT_BATCH_SIZE, at most AUDIT_FLUSH_INTERVAL seconds
+# after they were recorded. It also looks up the blood group and expiry date
+# of new donations at that point, rather than in the request. Bulk imports
+# queue all their events as one item (record_many). Batches that cannot be
+# written are retried; if the queue is full (database down for a long time)
+# new events are dropped and counted in audit_events_total.
+#
+# Events are (entity, entity_id, action, related_id, data):
+#
+#   donation   created {donor_id, quantity_ml, donation_date, blood_group, expiry_date}
+#   donation   consumed (related_id = request)   deleted
+#   organ      created {donor_id, organ_type, status}   transplanted (related_id = request)   deleted
+#   requests   created {recipient_id, hospital_id, request_type}
+#   requests   fulfilled {item} (related_id = donation or organ)   deleted
+#   donor      created / updated {blood_group}   deleted
+#   recipient  created / updated {blood_group, organ_required}   deleted
+#
+# Contacts, names and medical history are never copied into the log.
+#
+# The table is partitioned by month. Keep partitions ahead of time and drop
+# old ones with:
+#
+#   python audit.py partitions                  # current month + AUDIT_PARTITIONS_AHEAD
+#   python audit.py partitions --drop-before 2025-01
+#
+# and rebuild inventory state from the log alone with:
+#
+#   python audit.py replay                      # state now, from every event
+#   python audit.py replay --until 2026-06-01   # state as it was then
+#   python audit.py replay --compare            # also diff against the base tables
+import argparse
+import atexit
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+
+from flask import has_request_context, request
+
+from db_config import db_connection
+from metrics import AUDIT_EVENTS
+
+AUDIT_ENABLED = os.environ.get("AUDIT_ENABLED", "1") != "0"
+AUDIT_BATCH_SIZE = int(os.environ.get("AUDIT_BATCH_SIZE", 200))
+AUDIT_FLUSH_INTERVAL = float(os.environ.get("AUDIT_FLUSH_INTERVAL", 1.0))    # seconds
+AUDIT_QUEUE_SIZE = int(os.environ.get("AUDIT_QUEUE_SIZE", 10000))        # queued record() calls
+AUDIT_WRITE_ATTEMPTS = int(os.environ.get("AUDIT_WRITE_ATTEMPTS", 5))
+AUDIT_MAX_QUERY_DAYS = int(os.environ.get("AUDIT_MAX_QUERY_DAYS", 31))
+AUDIT_MAX_LIMIT = 1000
+AUDIT_PARTITIONS_AHEAD = int(os.environ.get("AUDIT_PARTITIONS_AHEAD", 3))
+
+ENTITIES = ("donation", "organ", "requests", "donor", "recipient")
+
+INSERT_SQL = """
+    INSERT INTO inventory_event (occurred_at, entity, entity_id, action, related_id, source, data)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+"""
+
+DONATION_DETAILS_SQL = """
+    SELECT d.donation_id, d.donor_id, dn.blood_group, d.expiry_date
+    FROM donation d
+    JOIN donor dn ON d.donor_id = dn.donor_id
+    WHERE d.donation_id IN ({})
+"""
+
+_STOP = object()
+
+
+class AuditQueryError(ValueError):
+    pass
+
+
+def utcnow():
+    """Event timestamps are naive UTC, millisecond precision (DATETIME(3))."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class AuditLog:
+    def __init__(self, enabled=AUDIT_ENABLED, batch_size=AUDIT_BATCH_SIZE,
+                 flush_interval=AUDIT_FLUSH_INTERVAL, queue_size=AUDIT_QUEUE_SIZE):
+        self.enabled = enabled
+        self.batch_size, self.flush_interval = batch_size, flush_interval
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    # --- recording (request path) ---
+
+    def record(self, entity, entity_id, action, related_id=None, **data):
+        """Queue one event. Never blocks and never raises."""
+        if self.enabled:
+            self._put([self._event(entity, entity_id, action, related_id, data)])
+
+    def record_many(self, entity, action, items):
+        """Queue one event per (entity_id, data) pair as a single queue item,
+        so a large import cannot fill the queue on its own."""
+        if self.enabled and items:
+            self._put([self._event(entity, entity_id, action, None, data) for entity_id, data in items])
+
+    @staticmethod
+    def _event(entity, entity_id, action, related_id, data):
+        return {
+            "occurred_at": utcnow(),
+            "entity": entity,
+            "entity_id": entity_id,
+            "action": action,
+            "related_id": related_id,
+            "source": request.endpoint if has_request_context() else None,
+            "data": data,
+        }
+
+    def _put(self, events):
+        self._start()
+        try:
+            self._queue.put_nowait(events)
+        except queue.Full:
+            AUDIT_EVENTS.inc(("dropped",), len(events))
+            print(f"Audit queue full, dropped {len(events)} {events[0]['entity']} {events[0]['action']} events")
+
+    def fulfilled(self, entity, entity_id, request_id):
+        """A donation consumed by, or an organ transplanted for, a request."""
+        action = "consumed" if entity == "donation" else "transplanted"
+        self.record(entity, entity_id, action, related_id=request_id)
+        self.record("requests", request_id, "fulfilled", related_id=entity_id, item=entity)
+
+    def _start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def close(self, timeout=5):
+        """Write whatever is queued and stop the writer (called at exit)."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    # --- writer thread ---
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            stop = item is _STOP
+            events = [] if stop else list(item)
+            deadline = time.monotonic() + self.flush_interval
+            while not stop and len(events) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                else:
+                    events.extend(item)
+            for start in range(0, len(events), self.batch_size):
+                self._write(events[start:start + self.batch_size])
+            if stop:
+                return
+
+    def _write(self, events):
+        for attempt in range(1, AUDIT_WRITE_ATTEMPTS + 1):
+            try:
+                with db_connection() as conn, conn.cursor() as cursor:
+                    _add_donation_details(cursor, events)
+                    cursor.executemany(INSERT_SQL, [_row(e) for e in events])
+                    conn.commit()
+                AUDIT_EVENTS.inc(("written",), len(events))
+                return
+            except Exception as e:
+                if attempt == AUDIT_WRITE_ATTEMPTS:
+                    AUDIT_EVENTS.inc(("failed",), len(events))
+                    print(f"Audit write failed, lost {len(events)} events: {e}")
+                    return
+                time.sleep(min(30, 2 ** attempt))   # database down or failing over
+
+
+def _add_donation_details(cursor, events):
+    """Fill in blood group and expiry date (set by trigger) for new donations,
+    and take donor_id from the row: the request may have sent it as a string."""
+    created = {e["entity_id"]: e for e in events
+               if e["entity"] == "donation" and e["action"] == "created" and "blood_group" not in e["data"]}
+    if not created:
+        return
+    cursor.execute(DONATION_DETAILS_SQL.format(", ".join(["%s"] * len(created))), tuple(created))
+    for donation_id, donor_id, group, expiry_date in cursor.fetchall():
+        created[donation_id]["data"].update(donor_id=donor_id, blood_group=group, expiry_date=expiry_date)
+
+
+def _row(event):
+    data = json.dumps(event["data"], default=str) if event["data"] else None
+    return (event["occurred_at"], event["entity"], event["entity_id"], event["action"],
+            event["related_id"], event["source"], data)
+
+
+# --- Querying ---
+
+def _parse_utc(value):
+    """An ISO date or datetime as naive UTC; one with an offset (such as an
+    occurred_at echoed back from the API) is converted first."""
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def parse_window(start, end, now=None):
+    """(start, end) datetimes from ISO strings; end defaults to now and start
+    to a day before end. The window is capped at AUDIT_MAX_QUERY_DAYS so a
+    query only reads that many monthly partitions."""
+    try:
+        end = _parse_utc(end) if end else (now or utcnow())
+        start = _parse_utc(start) if start else end - timedelta(days=1)
+    except ValueError as e:
+        raise AuditQueryError(f"'from' and 'to' must be ISO dates or datetimes: {e}")
+    if start >= end:
+        raise AuditQueryError("'from' must be before 'to'")
+    if end - start > timedelta(days=AUDIT_MAX_QUERY_DAYS):
+        raise AuditQueryError(f"The window can span at most {AUDIT_MAX_QUERY_DAYS} days")
+    return start, end
+
+
+def query(cursor, start, end, entity=None, entity_id=None, action=None, after=None, limit=100):
+    """Events with start <= occurred_at < end in log order, optionally for one
+    entity (and id) or action. Keyset pagination: pass the last event_id as
+    `after`. Returns (events, next_cursor)."""
+    conditions, params = ["occurred_at >= %s", "occurred_at < %s"], [start, end]
+    for column, value in (("entity", entity), ("entity_id", entity_id), ("action", action)):
+        if value is not None:
+            conditions.append(f"{column} = %s")
+            params.append(value)
+    if after is not None:
+        conditions.append("event_id > %s")
+        params.append(after)
+    cursor.execute(f"""
+        SELECT event_id, occurred_at, entity, entity_id, action, related_id, source, data
+        FROM inventory_event
+        WHERE {" AND ".join(conditions)}
+        ORDER BY event_id
+        LIMIT %s
+    """, tuple(params) + (limit + 1,))
+    rows = cursor.fetchall()
+    for row in rows:
+        # Stored as naive UTC; label it so clients do not read it as local time
+        row["occurred_at"] = row["occurred_at"].replace(tzinfo=timezone.utc)
+        row["data"] = json.loads(row["data"]) if row["data"] else {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, rows[-1]["event_id"]
+    return rows, None
+
+
+# --- Partition maintenance ---
+
+def _month_start(day, months=0):
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def _partitions(cursor):
+    cursor.execute("""
+        SELECT partition_name FROM information_schema.partitions
+        WHERE table_schema = DATABASE() AND table_name = 'inventory_event' AND partition_name <> 'pmax'
+        ORDER BY partition_name
+    """)
+    return [name for (name,) in cursor.fetchall()]
+
+
+def ensure_partitions(conn, ahead=AUDIT_PARTITIONS_AHEAD, today=None):
+    """Split monthly partitions (pYYYYMM) off pmax up to `ahead` months past
+    the current one. Returns the names added."""
+    this_month = _month_start(today or utcnow().date())
+    with conn.cursor() as cursor:
+        existing = _partitions(cursor)
+        months = [_month_start(this_month, n) for n in range(ahead + 1)]
+        new = [m for m in months if not existing or f"p{m:%Y%m}" > existing[-1]]
+        if not new:
+            return []
+        parts = ", ".join(f"PARTITION p{m:%Y%m} VALUES LESS THAN ('{_month_start(m, 1)}')" for m in new)
+        cursor.execute(f"ALTER TABLE inventory_event REORGANIZE PARTITION pmax INTO "
+                       f"({parts}, PARTITION pmax VALUES LESS THAN (MAXVALUE))")
+    return [f"p{m:%Y%m}" for m in new]
+
+
+def drop_partitions(conn, before):
+    """Drop the monthly partitions for months before `before` (a date).
+    This is the only way rows leave the log."""
+    cutoff = f"p{before:%Y%m}"
+    with conn.cursor() as cursor:
+        old = [name for name in _partitions(cursor) if name < cutoff]
+        if old:
+            cursor.execute(f"ALTER TABLE inventory_event DROP PARTITION {', '.join(old)}")
+    return old
+
+
+# --- Replay ---
+
+def replay(conn, until=None):
+    """Rebuild inventory state from the log alone: usable blood per group and
+    expiry day, organs per type and status, and pending requests per type,
+    as of `until` (default: now)."""
+    as_of = (until or utcnow()).date()
+    donations, by_donor, organs, requests_ = {}, {}, {}, {}
+    events = 0
+
+    sql = "SELECT entity, entity_id, action, data FROM inventory_event"
+    params = ()
+    if until is not None:
+        sql += " WHERE occurred_at < %s"
+        params = (until,)
+    with conn.cursor() as cursor:
+        cursor.execute(sql + " ORDER BY event_id", params)
+        while True:
+            rows = cursor.fetchmany(1000)
+            if not rows:
+                break
+            for entity, entity_id, action, data in rows:
+                events += 1
+                data = json.loads(data) if data else {}
+                if entity == "donation":
+                    if action == "created":
+                        donations[entity_id] = dict(data, used=False)
+                        by_donor.setdefault(data.get("donor_id"), set()).add(entity_id)
+                    elif action == "consumed" and entity_id in donations:
+                        donations[entity_id]["used"] = True
+                    elif action == "deleted":
+                        donations.pop(entity_id, None)
+                elif entity == "donor" and action == "updated" and "blood_group" in data:
+                    for donation_id in by_donor.get(entity_id, ()):
+                        if donation_id in donations:
+                            donations[donation_id]["blood_group"] = data["blood_group"]
+                elif entity == "organ":
+                    if action == "created":
+                        organs[entity_id] = {"organ_type": data.get("organ_type"),
+                                             "status": data.get("status", "Available")}
+                    elif action == "transplanted" and entity_id in organs:
+                        organs[entity_id]["status"] = "Transplanted"
+                    elif action == "deleted":
+                        organs.pop(entity_id, None)
+                elif entity == "requests":
+                    if action == "created":
+                        requests_[entity_id] = {"request_type": data.get("request_type"), "status": "Pending"}
+                    elif action == "fulfilled" and entity_id in requests_:
+                        requests_[entity_id]["status"] = "Fulfilled"
+                    elif action == "deleted":
+                        requests_.pop(entity_id, None)
+
+    blood, incomplete = {}, 0
+    for unit in donations.values():
+        if unit["used"]:
+            continue
+        if not unit.get("blood_group") or not unit.get("expiry_date"):
+            incomplete += 1
+            continue
+        expiry_date = date.fromisoformat(unit["expiry_date"])
+        if expiry_date > as_of:
+            units, ml = blood.get((unit["blood_group"], expiry_date), (0, 0))
+            blood[(unit["blood_group"], expiry_date)] = (units + 1, ml + int(unit["quantity_ml"]))
+    organ_counts = {}
+    for organ in organs.values():
+        key = (organ["organ_type"], organ["status"])
+        organ_counts[key] = (organ_counts.get(key, (0,))[0] + 1,)
+    pending = {}
+    for item in requests_.values():
+        if item["status"] == "Pending":
+            pending[item["request_type"]] = pending.get(item["request_type"], 0) + 1
+
+    return {
+        "as_of": as_of.isoformat(),
+        "events": events,
+        "blood": blood,
+        "organs": organ_counts,
+        "pending_requests": pending,
+        # Donations whose details could not be looked up (no group / expiry)
+        # cannot be placed in the blood totals.
+        "incomplete_donations": incomplete,
+    }
+
+
+def _report(state):
+    blood = {}
+    for (group, expiry_date), (units, ml) in sorted(state["blood"].items()):
+        entry = blood.setdefault(group, {"units": 0, "quantity_ml": 0, "by_expiry": []})
+        entry["units"] += units
+        entry["quantity_ml"] += ml
+        entry["by_expiry"].append({"expiry_date": expiry_date, "units": units, "quantity_ml": ml})
+    organs = {}
+    for (organ_type, status), (count,) in sorted(state["organs"].items(), key=str):
+        organs.setdefault(organ_type, {})[status] = count
+    return dict(state, blood=blood, organs=organs)
+
+
+def compare(conn, state):
+    """Drift between a replayed state and the base tables (inventory.py's
+    truth queries). Only meaningful for a replay up to now."""
+    from inventory import BLOOD_TRUTH_SQL, ORGAN_TRUTH_SQL, _diff
+    with conn.cursor() as cursor:
+        cursor.execute(BLOOD_TRUTH_SQL)
+        blood_truth = {(g, e): (u, ml) for g, e, u, ml in cursor.fetchall()}
+        cursor.execute(ORGAN_TRUTH_SQL)
+        organ_truth = {(t, s): (n,) for t, s, n in cursor.fetchall()}
+    return {
+        "blood_drift": _diff(blood_truth, state["blood"], ("units", "quantity_ml")),
+        "organ_drift": _diff(organ_truth, state["organs"], ("organs",)),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Maintain and replay the inventory event log.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    parts = commands.add_parser("partitions", help="add upcoming monthly partitions, drop old ones")
+    parts.add_argument("--ahead", type=int, default=AUDIT_PARTITIONS_AHEAD, help="months past the current one")
+    parts.add_argument("--drop-before", metavar="YYYY-MM", help="drop partitions for months before this one")
+    rep = commands.add_parser("replay", help="rebuild inventory state from the log")
+    rep.add_argument("--until", metavar="DATETIME", help="replay events before this time (UTC) only")
+    rep.add_argument("--compare", action="store_true", help="diff the result against the base tables")
+    options = parser.parse_args()
+
+    with db_connection() as conn:
+        if options.command == "partitions":
+            for name in ensure_partitions(conn, options.ahead):
+                print(f"Added partition {name}")
+            if options.drop_before:
+                cutoff = date.fromisoformat(options.drop_before + "-01")
+                for name in drop_partitions(conn, cutoff):
+                    print(f"Dropped partition {name}")
+        else:
+            until = datetime.fromisoformat(options.until) if options.until else None
+            state = replay(conn, until)
+            result = _report(state)
+            if options.compare:
+                result.update(compare(conn, state))
+            print(json.dumps(result, default=str, indent=2))
+            if options.compare and (result["blood_drift"] or result["organ_drift"]):
+                sys.exit(1)
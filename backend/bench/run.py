@@ -0,0 +1,306 @@
+# bench/run.py
+# Drives the API's hot endpoints and reports latency percentiles, throughput
+# and memory as JSON, so regressions show up as numbers.
+#
+#   python bench/run.py                                  # in-process Flask test client
+#   python bench/run.py --url http://localhost:5000      # a running server over HTTP
+#   python bench/run.py --requests 500 --concurrency 8 --out results.json
+#   python bench/run.py --only list_donations,stats
+#
+# Seed data first with bench/seed.py. Scenarios that write (fulfilment and
+# organ allocation) only run with --include-writes. They use up the pending
+# work they act on, so before every call (outside the timed section) fresh
+# pending requests and matching units are inserted straight into MySQL for
+# seeded recipients and donors; bench/seed.py --clean removes them again.
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# (name, method, path, body); "{donor_id}" / "{recipient_id}" are filled per call.
+# A callable body is called with the Restocker before each request and its
+# result is sent.
+SCENARIOS = [
+    ("list_donors", "GET", "/api/donors", None),
+    ("list_donors_page", "GET", "/api/donors?limit=50", None),
+    ("list_recipients", "GET", "/api/recipients", None),
+    ("list_requests", "GET", "/api/requests", None),
+    ("list_requests_pending_page", "GET", "/api/requests?status=Pending&limit=50", None),
+    ("list_donations", "GET", "/api/donations", None),
+    ("list_donations_columnar", "GET", "/api/donations?format=columnar", None),
+    ("list_organs", "GET", "/api/organs", None),
+    ("page_donors", "GET", "/api/pages/donors", None),
+    ("page_recipients", "GET", "/api/pages/recipients", None),
+    ("page_requests", "GET", "/api/pages/requests", None),
+    ("page_donations", "GET", "/api/pages/donations", None),
+    ("page_organs", "GET", "/api/pages/organs", None),
+    ("available_donations", "GET", "/api/donations/available", None),
+    ("available_organs", "GET", "/api/organs/available", None),
+    ("detail_donor", "GET", "/api/donors/{donor_id}", None),
+    ("detail_recipient", "GET", "/api/recipients/{recipient_id}", None),
+    ("stats", "GET", "/api/stats", None),
+    ("admins", "GET", "/api/admins", None),
+    ("matching_preview", "GET", "/api/matching/blood", None),
+]
+WRITE_SCENARIOS = [
+    ("fulfill_blood_request", "POST", "/api/fulfill_blood_request", lambda stock: stock.blood_pair()),
+    ("matching_commit", "POST", "/api/matching/blood", lambda stock: stock.blood_backlog(10)),
+    ("organ_allocate_batch", "POST", "/api/organs/allocate_batch", lambda stock: stock.organ_batch(5)),
+]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+class TestClientDriver:
+    name = "test_client"
+
+    def __init__(self):
+        from app import app
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method, path, body):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, json=body)
+        size = len(response.get_data())
+        response.close()
+        return response.status_code, size
+
+
+class HttpDriver:
+    name = "http"
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self._local = threading.local()
+
+    def request(self, method, path, body):
+        # One keep-alive connection per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        payload = json.dumps(body) if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload else {}
+        try:
+            conn.request(method, path, body=payload, headers=headers)
+            response = conn.getresponse()
+            data = response.read()
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            self._local.conn = None
+            raise
+        return response.status, len(data)
+
+
+def sample_ids(driver):
+    """Pick real ids for the detail scenarios from the first page of each list."""
+    ids = {}
+    for key, path in (("donor_id", "/api/donors?limit=200&fields=donor_id"),
+                      ("recipient_id", "/api/recipients?limit=200&fields=recipient_id")):
+        ids[key] = [1]
+        try:
+            if isinstance(driver, TestClientDriver):
+                rows = driver.app.test_client().get(path).get_json()["data"]
+            else:
+                conn = http.client.HTTPConnection(driver.host, driver.port, timeout=60)
+                conn.request("GET", path)
+                rows = json.loads(conn.getresponse().read())["data"]
+                conn.close()
+            ids[key] = [row[key] for row in rows] or [1]
+        except Exception as e:
+            print(f"Could not sample {key}s ({e}); using id 1")
+    return ids
+
+
+class Restocker:
+    """Inserts the pending work a write scenario consumes: blood requests
+    with a same-group unit for each, and organ requests with a matching organ
+    for each, for seeded recipients and donors."""
+
+    def __init__(self, rng):
+        from db_config import db_connection
+        from seed import PREFIX
+        self.db_connection = db_connection
+        self.rng = rng
+        with db_connection() as conn, conn.cursor() as cursor:
+            cursor.execute("SELECT donor_id, blood_group FROM donor WHERE name LIKE %s", (PREFIX + "%",))
+            self.donors = {}
+            for donor_id, group in cursor.fetchall():
+                self.donors.setdefault(group, []).append(donor_id)
+            cursor.execute("SELECT recipient_id, blood_group, organ_required FROM recipient WHERE name LIKE %s",
+                           (PREFIX + "%",))
+            self.recipients = [r for r in cursor.fetchall() if r[1] in self.donors]
+            cursor.execute("SELECT hospital_id FROM hospital")
+            self.hospitals = [row[0] for row in cursor.fetchall()]
+        if not self.recipients or not self.hospitals:
+            sys.exit("Write scenarios need seeded donors and recipients (bench/seed.py).")
+
+    def _insert(self, request_type, item_sql, count):
+        """Insert `count` (item, pending request) pairs; return [(item_id, request_id)]."""
+        pairs = []
+        with self.db_connection() as conn, conn.cursor() as cursor:
+            for _ in range(count):
+                recipient_id, group, organ = self.rng.choice(self.recipients)
+                donor_id = self.rng.choice(self.donors[group])
+                cursor.execute(item_sql, {"donor_id": donor_id, "organ": organ})
+                item_id = cursor.lastrowid
+                cursor.execute(
+                    "INSERT INTO requests (recipient_id, hospital_id, request_type, request_date, status) "
+                    "VALUES (%s, %s, %s, CURDATE(), 'Pending')",
+                    (recipient_id, self.rng.choice(self.hospitals), request_type))
+                pairs.append((item_id, cursor.lastrowid))
+            conn.commit()
+        return pairs
+
+    def _blood(self, count):
+        # The expiry trigger dates the unit from today, so it is never expired
+        return self._insert("Blood", "INSERT INTO donation (donor_id, quantity_ml, donation_date, donation_type) "
+                                     "VALUES (%(donor_id)s, 450, CURDATE(), 'Blood')", count)
+
+    def blood_pair(self):
+        ((donation_id, request_id),) = self._blood(1)
+        return {"donation_id": donation_id, "request_id": request_id}
+
+    def blood_backlog(self, count):
+        self._blood(count)
+        return {"limit": count}
+
+    def organ_batch(self, count):
+        pairs = self._insert("Organ", "INSERT INTO organ (donor_id, organ_type, status) "
+                                      "VALUES (%(donor_id)s, %(organ)s, 'Available')", count)
+        return {"organ_ids": [organ_id for organ_id, _ in pairs]}
+
+
+def run_scenario(driver, scenario, total, concurrency, ids, rng, stock=None):
+    name, method, path, body = scenario
+    latencies, statuses, sizes = [], {}, 0
+    lock = threading.Lock()
+
+    def one(_):
+        nonlocal sizes
+        target = path.format(donor_id=rng.choice(ids["donor_id"]), recipient_id=rng.choice(ids["recipient_id"]))
+        payload = body(stock) if callable(body) else body
+        start = time.perf_counter()
+        try:
+            status, size = driver.request(method, target, payload)
+        except Exception:
+            status, size = "error", 0
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            sizes += size
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(total)))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    ms = lambda v: round(v * 1000, 3) if v is not None else None  # noqa: E731
+    return {
+        "name": name,
+        "method": method,
+        "path": path,
+        "restocked": callable(body),
+        "requests": total,
+        "concurrency": concurrency,
+        "statuses": statuses,
+        "throughput_rps": round(total / wall, 2) if wall else None,
+        "latency_ms": {
+            "min": ms(latencies[0]), "p50": ms(percentile(latencies, 50)),
+            "p95": ms(percentile(latencies, 95)), "p99": ms(percentile(latencies, 99)),
+            "max": ms(latencies[-1]), "mean": ms(sum(latencies) / len(latencies)),
+        },
+        "avg_response_bytes": sizes // total,
+    }
+
+
+def max_rss_mb():
+    try:
+        import resource
+    except ImportError:   # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Blood Bank API.")
+    parser.add_argument("--url", help="benchmark a running server over HTTP instead of the test client")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario (default %(default)s)")
+    parser.add_argument("--concurrency", type=int, default=4, help="parallel clients (default %(default)s)")
+    parser.add_argument("--warmup", type=int, default=10, help="unmeasured requests per scenario first")
+    parser.add_argument("--only", help="comma separated scenario names")
+    parser.add_argument("--include-writes", action="store_true",
+                        help="also run fulfilment / allocation scenarios (they change data)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default="bench_results.json", help="JSON output path (default %(default)s)")
+    options = parser.parse_args()
+
+    scenarios = SCENARIOS + (WRITE_SCENARIOS if options.include_writes else [])
+    if options.only:
+        wanted = set(options.only.split(","))
+        scenarios = [s for s in scenarios if s[0] in wanted]
+
+    in_process = options.url is None
+    if in_process:
+        tracemalloc.start()
+    driver = HttpDriver(options.url) if options.url else TestClientDriver()
+    rng = random.Random(options.seed)
+    ids = sample_ids(driver)
+    stock = Restocker(rng) if any(callable(s[3]) for s in scenarios) else None
+
+    results = []
+    for scenario in scenarios:
+        if options.warmup:
+            run_scenario(driver, scenario, options.warmup, 1, ids, rng, stock)
+        if in_process:
+            tracemalloc.reset_peak()
+        result = run_scenario(driver, scenario, options.requests, options.concurrency, ids, rng, stock)
+        if in_process:
+            result["peak_traced_memory_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+        results.append(result)
+        lat = result["latency_ms"]
+        print(f"{result['name']:<28} p50 {lat['p50']:>9} ms  p95 {lat['p95']:>9} ms  "
+              f"p99 {lat['p99']:>9} ms  {result['throughput_rps']:>8} req/s  {result['statuses']}")
+
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "driver": driver.name,
+        "target": options.url or "in-process",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {k: getattr(options, k) for k in ("requests", "concurrency", "warmup", "seed")},
+        "scenarios": results,
+    }
+    # Over HTTP this process is only the load generator; the server's memory
+    # has to be measured on the server
+    report["max_rss_mb" if in_process else "client_max_rss_mb"] = max_rss_mb()
+    with open(options.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {options.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+# bench/seed.py
+# Seeds the configured MySQL database (see db_config.py) with a synthetic,
+# reproducible dataset for the benchmark suite.
+#
+#   python bench/seed.py --donors 10000            # 10k donors + proportional rest
+#   python bench/seed.py --donors 1000000 --seed 7
+#   python bench/seed.py --clean                   # remove everything seeded
+#
+# Seeded donors and recipients are named "bench-..." so --clean can find them
+# (and the donations, organs and requests hanging off them) again. Rows are
+# linked to the admins and hospitals that already exist.
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_config import db_connection  # noqa: E402
+
+BLOOD_GROUPS = ["O+", "A+", "B+", "O-", "A-", "AB+", "B-", "AB-"]
+BLOOD_WEIGHTS = [37, 30, 9, 7, 6, 4, 2, 1]
+ORGANS = ["Kidney", "Liver", "Heart", "Lung", "Pancreas", "Cornea"]
+GENDERS = ["Male", "Female"]
+PREFIX = "bench-"
+BATCH = 2000
+
+
+def insert_batches(conn, cursor, sql, rows, label):
+    started = time.perf_counter()
+    for start in range(0, len(rows), BATCH):
+        cursor.executemany(sql, rows[start:start + BATCH])
+        conn.commit()
+    print(f"  {label:<12} {len(rows):>9,} rows in {time.perf_counter() - started:.1f}s")
+
+
+def fetch_ids(cursor, sql, args=()):
+    cursor.execute(sql, args)
+    return [row[0] for row in cursor.fetchall()]
+
+
+def seed(donors, rng):
+    recipients = max(1, donors // 2)
+    donations = donors * 2
+    organs = max(1, donors // 10)
+    requests = max(1, donors // 2)
+    today = date.today()
+
+    with db_connection() as conn, conn.cursor() as cursor:
+        admin_codes = fetch_ids(cursor, "SELECT admin_code FROM admin")
+        hospital_ids = fetch_ids(cursor, "SELECT hospital_id FROM hospital")
+        if not admin_codes or not hospital_ids:
+            sys.exit("Seed needs at least one admin and one hospital to link rows to.")
+
+        print(f"Seeding {donors:,} donors, {recipients:,} recipients, {donations:,} donations, "
+              f"{organs:,} organs, {requests:,} requests")
+
+        insert_batches(conn, cursor,
+            "INSERT INTO donor (admin_code, name, age, gender, blood_group, contact, medical_history) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+            [(rng.choice(admin_codes), f"{PREFIX}donor-{i}", rng.randint(18, 65), rng.choice(GENDERS),
+              rng.choices(BLOOD_GROUPS, BLOOD_WEIGHTS)[0], f"555{i:07d}",
+              rng.choice(["None", "Hypertension", "Asthma", "Diabetes type 2", ""]))
+             for i in range(donors)],
+            "donor")
+        donor_ids = fetch_ids(cursor, "SELECT donor_id FROM donor WHERE name LIKE %s", (PREFIX + "%",))
+
+        insert_batches(conn, cursor,
+            "INSERT INTO recipient (admin_code, name, age, gender, blood_group, organ_required, contact) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+            [(rng.choice(admin_codes), f"{PREFIX}recipient-{i}", rng.randint(1, 85), rng.choice(GENDERS),
+              rng.choices(BLOOD_GROUPS, BLOOD_WEIGHTS)[0], rng.choice(ORGANS), f"556{i:07d}")
+             for i in range(recipients)],
+            "recipient")
+        recipient_ids = fetch_ids(cursor, "SELECT recipient_id FROM recipient WHERE name LIKE %s", (PREFIX + "%",))
+
+        # Spread over the last ~60 days so some units are expired and some are not
+        insert_batches(conn, cursor,
+            "INSERT INTO donation (donor_id, quantity_ml, donation_date, donation_type) "
+            "VALUES (%s, %s, %s, 'Blood')",
+            [(rng.choice(donor_ids), rng.choice([350, 450, 500]), today - timedelta(days=rng.randint(0, 60)))
+             for _ in range(donations)],
+            "donation")
+
+        insert_batches(conn, cursor,
+            "INSERT INTO organ (donor_id, organ_type, status) VALUES (%s, %s, 'Available')",
+            [(rng.choice(donor_ids), rng.choice(ORGANS)) for _ in range(organs)],
+            "organ")
+
+        insert_batches(conn, cursor,
+            "INSERT INTO requests (recipient_id, hospital_id, request_type, request_date, status) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            [(rng.choice(recipient_ids), rng.choice(hospital_ids), rng.choice(["Blood", "Organ"]),
+              today - timedelta(days=rng.randint(0, 365)), rng.choices(["Pending", "Fulfilled"], [3, 1])[0])
+             for _ in range(requests)],
+            "requests")
+
+
+def clean():
+    like = (PREFIX + "%",)
+    with db_connection() as conn, conn.cursor() as cursor:
+        for sql in (
+            "DELETE dr FROM donation_request dr JOIN donation d ON dr.donation_id = d.donation_id "
+            "JOIN donor dn ON d.donor_id = dn.donor_id WHERE dn.name LIKE %s",
+            "DELETE o FROM organ o JOIN donor dn ON o.donor_id = dn.donor_id WHERE dn.name LIKE %s",
+            "DELETE d FROM donation d JOIN donor dn ON d.donor_id = dn.donor_id WHERE dn.name LIKE %s",
+            "DELETE dr FROM donation_request dr JOIN requests r ON dr.request_id = r.request_id "
+            "JOIN recipient rec ON r.recipient_id = rec.recipient_id WHERE rec.name LIKE %s",
+            "UPDATE organ o JOIN requests r ON o.request_id = r.request_id "
+            "JOIN recipient rec ON r.recipient_id = rec.recipient_id "
+            "SET o.request_id = NULL WHERE rec.name LIKE %s",
+            "DELETE r FROM requests r JOIN recipient rec ON r.recipient_id = rec.recipient_id WHERE rec.name LIKE %s",
+            "DELETE FROM recipient WHERE name LIKE %s",
+            "DELETE FROM donor WHERE name LIKE %s",
+        ):
+            cursor.execute(sql, like)
+            print(f"  {cursor.rowcount:>9,} rows: {sql.split(' WHERE')[0][:60]}")
+        conn.commit()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Seed a synthetic benchmark dataset.")
+    parser.add_argument("--donors", type=int, default=10000,
+                        help="donor count; other tables scale from it (default %(default)s)")
+    parser.add_argument("--seed", type=int, default=42, help="random seed (default %(default)s)")
+    parser.add_argument("--clean", action="store_true", help="delete previously seeded rows and exit")
+    options = parser.parse_args()
+    if options.clean:
+        clean()
+    else:
+        seed(options.donors, random.Random(options.seed))
@@ -0,0 +1,175 @@
+# bulk_import.py
+# Bulk creation of donors, recipients and donations.
+#
+# Rows arrive as a JSON array or a CSV file, are all validated before the
+# database is touched, and are then inserted with executemany() (which
+# mysql.connector turns into multi-row INSERTs) in batches of `batch_size`
+# inside one transaction: one commit for the whole import instead of one per
+# row. Row-level triggers such as the donation expiry trigger still fire for
+# every row of a multi-row INSERT.
+import csv
+import io
+import os
+from datetime import date
+
+from mysql.connector import Error
+
+from transactions import RETRYABLE_ERRNOS
+
+BULK_BATCH_SIZE = int(os.environ.get("BULK_BATCH_SIZE", 500))
+BULK_MAX_ROWS = int(os.environ.get("BULK_MAX_ROWS", 50000))
+
+BLOOD_GROUPS = {"A+", "A-", "B+", "B-", "AB+", "AB-", "O+", "O-"}
+
+
+class BulkImportError(ValueError):
+    pass
+
+
+class RowsRejected(BulkImportError):
+    """The database refused some rows and skip_invalid was not set."""
+    def __init__(self, errors):
+        super().__init__(f"{len(errors)} rows rejected by the database")
+        self.errors = errors
+
+
+# --- Field validators: return the cleaned value or raise ValueError ---
+
+def text(value):
+    value = "" if value is None else str(value).strip()
+    if not value:
+        raise ValueError("is required")
+    return value
+
+
+def optional_text(value):
+    return "" if value is None else str(value).strip()
+
+
+def positive_int(value):
+    try:
+        number = int(str(value).strip())
+    except (TypeError, ValueError):
+        raise ValueError("must be an integer")
+    if number <= 0:
+        raise ValueError("must be greater than 0")
+    return number
+
+
+def iso_date(value):
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value).strip())
+    except ValueError:
+        raise ValueError("must be a date (YYYY-MM-DD)")
+
+
+def blood_group(value):
+    value = text(value).upper()
+    if value not in BLOOD_GROUPS:
+        raise ValueError("must be one of " + ", ".join(sorted(BLOOD_GROUPS)))
+    return value
+
+
+class ImportSpec:
+    def __init__(self, insert_sql, fields):
+        self.insert_sql = insert_sql
+        self.fields = fields      # [(name, validator)] in INSERT column order
+        self.field_names = [name for name, _ in fields]
+
+
+# --- Reading the payload ---
+
+def read_rows(req):
+    """Return the uploaded rows as a list of dicts (JSON array or CSV)."""
+    upload = req.files.get("file")
+    if upload is not None:
+        rows = _read_csv(upload.read())
+    elif req.mimetype == "text/csv":
+        rows = _read_csv(req.get_data())
+    else:
+        payload = req.get_json(silent=True)
+        if isinstance(payload, dict):
+            payload = payload.get("rows")
+        if not isinstance(payload, list):
+            raise BulkImportError("Send a JSON array of rows, {\"rows\": [...]}, or a CSV file")
+        rows = payload
+
+    if not rows:
+        raise BulkImportError("No rows to import")
+    if len(rows) > BULK_MAX_ROWS:
+        raise BulkImportError(f"Too many rows ({len(rows)}); the limit is {BULK_MAX_ROWS}")
+    return rows
+
+
+def _read_csv(raw):
+    try:
+        content = raw.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise BulkImportError("CSV must be UTF-8 encoded")
+    return list(csv.DictReader(io.StringIO(content)))
+
+
+# --- Validation and insert ---
+
+def validate(spec, rows):
+    """Split rows into [(row_number, args)] and [{"row": n, "errors": [...]}].
+
+    Row numbers are 1-based positions in the uploaded array / CSV body.
+    """
+    valid, errors = [], []
+    for number, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            errors.append({"row": number, "errors": ["row must be an object"]})
+            continue
+        args, row_errors = [], []
+        for name, validator in spec.fields:
+            try:
+                args.append(validator(row.get(name)))
+            except ValueError as e:
+                row_errors.append(f"{name} {e}")
+        if row_errors:
+            errors.append({"row": number, "errors": row_errors})
+        else:
+            valid.append((number, tuple(args)))
+    return valid, errors
+
+
+def insert_rows(cursor, spec, valid, batch_size):
+    """Insert validated rows batch by batch; returns (inserted, errors) where
+    inserted is [(new row id, args)] in input order.
+
+    Each batch runs under a savepoint. If the database rejects a batch (a
+    foreign key, say) it is rolled back and replayed row by row, so the
+    report can name the offending rows instead of the whole batch.
+    The caller decides whether to commit or roll back the transaction.
+    """
+    inserted, errors = [], []
+    for start in range(0, len(valid), batch_size):
+        batch = valid[start:start + batch_size]
+        cursor.execute("SAVEPOINT bulk_batch")
+        try:
+            cursor.executemany(spec.insert_sql, [args for _, args in batch])
+            # One multi-row INSERT: InnoDB reserves the ids of a multi-row
+            # VALUES insert in one step, so they run consecutively from the
+            # first one, which is what lastrowid reports.
+            first_id = cursor.lastrowid
+            inserted.extend((first_id + i, args) for i, (_, args) in enumerate(batch))
+            continue
+        except Error as e:
+            if e.errno in RETRYABLE_ERRNOS:
+                raise   # the whole transaction is gone; let the caller retry it
+            cursor.execute("ROLLBACK TO SAVEPOINT bulk_batch")
+
+        for number, args in batch:
+            cursor.execute("SAVEPOINT bulk_row")
+            try:
+                cursor.execute(spec.insert_sql, args)
+                inserted.append((cursor.lastrowid, args))
+            except Error as e:
+                if e.errno in RETRYABLE_ERRNOS:
+                    raise
+                cursor.execute("ROLLBACK TO SAVEPOINT bulk_row")
+                errors.append({"row": number, "errors": [str(e)]})
+    return inserted, errors
@@ -0,0 +1,32 @@
+# bundles.py
+# Runs the independent queries behind a page bundle concurrently.
+#
+# A bundle is {key: loader}; each loader borrows its own pooled connection
+# (fetch_all in app.py), so the bundle costs roughly its slowest query instead
+# of the sum of them. The request thread holds no connection while it waits,
+# so bundles cannot deadlock the pool, they only queue on it.
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+BUNDLE_WORKERS = int(os.environ.get("BUNDLE_WORKERS", 8))
+
+_executor = ThreadPoolExecutor(max_workers=BUNDLE_WORKERS, thread_name_prefix="bundle")
+
+
+def load_bundle(loaders):
+    """Run every loader at once and return {key: result}. The first error
+    is raised after all loaders have finished."""
+    # Each task runs in a copy of the caller's context so per-request
+    # instrumentation (metrics' query counter) sees the queries.
+    futures = {key: _executor.submit(contextvars.copy_context().run, loader)
+               for key, loader in loaders.items()}
+    results, error = {}, None
+    for key, future in futures.items():
+        try:
+            results[key] = future.result()
+        except Exception as e:
+            error = error or e
+    if error is not None:
+        raise error
+    return results
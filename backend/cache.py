@@ -0,0 +1,146 @@
+# cache.py
+# Pluggable read-through cache.
+#
+# Two backends with the same small interface (get / set / delete):
+#  * LRUCache:   in-process, bounded, per-entry TTL. The default.
+#  * RedisCache: any Redis-protocol server (Redis, Valkey, KeyDB...), shared by
+#                every worker so an invalidation in one is seen by all.
+#                Needs the optional `redis` package; enable with CACHE_URL.
+#
+# Callers invalidate explicitly after writes; TTLs only bound staleness for
+# changes the API never sees.
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_URL = os.environ.get("CACHE_URL", "")
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", 1024))
+
+# Worker processes serving the app (gunicorn.conf.py exports it). Anything
+# kept in process memory is only coherent when this is 1.
+WEB_WORKERS = int(os.environ.get("WEB_CONCURRENCY", 1))
+
+
+def is_redis_url(url):
+    return url.startswith(("redis://", "rediss://", "unix://"))
+
+
+class Cache:
+    shared = False   # True if every worker sees the same entries
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl):
+        raise NotImplementedError
+
+    def delete(self, *keys):
+        raise NotImplementedError
+
+    def add(self, key, value, ttl):
+        """Set only if the key is absent (or expired); True if it was set."""
+        raise NotImplementedError
+
+    def get_or_load(self, key, loader, ttl):
+        """Read-through: return the cached value, or call loader() and cache
+        its result. None results are not cached."""
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            if value is not None:
+                self.set(key, value, ttl)
+        return value
+
+
+class LRUCache(Cache):
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def add(self, key, value, ttl):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] >= time.monotonic():
+                return False
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCache(Cache):
+    # Values are pickled so dates and Decimals come back as the same types the
+    # MySQL cursor produced. Only ever point this at a server you trust.
+    shared = True
+
+    def __init__(self, url, prefix="bloodbank:"):
+        import redis   # optional dependency, only needed for this backend
+        self._redis = redis.Redis.from_url(url)
+        self._errors = (redis.RedisError,)
+        self.prefix = prefix
+
+    def get(self, key):
+        try:
+            raw = self._redis.get(self.prefix + key)
+        except self._errors as e:
+            print(f"Cache read failed: {e}")
+            return None
+        return None if raw is None else pickle.loads(raw)
+
+    def set(self, key, value, ttl):
+        try:
+            self._redis.set(self.prefix + key, pickle.dumps(value), px=max(1, int(ttl * 1000)))
+        except self._errors as e:
+            print(f"Cache write failed: {e}")
+
+    def delete(self, *keys):
+        if not keys:
+            return
+        try:
+            self._redis.delete(*[self.prefix + k for k in keys])
+        except self._errors as e:
+            print(f"Cache delete failed: {e}")
+
+    def add(self, key, value, ttl):
+        try:
+            return bool(self._redis.set(self.prefix + key, pickle.dumps(value), px=max(1, int(ttl * 1000)), nx=True))
+        except self._errors as e:
+            print(f"Cache write failed: {e}")
+            return True
+
+
+def create_cache(url=CACHE_URL, max_entries=CACHE_MAX_ENTRIES):
+    if is_redis_url(url):
+        return RedisCache(url)
+    return LRUCache(max_entries)
@@ -0,0 +1,178 @@
+# changefeed.py
+# Change feed for live updates, served as Server-Sent Events.
+#
+# Write handlers publish one event per change: {"entity", "op", "ids"}, with
+# op one of create / update / delete (ids may be empty for bulk imports, in
+# which case "count" says how many rows). Subscribers pick the entities they
+# care about (?topics=donor,organ) and apply the deltas instead of polling.
+#
+# Events are kept in a bounded in-memory history so a client that reconnects
+# with Last-Event-ID gets what it missed. If that is no longer possible
+# (history overflowed, or the process restarted) it gets a "reset" event and
+# should refetch.
+#
+# Each worker process has its own feed. With a Redis URL (CHANGE_FEED_URL,
+# defaulting to CACHE_URL) events are published over Redis pub/sub and every
+# worker relays them to its own subscribers, so a write on one worker reaches
+# clients connected to another.
+#
+# A stream occupies a server thread for as long as it is open, so streams are
+# capped per worker (SSE_MAX_SUBSCRIBERS, default half of WEB_THREADS and
+# never more than WEB_THREADS - 1) and closed after SSE_MAX_DURATION seconds;
+# EventSource reconnects on its own and resumes via Last-Event-ID.
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+
+CHANGE_FEED_URL = os.environ.get("CHANGE_FEED_URL", os.environ.get("CACHE_URL", ""))
+CHANGE_FEED_HISTORY = int(os.environ.get("CHANGE_FEED_HISTORY", 1000))
+# A stream holds one of the worker's WEB_THREADS threads for its whole life,
+# so the cap stays strictly below the thread count; the rest keep serving the
+# ordinary API requests.
+WEB_THREADS = int(os.environ.get("WEB_THREADS", 4))
+SSE_MAX_SUBSCRIBERS = min(int(os.environ.get("SSE_MAX_SUBSCRIBERS", max(1, WEB_THREADS // 2))),
+                          max(1, WEB_THREADS - 1))
+SSE_MAX_DURATION = float(os.environ.get("SSE_MAX_DURATION", 300))
+SSE_HEARTBEAT = float(os.environ.get("SSE_HEARTBEAT", 15))
+SSE_RETRY_MS = 3000
+
+TOPICS = ("donor", "recipient", "requests", "donation", "organ")
+OPERATIONS = ("create", "update", "delete")
+
+
+class TooManySubscribers(Exception):
+    pass
+
+
+class ChangeFeed:
+    def __init__(self, history=CHANGE_FEED_HISTORY, max_subscribers=SSE_MAX_SUBSCRIBERS,
+                 redis_url=CHANGE_FEED_URL, channel="bloodbank:changes"):
+        self.boot_id = uuid.uuid4().hex[:8]
+        self.max_subscribers = max_subscribers
+        self._events = deque(maxlen=history)
+        self._seq = 0
+        self._subscribers = 0
+        self._cond = threading.Condition()
+        self._redis = None
+        self._channel = channel
+        if redis_url.startswith(("redis://", "rediss://", "unix://")):
+            self._start_relay(redis_url)
+
+    # --- publishing ---
+
+    def publish(self, entity, op, ids=(), **extra):
+        event = {"entity": entity, "op": op, "ids": list(ids),
+                 "at": datetime.now(timezone.utc).isoformat(timespec="milliseconds"), **extra}
+        if self._redis is not None:
+            try:
+                self._redis.publish(self._channel, json.dumps(event, default=str))
+                return
+            except self._redis_errors as e:
+                print(f"Change feed publish failed, delivering locally only: {e}")
+        self._append(event)
+
+    def _append(self, event):
+        with self._cond:
+            self._seq += 1
+            self._events.append(dict(event, seq=self._seq))
+            self._cond.notify_all()
+
+    def _start_relay(self, url):
+        import redis   # optional dependency, only needed for cross-worker fan-out
+        self._redis = redis.Redis.from_url(url)
+        self._redis_errors = (redis.RedisError,)
+
+        def run():
+            while True:
+                try:
+                    pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                    pubsub.subscribe(self._channel)
+                    for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self._append(json.loads(message["data"]))
+                except Exception as e:
+                    print(f"Change feed relay failed, reconnecting: {e}")
+                    time.sleep(1)
+
+        threading.Thread(target=run, name="change-feed-relay", daemon=True).start()
+
+    # --- subscribing ---
+
+    def parse_last_event_id(self, value):
+        """Sequence number to resume after, or None if the id is unusable."""
+        if not value:
+            return self.current()
+        boot_id, _, seq = value.partition("-")
+        if boot_id != self.boot_id or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def current(self):
+        with self._cond:
+            return self._seq
+
+    def _since(self, seq):
+        """(events after seq, gap) where gap means some were already dropped."""
+        with self._cond:
+            gap = seq > self._seq or (self._events and seq < self._events[0]["seq"] - 1)
+            return [e for e in self._events if e["seq"] > seq], bool(gap)
+
+    def stream(self, topics, after, heartbeat=SSE_HEARTBEAT, max_duration=SSE_MAX_DURATION):
+        """Iterable of SSE frames for events on `topics` after sequence
+        `after` (None: send a reset first). Raises TooManySubscribers if the
+        worker is at its limit. The slot is released when the response
+        closes it, even if it was never iterated."""
+        with self._cond:
+            if self._subscribers >= self.max_subscribers:
+                raise TooManySubscribers(f"At most {self.max_subscribers} live streams per worker")
+            self._subscribers += 1
+        return _Subscription(self, self._frames(set(topics), after, heartbeat, max_duration))
+
+    def _release(self):
+        with self._cond:
+            self._subscribers -= 1
+
+    def _frames(self, topics, after, heartbeat, max_duration):
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        if after is None:
+            after = self.current()
+            yield self._frame("reset", {"reason": "history unavailable, refetch"}, after)
+        deadline = time.monotonic() + max_duration
+        while time.monotonic() < deadline:
+            events, gap = self._since(after)
+            if gap:
+                after = self.current()
+                yield self._frame("reset", {"reason": "missed events, refetch"}, after)
+                continue
+            for event in events:
+                after = event["seq"]
+                if event["entity"] in topics:
+                    yield self._frame("change", event, after)
+            timeout = min(heartbeat, max(0, deadline - time.monotonic()))
+            with self._cond:
+                woken = self._cond.wait_for(lambda: self._seq > after, timeout)
+            if not woken:
+                yield ": keep-alive\n\n"
+
+    def _frame(self, kind, data, seq):
+        data = {k: v for k, v in data.items() if k != "seq"}
+        return f"id: {self.boot_id}-{seq}\nevent: {kind}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class _Subscription:
+    def __init__(self, feed, frames):
+        self._feed, self._frames = feed, frames
+        self._closed = False
+
+    def __iter__(self):
+        return self._frames
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._frames.close()
+            self._feed._release()
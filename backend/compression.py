@@ -0,0 +1,58 @@
+# compression.py
+# Response compression negotiated from Accept-Encoding.
+#
+# Brotli (pip install brotli) is preferred when the client accepts it, then
+# gzip. Only buffered responses with a compressible type and at least
+# COMPRESS_MIN_SIZE bytes are compressed; streamed responses (exports, the
+# event stream) are left alone so they keep flowing chunk by chunk. Put a
+# reverse proxy in front that compresses and you can set COMPRESS_LEVEL=0 to
+# turn this off.
+import gzip
+import os
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:   # optional dependency
+    brotli = None
+
+COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", 1024))
+COMPRESS_LEVEL = int(os.environ.get("COMPRESS_LEVEL", 5))       # gzip 1-9, 0 disables
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", 4))       # 0-11; 4 suits dynamic responses
+
+COMPRESSIBLE = ("application/json", "text/csv", "text/plain", "application/x-ndjson")
+
+
+def _choose_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+
+def init_app(app):
+    @app.after_request
+    def compress(response):
+        if not COMPRESS_LEVEL or request.method == "HEAD":
+            return response
+        response.vary.add("Accept-Encoding")
+        if (response.status_code != 200 or response.is_streamed or response.direct_passthrough
+                or "Content-Encoding" in response.headers
+                or response.mimetype not in COMPRESSIBLE):
+            return response
+        encoding = _choose_encoding()
+        if encoding is None:
+            return response
+        body = response.get_data()
+        if len(body) < COMPRESS_MIN_SIZE:
+            return response
+        if encoding == "br":
+            body = brotli.compress(body, quality=BROTLI_QUALITY)
+        else:
+            body = gzip.compress(body, compresslevel=COMPRESS_LEVEL, mtime=0)
+        response.set_data(body)
+        response.headers["Content-Encoding"] = encoding
+        return response
@@ -0,0 +1,150 @@
+# conditional.py
+# ETag / Last-Modified support for GET endpoints.
+#
+# Each table has a version counter that write handlers bump (via
+# tables_changed in app.py). A GET marked with @conditional("donor", ...) gets
+# an ETag derived from the versions of the tables it reads, so a client that
+# sends back a matching If-None-Match is answered 304 before the handler runs,
+# without a database round trip.
+#
+# Versions must be the same in every worker, or a write handled by one worker
+# leaves the others answering 304 for the old data:
+#  * with a Redis URL (CACHE_URL) they are Redis hash counters shared by all
+#    workers;
+#  * otherwise they live in process memory, which is only used when there is
+#    a single worker (WEB_CONCURRENCY=1, waitress, the dev server). With
+#    several workers and no Redis, no ETags are emitted at all.
+# ETAG_MAX_AGE still rolls ETags over every ETAG_MAX_AGE seconds, for changes
+# no write handler sees (manual SQL, admin and hospital, a Redis restart).
+import hashlib
+import os
+import threading
+import time
+import uuid
+from datetime import date, datetime, timezone
+
+from flask import Response, g, request
+
+from cache import CACHE_URL, WEB_WORKERS, is_redis_url
+
+ETAG_MAX_AGE = int(os.environ.get("ETAG_MAX_AGE", 300))
+
+
+class TableVersions:
+    def __init__(self, redis_url=CACHE_URL, prefix="bloodbank:tables:"):
+        self.boot_id = uuid.uuid4().hex[:8]
+        self._started = time.time()
+        self._versions = {}
+        self._modified = {}
+        self._lock = threading.Lock()
+        self._redis = None
+        if is_redis_url(redis_url):
+            import redis   # optional dependency, only needed for shared versions
+            self._redis = redis.Redis.from_url(redis_url)
+            self._errors = (redis.RedisError,)
+            self._versions_key, self._modified_key = prefix + "versions", prefix + "modified"
+            self.boot_id = "shared"
+        self.shared = self._redis is not None
+        # Process-local versions are fine as long as this is the only process
+        self.coherent = self.shared or WEB_WORKERS <= 1
+
+    def bump(self, *tables):
+        now = time.time()
+        if self._redis is not None:
+            try:
+                pipe = self._redis.pipeline()
+                for table in tables:
+                    pipe.hincrby(self._versions_key, table, 1)
+                pipe.hset(self._modified_key, mapping={table: now for table in tables})
+                pipe.execute()
+            except self._errors as e:
+                print(f"Table version bump failed: {e}")
+            return
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+                self._modified[table] = now
+
+    def snapshot(self, tables):
+        """(versions, last_modified_timestamp) for the given tables, or
+        (None, None) if the shared versions cannot be read."""
+        if self._redis is not None:
+            try:
+                pipe = self._redis.pipeline()
+                pipe.hmget(self._versions_key, tables)
+                pipe.hmget(self._modified_key, tables)
+                versions, modified = pipe.execute()
+            except self._errors as e:
+                print(f"Table version read failed: {e}")
+                return None, None
+            return (tuple(int(v or 0) for v in versions),
+                    max(float(m) if m else self._started for m in modified))
+        with self._lock:
+            versions = tuple(self._versions.get(t, 0) for t in tables)
+            modified = max(self._modified.get(t, self._started) for t in tables)
+        return versions, modified
+
+
+def conditional(*tables, daily=False):
+    """Mark a GET view as cacheable on the versions of `tables`.
+
+    daily=True is for results that also depend on CURDATE() (expiry checks),
+    so their ETag changes at midnight even if no table did."""
+    def decorator(view):
+        view.etag_tables = tables
+        view.etag_daily = daily
+        return view
+    return decorator
+
+
+def init_app(app, versions):
+    if not versions.coherent:
+        print(f"ETags disabled: {WEB_WORKERS} workers and no CACHE_URL to share table versions")
+        return
+
+    @app.before_request
+    def check_conditional_get():
+        if request.method not in ("GET", "HEAD"):
+            return None
+        view = app.view_functions.get(request.endpoint)
+        tables = getattr(view, "etag_tables", None)
+        if not tables:
+            return None
+
+        table_versions, modified = versions.snapshot(tables)
+        if table_versions is None:
+            return None
+        epoch = int(time.time() // ETAG_MAX_AGE)
+        key = [versions.boot_id, str(epoch), request.full_path, repr(table_versions)]
+        if view.etag_daily:
+            key.append(date.today().isoformat())
+        etag = hashlib.sha1("|".join(key).encode()).hexdigest()[:20]
+        last_modified = datetime.fromtimestamp(
+            max(modified, epoch * ETAG_MAX_AGE), tz=timezone.utc
+        ).replace(microsecond=0)
+        g.etag, g.last_modified = etag, last_modified
+
+        if request.if_none_match:
+            fresh = request.if_none_match.contains_weak(etag)
+        elif request.if_modified_since and not view.etag_daily:
+            fresh = last_modified <= request.if_modified_since
+        else:
+            fresh = False
+        if fresh:
+            response = Response(status=304)
+            _add_validators(response)
+            return response
+        return None
+
+    @app.after_request
+    def add_validators(response):
+        if response.status_code == 200 and "etag" in g:
+            _add_validators(response)
+        return response
+
+
+def _add_validators(response):
+    response.set_etag(g.etag, weak=True)
+    response.last_modified = g.last_modified
+    # Let browsers keep the body but revalidate it on every use
+    response.headers["Cache-Control"] = "no-cache"
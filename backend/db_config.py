@@ -1,16 +1,96 @@
 # db_config.py
+import os
+from contextlib import contextmanager
+
 import mysql.connector
 from mysql.connector import Error, connect
 
+from db_pool import ConnectionPool, PoolError
+from metrics import InstrumentedConnection, observe_pool_checkout
+
+DB_CONFIG = {
+    "host": os.environ.get("DB_HOST", "localhost"),
+    "user": os.environ.get("DB_USER", "root"),
+    "password": os.environ.get("DB_PASSWORD", "DataBasePassword"),
+    "database": os.environ.get("DB_NAME", "blood_bank_db_v2"),
+    # Lets a cursor be closed (and the connection reused) even if the handler
+    # only fetched part of the result, e.g. fetchone() on a single-row query.
+    "consume_results": True,
+}
+
+# --- Pool settings (override through the environment) ---
+POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+POOL_MAX_OVERFLOW = int(os.environ.get("DB_POOL_MAX_OVERFLOW", 10))
+POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 3600))
+POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "1") != "0"
+
+
+class DatabaseUnavailable(Exception):
+    pass
+
+
 def get_db_connection():
     try:
-        conn = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="DataBasePassword",
-            database="blood_bank_db_v2"
-        )
-        return conn
+        conn = mysql.connector.connect(**DB_CONFIG)
+        # Times every statement for /metrics (see metrics.py)
+        return InstrumentedConnection(conn)
     except Error as e:
         print(f"Error connecting to MySQL: {e}")
         return None
+
+
+pool = ConnectionPool(
+    get_db_connection,
+    size=POOL_SIZE,
+    max_overflow=POOL_MAX_OVERFLOW,
+    timeout=POOL_TIMEOUT,
+    recycle=POOL_RECYCLE,
+    pre_ping=POOL_PRE_PING,
+    on_checkout=observe_pool_checkout,
+)
+
+
+def acquire_connection():
+    """Check out a pool entry by hand, for connections that have to outlive a
+    `with` block (streamed responses). Return it with pool.release()."""
+    try:
+        return pool.acquire()
+    except PoolError as e:
+        raise DatabaseUnavailable(str(e)) from e
+
+
+@contextmanager
+def db_connection():
+    """Borrow a pooled connection; it is always returned, even on errors."""
+    entry = acquire_connection()
+    try:
+        yield entry.conn
+    except Exception:
+        try:
+            entry.conn.rollback()
+        except Error:
+            pass
+        raise
+    finally:
+        pool.release(entry)
+
+
+# Routines the API calls; checked at startup so a missing one fails the deploy
+# rather than the first request that needs it.
+REQUIRED_ROUTINES = ("sp_FulfillBloodRequest", "fn_IsBloodUnitExpired", "fn_GetPendingRequestCount")
+
+
+def check_database():
+    """Return a list of problems with the configured database (empty if OK)."""
+    try:
+        with db_connection() as conn, conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+            cursor.execute(
+                "SELECT ROUTINE_NAME FROM information_schema.ROUTINES WHERE ROUTINE_SCHEMA = DATABASE()"
+            )
+            present = {row[0] for row in cursor.fetchall()}
+    except (DatabaseUnavailable, Error) as e:
+        return [f"Cannot reach MySQL at {DB_CONFIG['host']}: {e}"]
+    return [f"Missing routine: {name}" for name in REQUIRED_ROUTINES if name not in present]
@@ -0,0 +1,168 @@
+# db_pool.py
+# A small, thread-safe MySQL connection pool.
+#
+# mysql.connector's built-in pooling has a hard size limit, no overflow, no
+# checkout timeout and no recycling, so we keep our own: a LIFO stack of idle
+# connections (the most recently used connection is the one most likely to
+# still be alive), up to `size` kept open, plus up to `max_overflow` extra
+# connections that are opened under load and closed again when returned.
+#
+# Waiters sleep on a Condition that is notified both when a connection comes
+# back and when one is closed (discarded, or failed to open), since either
+# lets a waiter proceed: the first by reusing it, the second by opening a new
+# one in the freed slot.
+import threading
+import time
+
+from mysql.connector import Error
+
+
+class PoolError(Exception):
+    pass
+
+
+class PoolTimeout(PoolError):
+    pass
+
+
+class _PoolEntry:
+    __slots__ = ("conn", "created_at")
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = time.monotonic()
+
+
+class ConnectionPool:
+    def __init__(self, creator, size=5, max_overflow=10, timeout=30.0,
+                 recycle=3600, pre_ping=True, on_checkout=None):
+        self._creator = creator
+        self._on_checkout = on_checkout   # called with the seconds spent waiting
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+
+        self._idle = []         # LIFO stack of _PoolEntry
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._open = 0          # connections currently open (idle + checked out)
+        self._checked_out = 0
+
+    # --- Bookkeeping ---
+
+    def status(self):
+        with self._lock:
+            return {
+                "size": self.size,
+                "max_overflow": self.max_overflow,
+                "open": self._open,
+                "checked_out": self._checked_out,
+                "idle": len(self._idle),
+            }
+
+    def _new_entry(self):
+        try:
+            conn = self._creator()
+        except Exception:
+            self._free_slot()
+            raise
+        if conn is None:
+            self._free_slot()
+            raise PoolError("Could not open a database connection")
+        return _PoolEntry(conn)
+
+    def _free_slot(self):
+        with self._available:
+            self._open -= 1
+            self._available.notify()
+
+    def _discard(self, entry, hard=False):
+        self._free_slot()
+        try:
+            if hard:
+                # Drop the socket without a QUIT, which would first drain
+                # any unread result set.
+                entry.conn.shutdown()
+            else:
+                entry.conn.close()
+        except Exception:
+            pass
+
+    def _is_usable(self, entry):
+        if self.recycle is not None and self.recycle >= 0 \
+                and time.monotonic() - entry.created_at > self.recycle:
+            return False
+        if self.pre_ping:
+            try:
+                entry.conn.ping(reconnect=False)
+            except Error:
+                return False
+        return True
+
+    # --- Checkout / return ---
+
+    def acquire(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        while True:
+            with self._available:
+                while True:
+                    if self._idle:
+                        entry = self._idle.pop()
+                        break
+                    if self._open < self.size + self.max_overflow:
+                        self._open += 1
+                        entry = None
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeout(
+                            "Timed out after %.1fs waiting for a database connection" % self.timeout
+                        )
+                    self._available.wait(remaining)
+            if entry is None:
+                entry = self._new_entry()
+
+            if not self._is_usable(entry):
+                # Stale or broken: drop it and open a fresh one in its place.
+                self._discard(entry)
+                continue
+
+            with self._lock:
+                self._checked_out += 1
+            if self._on_checkout is not None:
+                self._on_checkout(time.monotonic() - started)
+            return entry
+
+    def release(self, entry, discard=False):
+        with self._lock:
+            self._checked_out -= 1
+        if discard:
+            # e.g. a streamed result abandoned half way through
+            self._discard(entry, hard=True)
+            return
+        conn = entry.conn
+        try:
+            # Never hand the next borrower an open transaction (or a stale
+            # REPEATABLE READ snapshot left behind by a plain SELECT).
+            if conn.in_transaction:
+                conn.rollback()
+        except Error:
+            self._discard(entry)
+            return
+
+        with self._available:
+            keep = len(self._idle) < self.size
+            if keep:
+                self._idle.append(entry)
+                self._available.notify()
+        if not keep:
+            self._discard(entry)
+
+    def dispose(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for entry in idle:
+            self._discard(entry)
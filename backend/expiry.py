@@ -0,0 +1,133 @@
+# expiry.py
+# Set-based expiry checks and the expiry sweeper.
+#
+# A unit counts as expired once expiry_date <= today, the same rule
+# /api/donations/available uses (expiry_date > CURDATE() means usable), so one
+# query can classify any number of units instead of calling
+# fn_IsBloodUnitExpired once per donation.
+#
+# Run `python expiry.py --horizon 3` from cron for a nightly report, or set
+# EXPIRY_SWEEP_INTERVAL (seconds) to have the API sweep on its own (in one
+# worker only, see jobs.py).
+import argparse
+import json
+import os
+from datetime import date
+
+from db_config import db_connection
+from jobs import start_job
+
+EXPIRY_HORIZON_DAYS = int(os.environ.get("EXPIRY_HORIZON_DAYS", 3))
+MAX_BATCH_IDS = 1000
+
+STATUS_SQL = """
+    CASE WHEN d.expiry_date <= CURDATE() THEN 'Expired' ELSE 'Valid' END AS status
+"""
+
+
+def _placeholders(values):
+    return ", ".join(["%s"] * len(values))
+
+
+def parse_ids(raw):
+    """Accept a list of ints or a comma separated string; raise ValueError."""
+    if isinstance(raw, str):
+        raw = [part for part in raw.split(",") if part.strip()]
+    if not isinstance(raw, list) or not raw:
+        raise ValueError("'ids' must be a non-empty list of integers")
+    try:
+        ids = sorted({int(i) for i in raw})
+    except (TypeError, ValueError):
+        raise ValueError("'ids' must be a non-empty list of integers")
+    if len(ids) > MAX_BATCH_IDS:
+        raise ValueError(f"At most {MAX_BATCH_IDS} ids per call")
+    return ids
+
+
+def expiry_status_by_ids(cursor, ids):
+    cursor.execute(f"""
+        SELECT d.donation_id, d.expiry_date, {STATUS_SQL}
+        FROM donation d
+        WHERE d.donation_id IN ({_placeholders(ids)})
+    """, tuple(ids))
+    return cursor.fetchall()
+
+
+def expiry_status_by_window(cursor, expiry_from=None, expiry_to=None):
+    conditions, params = ["d.donation_type = 'Blood'"], []
+    if expiry_from is not None:
+        conditions.append("d.expiry_date >= %s")
+        params.append(expiry_from)
+    if expiry_to is not None:
+        conditions.append("d.expiry_date <= %s")
+        params.append(expiry_to)
+    cursor.execute(f"""
+        SELECT d.donation_id, d.expiry_date, {STATUS_SQL}
+        FROM donation d
+        WHERE {" AND ".join(conditions)}
+        ORDER BY d.expiry_date, d.donation_id
+    """, tuple(params))
+    return cursor.fetchall()
+
+
+def pending_counts(cursor, recipient_ids):
+    cursor.execute(f"""
+        SELECT rec.recipient_id, COUNT(r.request_id) AS pending_count
+        FROM recipient rec
+        LEFT JOIN requests r ON r.recipient_id = rec.recipient_id AND r.status = 'Pending'
+        WHERE rec.recipient_id IN ({_placeholders(recipient_ids)})
+        GROUP BY rec.recipient_id
+    """, tuple(recipient_ids))
+    return cursor.fetchall()
+
+
+def sweep(cursor, horizon_days=EXPIRY_HORIZON_DAYS):
+    """Report unused blood units that expire within `horizon_days`, and unused
+    units that have already expired and should be discarded."""
+    cursor.execute("""
+        SELECT d.donation_id, dn.blood_group, d.quantity_ml, d.expiry_date,
+               DATEDIFF(d.expiry_date, CURDATE()) AS days_left
+        FROM donation d
+        JOIN donor dn ON d.donor_id = dn.donor_id
+        WHERE d.donation_type = 'Blood'
+          AND d.expiry_date <= CURDATE() + INTERVAL %s DAY
+          AND NOT EXISTS (SELECT 1 FROM donation_request dr WHERE dr.donation_id = d.donation_id)
+        ORDER BY d.expiry_date, d.donation_id
+    """, (horizon_days,))
+    expiring, expired = [], []
+    for row in cursor.fetchall():
+        (expired if row["days_left"] <= 0 else expiring).append(row)
+    return {
+        "swept_at": date.today().isoformat(),
+        "horizon_days": horizon_days,
+        "expiring": expiring,
+        "expired": expired,
+    }
+
+
+# --- Background sweeper ---
+
+REPORT_KEY = "expiry:last_report"
+
+
+def start_sweeper(interval, report_cache, horizon_days=EXPIRY_HORIZON_DAYS):
+    """Sweep every `interval` seconds in one process (see jobs.py); the latest
+    report is kept in `report_cache` under REPORT_KEY."""
+    def run():
+        with db_connection() as conn, conn.cursor(dictionary=True) as cursor:
+            report = sweep(cursor, horizon_days)
+        report_cache.set(REPORT_KEY, report, interval * 2 + 60)
+        print("Expiry sweep: %d expiring within %d days, %d expired" % (
+            len(report["expiring"]), horizon_days, len(report["expired"])))
+
+    return start_job("expiry-sweeper", interval, run)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Report blood units that are about to expire.")
+    parser.add_argument("--horizon", type=int, default=EXPIRY_HORIZON_DAYS,
+                        help="days ahead to look (default %(default)s)")
+    options = parser.parse_args()
+    with db_connection() as conn, conn.cursor(dictionary=True) as cursor:
+        report = sweep(cursor, options.horizon)
+    print(json.dumps(report, default=str, indent=2))
@@ -0,0 +1,88 @@
+# export.py
+# Streams a list query from MySQL to the client without ever holding the full
+# result in memory: the default (unbuffered) mysql.connector cursor reads rows
+# off the socket as we ask for them, we pull them EXPORT_BATCH_SIZE at a time
+# with fetchmany() and hand each encoded batch to Flask as one response chunk.
+import csv
+import io
+import os
+
+from flask import Response
+
+from db_config import acquire_connection, pool
+
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", 1000))
+
+MIMETYPES = {
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+    "csv": "text/csv",
+}
+
+
+def _encode_json(columns, rows, dumps):
+    return [dumps(dict(zip(columns, row))) for row in rows]
+
+
+def _encode_csv(rows):
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    return buf.getvalue()
+
+
+def stream_export(query, fmt, dumps, filename):
+    """Run `query` and return a streaming Response in `fmt` (ndjson/json/csv).
+
+    The pooled connection stays checked out until the response is closed.
+    If the client goes away half way, the connection is dropped rather than
+    returned, since draining the rest of the result could take minutes.
+    """
+    entry = acquire_connection()
+    try:
+        cursor = entry.conn.cursor()
+        cursor.execute(query.sql, query.params)
+    except Exception:
+        pool.release(entry)
+        raise
+
+    columns = cursor.column_names
+    state = {"done": False}
+
+    def generate():
+        if fmt == "csv":
+            yield _encode_csv([columns])
+        elif fmt == "json":
+            yield "["
+
+        first = True
+        while True:
+            rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+            if not rows:
+                break
+            if fmt == "csv":
+                yield _encode_csv(rows)
+            elif fmt == "json":
+                chunk = ",".join(_encode_json(columns, rows, dumps))
+                yield chunk if first else "," + chunk
+            else:
+                yield "\n".join(_encode_json(columns, rows, dumps)) + "\n"
+            first = False
+
+        if fmt == "json":
+            yield "]"
+        state["done"] = True
+
+    def close():
+        if state["done"]:
+            cursor.close()
+            pool.release(entry)
+        else:
+            pool.release(entry, discard=True)
+
+    response = Response(generate(), mimetype=MIMETYPES[fmt])
+    response.call_on_close(close)
+    # Ask reverse proxies not to buffer the whole body before sending it on
+    response.headers["X-Accel-Buffering"] = "no"
+    if fmt == "csv":
+        response.headers["Content-Disposition"] = f'attachment; filename="{filename}.csv"'
+    return response
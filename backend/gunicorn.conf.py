@@ -0,0 +1,55 @@
+# gunicorn.conf.py
+# Production settings for `gunicorn -c gunicorn.conf.py wsgi:app` (Linux/macOS).
+#
+# Each worker is a separate process with its own connection pool; within a
+# worker, `threads` requests run concurrently while others wait on MySQL.
+# Keep DB_POOL_SIZE + DB_POOL_MAX_OVERFLOW >= threads, and
+# workers * (DB_POOL_SIZE + DB_POOL_MAX_OVERFLOW) below MySQL's max_connections.
+import multiprocessing
+import os
+import sys
+
+bind = os.environ.get("BIND", "0.0.0.0:%s" % os.environ.get("PORT", "5000"))
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+# Workers inherit this, so the app knows whether per-process state (table
+# versions, the LRU cache) is safe to use (cache.WEB_WORKERS)
+os.environ["WEB_CONCURRENCY"] = str(workers)
+worker_class = "gthread"
+threads = int(os.environ.get("WEB_THREADS", 4))
+# Each open /api/events stream (Server-Sent Events) keeps one of these threads
+# busy for up to SSE_MAX_DURATION seconds. changefeed.py therefore allows at
+# most threads // 2 streams per worker by default (SSE_MAX_SUBSCRIBERS, capped
+# at threads - 1), so live dashboards can never take every thread away from
+# the ordinary API requests. Raise WEB_THREADS if you need more streams.
+
+timeout = int(os.environ.get("WEB_TIMEOUT", 60))
+# On SIGTERM, workers get this long to finish in-flight requests
+graceful_timeout = int(os.environ.get("WEB_GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+
+# Recycle workers now and then to cap slow memory growth
+max_requests = int(os.environ.get("WEB_MAX_REQUESTS", 5000))
+max_requests_jitter = max_requests // 10
+
+accesslog = "-"
+errorlog = "-"
+
+
+def on_starting(server):
+    """Startup check in the master: refuse to start against a broken database."""
+    if os.environ.get("SKIP_DB_CHECK") == "1":
+        return
+    import db_config
+    problems = db_config.check_database()
+    # Don't let forked workers inherit the master's check connection
+    db_config.pool.dispose()
+    if problems:
+        for problem in problems:
+            server.log.error(problem)
+        sys.exit(1)
+
+
+def worker_exit(server, worker):
+    """Graceful shutdown: close this worker's pooled connections."""
+    import db_config
+    db_config.pool.dispose()
@@ -0,0 +1,78 @@
+# idempotency.py
+# Idempotency-Key support for write endpoints.
+#
+# A client that may retry a POST/PUT/DELETE (timeouts, flaky networks) sends
+# an Idempotency-Key header, the same value on every attempt. The first
+# request with a key runs normally and its response is stored; any later
+# request with that key gets the stored response back (marked with
+# Idempotent-Replayed: true) instead of writing again.
+#
+#  * A replay while the first request is still running gets 409 with
+#    Retry-After, never a second execution.
+#  * Reusing a key with a different body or query string is a client bug: 422.
+#  * 5xx responses (and exceptions) are not stored, so those can be retried.
+#
+# Keys live in a Cache backend (cache.py). With the in-process LRU they are
+# per worker; set CACHE_URL to share them across workers and restarts.
+import functools
+import hashlib
+import os
+
+from flask import Response, jsonify, make_response, request
+
+IDEMPOTENCY_TTL = float(os.environ.get("IDEMPOTENCY_TTL", 24 * 3600))
+IDEMPOTENCY_LOCK_TTL = float(os.environ.get("IDEMPOTENCY_LOCK_TTL", 120))
+IDEMPOTENCY_MAX_KEYS = int(os.environ.get("IDEMPOTENCY_MAX_KEYS", 10000))
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyStore:
+    """Decorator for write views; apply it under @app.route."""
+
+    def __init__(self, cache, ttl=IDEMPOTENCY_TTL, lock_ttl=IDEMPOTENCY_LOCK_TTL):
+        self.cache, self.ttl, self.lock_ttl = cache, ttl, lock_ttl
+
+    def __call__(self, view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            key = request.headers.get("Idempotency-Key")
+            if not key:
+                return view(*args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                return jsonify({"error": f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters"}), 400
+
+            store_key = f"idempotency:{request.method}:{request.path}:{key}"
+            # Options such as ?skip_invalid= change what the request does
+            fingerprint = hashlib.sha256(request.query_string + b"\n" + request.get_data()).hexdigest()
+            if not self.cache.add(store_key, {"fingerprint": fingerprint}, self.lock_ttl):
+                return self._replay(self.cache.get(store_key), fingerprint)
+
+            try:
+                response = make_response(view(*args, **kwargs))
+            except Exception:
+                self.cache.delete(store_key)
+                raise
+            if response.status_code >= 500 or response.is_streamed:
+                self.cache.delete(store_key)
+                return response
+            self.cache.set(store_key, {
+                "fingerprint": fingerprint,
+                "status": response.status_code,
+                "body": response.get_data(),
+                "mimetype": response.mimetype,
+            }, self.ttl)
+            return response
+        return wrapper
+
+    @staticmethod
+    def _replay(saved, fingerprint):
+        if saved is None or "status" not in saved:
+            response = jsonify({"error": "A request with this Idempotency-Key is still in progress"})
+            response.status_code = 409
+            response.headers["Retry-After"] = "1"
+            return response
+        if saved["fingerprint"] != fingerprint:
+            return jsonify({"error": "Idempotency-Key was already used with a different request"}), 422
+        response = Response(saved["body"], status=saved["status"], mimetype=saved["mimetype"])
+        response.headers["Idempotent-Replayed"] = "true"
+        return response
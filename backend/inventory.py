@@ -0,0 +1,162 @@
+# inventory.py
+# Reads and reconciles the inventory summary tables (migration 0003).
+#
+# inventory_blood (blood group x expiry day, unused units only) and
+# inventory_organ (organ type x status) are kept current by triggers, so the
+# summary endpoint reads a few hundred rows at most instead of scanning and
+# joining donation and organ.
+#
+# The reconciliation job recomputes both from the base tables, reports any
+# drift (triggers disabled during a restore, rows loaded with
+# foreign_key_checks off...) and, with --repair, rebuilds them and prunes
+# rows for days that have already expired:
+#
+#   python inventory.py             # report drift, exit 1 if there is any
+#   python inventory.py --repair
+#
+# or set INVENTORY_RECONCILE_INTERVAL (seconds) to have the API do it (in one
+# worker only, see jobs.py).
+import argparse
+import json
+import sys
+from datetime import date
+
+from db_config import db_connection
+from jobs import start_job
+
+BLOOD_TRUTH_SQL = """
+    SELECT dn.blood_group, d.expiry_date, COUNT(*) AS units, SUM(d.quantity_ml) AS quantity_ml
+    FROM donation d
+    JOIN donor dn ON d.donor_id = dn.donor_id
+    WHERE d.donation_type = 'Blood' AND d.expiry_date > CURDATE()
+      AND NOT EXISTS (SELECT 1 FROM donation_request dr WHERE dr.donation_id = d.donation_id)
+    GROUP BY dn.blood_group, d.expiry_date
+"""
+
+ORGAN_TRUTH_SQL = """
+    SELECT organ_type, status, COUNT(*) AS organs
+    FROM organ
+    GROUP BY organ_type, status
+"""
+
+
+def summary(cursor, expiry_from=None, expiry_to=None, blood_group=None):
+    """Usable blood per group (with a per-day breakdown) and organ counts.
+
+    Only units expiring after today count, narrowed further by the optional
+    expiry window (inclusive ISO dates) and blood group."""
+    conditions, params = ["expiry_date > CURDATE()", "units > 0"], []
+    if expiry_from is not None:
+        conditions.append("expiry_date >= %s")
+        params.append(expiry_from)
+    if expiry_to is not None:
+        conditions.append("expiry_date <= %s")
+        params.append(expiry_to)
+    if blood_group is not None:
+        conditions.append("blood_group = %s")
+        params.append(blood_group)
+    cursor.execute(f"""
+        SELECT blood_group, expiry_date, units, quantity_ml
+        FROM inventory_blood
+        WHERE {" AND ".join(conditions)}
+        ORDER BY blood_group, expiry_date
+    """, tuple(params))
+    blood = {}
+    for row in cursor.fetchall():
+        group = blood.setdefault(row["blood_group"], {"units": 0, "quantity_ml": 0, "by_expiry": []})
+        group["units"] += row["units"]
+        group["quantity_ml"] += int(row["quantity_ml"])
+        group["by_expiry"].append({
+            "expiry_date": row["expiry_date"],
+            "units": row["units"],
+            "quantity_ml": int(row["quantity_ml"]),
+        })
+
+    cursor.execute("SELECT organ_type, status, organs FROM inventory_organ WHERE organs > 0 ORDER BY organ_type")
+    organs = {}
+    for row in cursor.fetchall():
+        organs.setdefault(row["organ_type"], {})[row["status"]] = row["organs"]
+    return {"blood": blood, "organs": organs}
+
+
+def _diff(expected, actual, fields):
+    """Rows (dicts with the key and expected/actual values) that differ."""
+    drift = []
+    for key in sorted(set(expected) | set(actual), key=str):
+        want = expected.get(key, (0,) * len(fields))
+        have = actual.get(key, (0,) * len(fields))
+        if tuple(int(v) for v in want) != tuple(int(v) for v in have):
+            drift.append({"key": list(key), "expected": dict(zip(fields, map(int, want))),
+                          "actual": dict(zip(fields, map(int, have)))})
+    return drift
+
+
+def reconcile(conn, repair=False):
+    """Compare the summary tables with the base tables. Expired days are
+    ignored; readers never see them. With repair=True both tables are rebuilt
+    in one transaction, which also drops the expired days."""
+    with conn.cursor() as cursor:
+        cursor.execute(BLOOD_TRUTH_SQL)
+        blood_truth = {(g, e): (u, ml) for g, e, u, ml in cursor.fetchall()}
+        cursor.execute("SELECT blood_group, expiry_date, units, quantity_ml FROM inventory_blood "
+                       "WHERE expiry_date > CURDATE()")
+        blood_summary = {(g, e): (u, ml) for g, e, u, ml in cursor.fetchall() if u or ml}
+        cursor.execute(ORGAN_TRUTH_SQL)
+        organ_truth = {(t, s): (n,) for t, s, n in cursor.fetchall()}
+        cursor.execute("SELECT organ_type, status, organs FROM inventory_organ")
+        organ_summary = {(t, s): (n,) for t, s, n in cursor.fetchall() if n}
+
+        report = {
+            "reconciled_at": date.today().isoformat(),
+            "blood_drift": _diff(blood_truth, blood_summary, ("units", "quantity_ml")),
+            "organ_drift": _diff(organ_truth, organ_summary, ("organs",)),
+            "repaired": False,
+        }
+
+        if repair:
+            try:
+                cursor.execute("DELETE FROM inventory_blood")
+                cursor.execute("INSERT INTO inventory_blood (blood_group, expiry_date, units, quantity_ml) "
+                               + BLOOD_TRUTH_SQL)
+                cursor.execute("DELETE FROM inventory_organ")
+                cursor.execute("INSERT INTO inventory_organ (organ_type, status, organs) " + ORGAN_TRUTH_SQL)
+                conn.commit()
+                report["repaired"] = True
+            except Exception:
+                conn.rollback()
+                raise
+        else:
+            conn.commit()
+    return report
+
+
+# --- Background reconciler ---
+
+REPORT_KEY = "inventory:reconcile_report"
+
+
+def start_reconciler(interval, report_cache):
+    """Reconcile every `interval` seconds in one process (see jobs.py),
+    repairing only when drift is found; the latest report is kept in
+    `report_cache` under REPORT_KEY."""
+    def run():
+        with db_connection() as conn:
+            report = reconcile(conn)
+            drift = len(report["blood_drift"]) + len(report["organ_drift"])
+            if drift:
+                report = reconcile(conn, repair=True)
+                print(f"Inventory reconcile: repaired {drift} drifted summary rows")
+        report_cache.set(REPORT_KEY, report, interval * 2 + 60)
+
+    return start_job("inventory-reconciler", interval, run)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check the inventory summary tables against the base tables.")
+    parser.add_argument("--repair", action="store_true", help="rebuild the summary tables")
+    options = parser.parse_args()
+    with db_connection() as conn:
+        report = reconcile(conn, options.repair)
+    print(json.dumps(report, default=str, indent=2))
+    if (report["blood_drift"] or report["organ_drift"]) and not report["repaired"]:
+        sys.exit(1)
@@ -0,0 +1,76 @@
+# jobs.py
+# Periodic background jobs that must run in one process at a time.
+#
+# Every gunicorn worker imports app.py, so every worker starts the job thread,
+# but only the one holding the MySQL advisory lock for the job (GET_LOCK)
+# actually runs it; the others just retry for the lock every interval. The
+# lock is held on a dedicated connection, outside the pool, for as long as the
+# process lives, so a worker that exits or dies releases it and another
+# worker takes over on its next attempt.
+#
+# Results go into the cache given to the job. With CACHE_URL set every worker
+# can serve them; with the in-process cache only the worker running the job
+# has them.
+import threading
+
+from mysql.connector import Error
+
+from db_config import DB_CONFIG, get_db_connection
+
+
+def _acquire(lock_name):
+    """A connection holding the advisory lock, or None if another process
+    has it (or MySQL is unreachable)."""
+    conn = get_db_connection()
+    if conn is None:
+        return None
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT GET_LOCK(%s, 0)", (lock_name,))
+            (acquired,) = cursor.fetchone()
+    except Error:
+        acquired = 0
+    if acquired == 1:
+        return conn
+    conn.close()
+    return None
+
+
+def _still_held(conn):
+    try:
+        conn.ping(reconnect=False)
+        return True
+    except Error:
+        # The session is gone and MySQL released the lock with it
+        try:
+            conn.close()
+        except Error:
+            pass
+        return False
+
+
+def start_job(name, interval, run, stop=None):
+    """Call run() every `interval` seconds in a daemon thread, in whichever
+    process holds the job's advisory lock, until `stop` (an Event) is set."""
+    lock_name = f"{DB_CONFIG['database']}:{name}"
+    stop = stop or threading.Event()
+
+    def loop():
+        lock_conn = None
+        while not stop.is_set():
+            try:
+                if lock_conn is not None and not _still_held(lock_conn):
+                    lock_conn = None
+                if lock_conn is None:
+                    lock_conn = _acquire(lock_name)
+                if lock_conn is not None:
+                    run()
+            except Exception as e:
+                print(f"Job {name} failed: {e}")
+            stop.wait(interval)
+        if lock_conn is not None:
+            lock_conn.close()   # releases the lock
+
+    thread = threading.Thread(target=loop, name=name, daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,144 @@
+# list_query.py
+# Builds the SELECT behind the list endpoints from the query string:
+#   ?fields=a,b,c          column projection (whitelisted per endpoint)
+#   ?blood_group=O-,O+     equality / IN filters
+#   ?date_from=2024-01-01  date range filters
+#   ?limit=50&cursor=123   keyset pagination on the primary key
+#
+# Lists are ordered newest first (primary key DESC), so the cursor is the last
+# primary key of the previous page and the next page is simply `pk < cursor`.
+# That stays an index range scan no matter how deep the client pages, unlike
+# OFFSET which has to walk and throw away every skipped row.
+from datetime import date
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+# Query-string keys that are not filters
+RESERVED_ARGS = {"fields", "limit", "cursor", "format"}
+
+
+class ListQueryError(ValueError):
+    pass
+
+
+class ListSpec:
+    def __init__(self, from_sql, pk, columns, default_fields=None, default_select=None,
+                 filters=None, where=None):
+        self.from_sql = from_sql          # FROM ... JOIN ...
+        self.pk = pk                      # (name, sql_expr) of the primary key
+        self.columns = columns            # public name -> sql expression
+        self.default_fields = default_fields or list(columns)
+        self.default_select = default_select  # raw SQL used instead of default_fields
+        self.filters = filters or {}      # arg name -> (sql expression, op, kind)
+        self.where = where or []          # fixed conditions
+
+    def select_for(self, names):
+        pk_name, pk_expr = self.pk
+        if pk_name not in names:
+            names = [pk_name] + names
+        parts = []
+        for name in names:
+            expr = self.columns[name]
+            parts.append(expr if expr == name else f"{expr} AS {name}")
+        return ", ".join(parts)
+
+
+def eq(expr):
+    return (expr, "=", "str")
+
+
+def date_from(expr):
+    return (expr, ">=", "date")
+
+
+def date_to(expr):
+    return (expr, "<=", "date")
+
+
+def _parse_int(value, name, minimum):
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ListQueryError(f"'{name}' must be an integer")
+    if number < minimum:
+        raise ListQueryError(f"'{name}' must be at least {minimum}")
+    return number
+
+
+class ListQuery:
+    def __init__(self, spec, args):
+        self.spec = spec
+        self.paginated = "limit" in args or "cursor" in args
+
+        conditions = list(spec.where)
+        params = []
+
+        # Projection
+        fields = args.get("fields")
+        if fields:
+            names = [f.strip() for f in fields.split(",") if f.strip()]
+            unknown = [n for n in names if n not in spec.columns]
+            if unknown:
+                raise ListQueryError(
+                    "Unknown field(s): %s. Allowed: %s" % (", ".join(unknown), ", ".join(spec.columns))
+                )
+            select_sql = spec.select_for(names)
+        elif spec.default_select:
+            select_sql = spec.default_select
+        else:
+            select_sql = spec.select_for(spec.default_fields)
+
+        # Filters
+        for name, value in args.items():
+            if name in RESERVED_ARGS:
+                continue
+            if name not in spec.filters:
+                raise ListQueryError(
+                    "Unknown filter '%s'. Allowed: %s" % (name, ", ".join(spec.filters))
+                )
+            expr, op, kind = spec.filters[name]
+            if kind == "date":
+                try:
+                    value = date.fromisoformat(value)
+                except ValueError:
+                    raise ListQueryError(f"'{name}' must be a date (YYYY-MM-DD)")
+                conditions.append(f"{expr} {op} %s")
+                params.append(value)
+            else:
+                values = [v for v in value.split(",") if v != ""]
+                if len(values) == 1:
+                    conditions.append(f"{expr} = %s")
+                    params.append(values[0])
+                elif values:
+                    conditions.append("%s IN (%s)" % (expr, ", ".join(["%s"] * len(values))))
+                    params.extend(values)
+
+        # Keyset pagination
+        self.limit = None
+        if self.paginated:
+            self.limit = min(_parse_int(args.get("limit", DEFAULT_LIMIT), "limit", 1), MAX_LIMIT)
+            if "cursor" in args:
+                conditions.append(f"{spec.pk[1]} < %s")
+                params.append(_parse_int(args["cursor"], "cursor", 0))
+
+        sql = f"SELECT {select_sql} {spec.from_sql}"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += f" ORDER BY {spec.pk[1]} DESC"
+        if self.limit is not None:
+            # One extra row tells us whether there is a next page
+            sql += " LIMIT %s"
+            params.append(self.limit + 1)
+
+        self.sql = sql
+        self.params = tuple(params)
+
+    def page(self, rows, columns=None):
+        """Split a fetched result into (rows, next_cursor). Pass the column
+        names when the rows are tuples rather than dicts."""
+        if self.limit is None or len(rows) <= self.limit:
+            return rows, None
+        rows = rows[:self.limit]
+        key = self.spec.pk[0] if columns is None else list(columns).index(self.spec.pk[0])
+        return rows, rows[-1][key]
@@ -0,0 +1,139 @@
+# listings.py
+# The SQL behind the list, export and fulfillment dropdown endpoints.
+#
+# Kept apart from app.py so tools such as `migrate.py check` can EXPLAIN the
+# exact queries the API runs without importing the Flask app (which opens the
+# pool and starts the background jobs).
+from list_query import ListSpec, eq, date_from, date_to
+
+DONOR_LIST = ListSpec(
+    "FROM donor",
+    pk=("donor_id", "donor_id"),
+    columns={c: c for c in (
+        "donor_id", "admin_code", "name", "age", "gender",
+        "blood_group", "contact", "medical_history",
+    )},
+    default_select="*",
+    filters={
+        "blood_group": eq("blood_group"),
+        "gender": eq("gender"),
+        "admin_code": eq("admin_code"),
+    },
+)
+
+RECIPIENT_LIST = ListSpec(
+    "FROM recipient",
+    pk=("recipient_id", "recipient_id"),
+    columns={c: c for c in (
+        "recipient_id", "admin_code", "name", "age", "gender",
+        "blood_group", "organ_required", "contact",
+    )},
+    default_select="*",
+    filters={
+        "blood_group": eq("blood_group"),
+        "gender": eq("gender"),
+        "organ_required": eq("organ_required"),
+        "admin_code": eq("admin_code"),
+    },
+)
+
+REQUEST_LIST = ListSpec(
+    """
+    FROM requests r
+    JOIN recipient rec ON r.recipient_id = rec.recipient_id
+    JOIN hospital h ON r.hospital_id = h.hospital_id
+    """,
+    pk=("request_id", "r.request_id"),
+    columns={
+        "request_id": "r.request_id",
+        "request_date": "r.request_date",
+        "request_type": "r.request_type",
+        "status": "r.status",
+        "recipient_name": "rec.name",
+        "hospital_name": "h.name",
+        "recipient_id": "r.recipient_id",
+        "hospital_id": "r.hospital_id",
+        "blood_group": "rec.blood_group",
+    },
+    default_fields=["request_id", "request_date", "request_type", "status",
+                    "recipient_name", "hospital_name"],
+    filters={
+        "status": eq("r.status"),
+        "request_type": eq("r.request_type"),
+        "blood_group": eq("rec.blood_group"),
+        "recipient_id": eq("r.recipient_id"),
+        "hospital_id": eq("r.hospital_id"),
+        "date_from": date_from("r.request_date"),
+        "date_to": date_to("r.request_date"),
+    },
+)
+
+DONATION_LIST = ListSpec(
+    """
+    FROM donation d
+    JOIN donor dn ON d.donor_id = dn.donor_id
+    """,
+    pk=("donation_id", "d.donation_id"),
+    columns={
+        "donation_id": "d.donation_id",
+        "quantity_ml": "d.quantity_ml",
+        "donation_date": "d.donation_date",
+        "expiry_date": "d.expiry_date",
+        "donation_type": "d.donation_type",
+        "donor_name": "dn.name",
+        "donor_id": "d.donor_id",
+        "blood_group": "dn.blood_group",
+    },
+    default_fields=["donation_id", "quantity_ml", "donation_date", "expiry_date",
+                    "donation_type", "donor_name"],
+    filters={
+        "blood_group": eq("dn.blood_group"),
+        "donation_type": eq("d.donation_type"),
+        "donor_id": eq("d.donor_id"),
+        "date_from": date_from("d.donation_date"),
+        "date_to": date_to("d.donation_date"),
+        "expiry_from": date_from("d.expiry_date"),
+        "expiry_to": date_to("d.expiry_date"),
+    },
+)
+
+ORGAN_LIST = ListSpec(
+    """
+    FROM organ o
+    JOIN donor dn ON o.donor_id = dn.donor_id
+    LEFT JOIN requests req ON o.request_id = req.request_id
+    LEFT JOIN recipient r ON req.recipient_id = r.recipient_id
+    """,
+    pk=("organ_id", "o.organ_id"),
+    columns={
+        "organ_id": "o.organ_id",
+        "organ_type": "o.organ_type",
+        "status": "o.status",
+        "donor_name": "dn.name",
+        "recipient_name": "r.name",
+        "donor_id": "o.donor_id",
+        "request_id": "o.request_id",
+        "blood_group": "dn.blood_group",
+    },
+    default_fields=["organ_id", "organ_type", "status", "donor_name", "recipient_name"],
+    filters={
+        "status": eq("o.status"),
+        "organ_type": eq("o.organ_type"),
+        "blood_group": eq("dn.blood_group"),
+        "donor_id": eq("o.donor_id"),
+    },
+)
+
+AVAILABLE_DONATIONS_SQL = """
+    SELECT d.donation_id, dn.name, dn.blood_group
+    FROM donation d
+    JOIN donor dn ON d.donor_id = dn.donor_id
+    WHERE d.donation_type = 'Blood' AND d.expiry_date > CURDATE()
+"""
+
+AVAILABLE_ORGANS_SQL = """
+    SELECT o.organ_id, o.organ_type, dn.name AS donor_name, dn.blood_group
+    FROM organ o
+    JOIN donor dn ON o.donor_id = dn.donor_id
+    WHERE o.status = 'Available' AND o.request_id IS NULL
+"""
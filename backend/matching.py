@@ -0,0 +1,84 @@
+# matching.py
+# Blood matching engine: pairs every pending blood request with a compatible,
+# unexpired blood unit in a single pass.
+#
+# Available units are indexed by donor blood group, each group sorted by expiry
+# date (FEFO: first expiring, first out). Requests are served oldest first.
+# For each request we walk the recipient's compatible donor groups, identical
+# group first so universal O- units are kept for the patients who need them,
+# and take the head of the first non-empty queue. Each lookup is O(1) per
+# candidate group, so a whole backlog is planned in O(units + requests).
+from collections import deque
+
+# Red cell compatibility: recipient group -> donor groups, in order of preference
+COMPATIBLE_DONORS = {
+    "O-": ["O-"],
+    "O+": ["O+", "O-"],
+    "A-": ["A-", "O-"],
+    "A+": ["A+", "A-", "O+", "O-"],
+    "B-": ["B-", "O-"],
+    "B+": ["B+", "B-", "O+", "O-"],
+    "AB-": ["AB-", "A-", "B-", "O-"],
+    "AB+": ["AB+", "AB-", "A+", "A-", "B+", "B-", "O+", "O-"],
+}
+
+# Units already linked to a request through donation_request are spent.
+AVAILABLE_UNITS_SQL = """
+    SELECT d.donation_id, dn.blood_group, d.expiry_date
+    FROM donation d
+    JOIN donor dn ON d.donor_id = dn.donor_id
+    WHERE d.donation_type = 'Blood' AND d.expiry_date > CURDATE()
+      AND NOT EXISTS (SELECT 1 FROM donation_request dr WHERE dr.donation_id = d.donation_id)
+    ORDER BY d.expiry_date, d.donation_id
+"""
+
+PENDING_BLOOD_REQUESTS_SQL = """
+    SELECT r.request_id, r.request_date, rec.blood_group
+    FROM requests r
+    JOIN recipient rec ON r.recipient_id = rec.recipient_id
+    WHERE r.request_type = 'Blood' AND r.status = 'Pending'
+    ORDER BY r.request_date, r.request_id
+"""
+
+
+def load_candidates(cursor, lock=False):
+    """Fetch (units, requests) as tuples. With lock=True the rows are read
+    with FOR UPDATE so nobody else can take them before we commit."""
+    suffix = " FOR UPDATE" if lock else ""
+    cursor.execute(AVAILABLE_UNITS_SQL + suffix)
+    units = cursor.fetchall()
+    cursor.execute(PENDING_BLOOD_REQUESTS_SQL + suffix)
+    pending = cursor.fetchall()
+    return units, pending
+
+
+def build_index(units):
+    """blood group -> deque of (donation_id, expiry_date), soonest expiry first."""
+    index = {}
+    for donation_id, group, expiry_date in sorted(units, key=lambda u: (u[2], u[0])):
+        index.setdefault(group, deque()).append((donation_id, expiry_date))
+    return index
+
+
+def plan_allocations(units, pending, limit=None):
+    """Return (allocations, unmatched_request_ids) without touching the DB."""
+    index = build_index(units)
+    allocations, unmatched = [], []
+    for request_id, request_date, group in pending:
+        if limit is not None and len(allocations) >= limit:
+            break
+        for donor_group in COMPATIBLE_DONORS.get(group, ()):
+            queue = index.get(donor_group)
+            if queue:
+                donation_id, expiry_date = queue.popleft()
+                allocations.append({
+                    "request_id": request_id,
+                    "donation_id": donation_id,
+                    "recipient_blood_group": group,
+                    "donor_blood_group": donor_group,
+                    "expiry_date": expiry_date,
+                })
+                break
+        else:
+            unmatched.append(request_id)
+    return allocations, unmatched
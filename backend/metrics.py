@@ -0,0 +1,239 @@
+# metrics.py
+# Hot-path instrumentation, exported in Prometheus text format at /metrics.
+#
+#  * Flask hooks: per-route latency histogram, request counter by status and
+#    a histogram of how many queries each request ran.
+#  * InstrumentedConnection / InstrumentedCursor: thin proxies the pool hands
+#    out instead of raw connections; they time every execute / executemany /
+#    callproc and count rows fetched and affected.
+#  * Pool checkout wait time (fed by the pool's on_checkout callback) and pool
+#    occupancy gauges.
+#
+# Opt-in slow query log: set SLOW_QUERY_MS and any statement slower than that
+# is printed with its SQL text. Parameters are never logged, only their count,
+# since they carry names, contacts and medical history.
+import contextvars
+import os
+import threading
+import time
+
+from flask import Response, g, request
+
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", 0))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Counter:
+    def __init__(self, name, help_text, labels):
+        self.name, self.help, self.labels = name, help_text, labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels, buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help_text, labels, buckets
+        self._values = {}     # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[i] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, entry in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, entry):
+                    labels = _labels(self.labels + ("le",), label_values + (_number(bound),))
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _labels(self.labels + ("le",), label_values + ("+Inf",))
+                lines.append(f"{self.name}_bucket{labels} {entry[-1]}")
+                lines.append(f"{self.name}_sum{_labels(self.labels, label_values)} {entry[-2]}")
+                lines.append(f"{self.name}_count{_labels(self.labels, label_values)} {entry[-1]}")
+        return lines
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+REQUESTS = Counter("http_requests_total", "HTTP requests handled.", ("route", "method", "status"))
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency.", ("route", "method"))
+REQUEST_QUERIES = Histogram("http_request_queries", "Database statements per HTTP request.",
+                            ("route",), COUNT_BUCKETS)
+QUERY_LATENCY = Histogram("db_query_duration_seconds", "Database statement latency.", ("operation",))
+QUERY_ERRORS = Counter("db_query_errors_total", "Database statements that raised.", ("operation",))
+ROWS_FETCHED = Counter("db_rows_fetched_total", "Rows fetched from result sets.", ())
+ROWS_AFFECTED = Counter("db_rows_affected_total", "Rows changed by INSERT/UPDATE/DELETE.", ("operation",))
+POOL_WAIT = Histogram("db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection.", ())
+TX_RETRIES = Counter("db_transaction_retries_total", "Transactions retried after a deadlock or lock wait timeout.",
+                     ("errno",))
+AUDIT_EVENTS = Counter("audit_events_total", "Audit log events by outcome (written, dropped, failed).",
+                       ("result",))
+
+ALL = (REQUESTS, REQUEST_LATENCY, REQUEST_QUERIES, QUERY_LATENCY, QUERY_ERRORS,
+       ROWS_FETCHED, ROWS_AFFECTED, POOL_WAIT, TX_RETRIES, AUDIT_EVENTS)
+
+# Statements run by the current request (None outside a request)
+_request_queries = contextvars.ContextVar("request_queries", default=None)
+
+
+def observe_pool_checkout(wait_seconds):
+    POOL_WAIT.observe((), wait_seconds)
+
+
+# --- DB proxies ---
+
+def _operation(sql):
+    word = sql.lstrip().split(None, 1)[0] if sql and sql.strip() else ""
+    return word.upper()
+
+
+class InstrumentedCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return self._cursor.__exit__(*exc)
+
+    def _timed(self, operation, sql, params, call):
+        counter = _request_queries.get()
+        if counter is not None:
+            counter[0] += 1
+        start = time.perf_counter()
+        try:
+            result = call()
+        except Exception:
+            QUERY_ERRORS.inc((operation,))
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            QUERY_LATENCY.observe((operation,), elapsed)
+            if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+                statement = " ".join(str(sql).split())
+                print(f"Slow query ({elapsed * 1000:.1f} ms, {_param_count(params)} params redacted): {statement}")
+        if operation in ("INSERT", "UPDATE", "DELETE", "REPLACE") and self._cursor.rowcount > 0:
+            ROWS_AFFECTED.inc((operation,), self._cursor.rowcount)
+        return result
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        return self._timed(_operation(operation), operation, params,
+                           lambda: self._cursor.execute(operation, params, *args, **kwargs))
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        return self._timed(_operation(operation), operation, seq_params,
+                           lambda: self._cursor.executemany(operation, seq_params, *args, **kwargs))
+
+    def callproc(self, procname, args=(), *rest, **kwargs):
+        return self._timed("CALL", f"CALL {procname}", args,
+                           lambda: self._cursor.callproc(procname, args, *rest, **kwargs))
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            ROWS_FETCHED.inc(())
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        ROWS_FETCHED.inc((), len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        ROWS_FETCHED.inc((), len(rows))
+        return rows
+
+
+def _param_count(params):
+    if params is None:
+        return 0
+    try:
+        return len(params)
+    except TypeError:
+        return 1
+
+
+class InstrumentedConnection:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._conn.cursor(*args, **kwargs))
+
+
+# --- Flask hooks and the /metrics endpoint ---
+
+def init_app(app, pool):
+    @app.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+        g.metrics_queries = [0]
+        _request_queries.set(g.metrics_queries)
+
+    @app.after_request
+    def record_request(response):
+        start = g.pop("metrics_start", None)
+        if start is None:
+            return response
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        REQUEST_LATENCY.observe((route, request.method), time.perf_counter() - start)
+        REQUESTS.inc((route, request.method, str(response.status_code)))
+        REQUEST_QUERIES.observe((route,), g.metrics_queries[0])
+        _request_queries.set(None)
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        lines = []
+        for metric in ALL:
+            lines.extend(metric.render())
+        lines.append("# HELP db_pool_connections Pooled MySQL connections by state.")
+        lines.append("# TYPE db_pool_connections gauge")
+        status = pool.status()
+        for state in ("open", "checked_out", "idle"):
+            lines.append(f'db_pool_connections{{state="{state}"}} {status[state]}')
+        return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
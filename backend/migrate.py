@@ -0,0 +1,316 @@
+# migrate.py
+# Versioned schema migrations for the configured database (see db_config.py).
+#
+# Migrations live in migrations/ as NNNN_name.up.sql / NNNN_name.down.sql and
+# are applied in version order. Applied versions are recorded in the
+# schema_migrations table.
+#
+#   python migrate.py status            # applied / pending versions
+#   python migrate.py up                # apply everything pending
+#   python migrate.py up --to 1
+#   python migrate.py down              # roll back the latest version
+#   python migrate.py down --to 1       # roll back everything above 1
+#   python migrate.py stamp 1           # mark an existing schema as applied
+#   python migrate.py check             # EXPLAIN the hot queries
+#
+# MySQL commits DDL implicitly, so a migration that fails halfway is not rolled
+# back; the version is only recorded once every statement has run. Creating an
+# index that already exists, or dropping one that does not, is reported and
+# skipped so the index migrations can be re-run against hand-tuned databases.
+import argparse
+import os
+import re
+import sys
+
+from mysql.connector import Error
+
+from db_config import db_connection
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+FILENAME_RE = re.compile(r"^(\d+)_(\w+)\.(up|down)\.sql$")
+
+ER_DUP_KEYNAME = 1061
+ER_CANT_DROP_FIELD_OR_KEY = 1091
+SKIPPABLE_ERRORS = (ER_DUP_KEYNAME, ER_CANT_DROP_FIELD_OR_KEY)
+
+CREATE_TRACKING_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version     INT          NOT NULL PRIMARY KEY,
+        name        VARCHAR(100) NOT NULL,
+        applied_at  DATETIME     NOT NULL DEFAULT CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB
+"""
+
+
+class MigrationError(Exception):
+    pass
+
+
+def discover(directory=MIGRATIONS_DIR):
+    """version -> {"name", "up", "down"} with the script paths."""
+    migrations = {}
+    for filename in sorted(os.listdir(directory)):
+        match = FILENAME_RE.match(filename)
+        if not match:
+            continue
+        version, name, direction = int(match.group(1)), match.group(2), match.group(3)
+        entry = migrations.setdefault(version, {"name": name})
+        if entry["name"] != name:
+            raise MigrationError(f"Version {version} is used by both {entry['name']} and {name}")
+        entry[direction] = os.path.join(directory, filename)
+    for version, entry in migrations.items():
+        if "up" not in entry:
+            raise MigrationError(f"Migration {version} has no .up.sql script")
+    return dict(sorted(migrations.items()))
+
+
+def split_statements(script):
+    """Split a SQL script into statements. Understands the mysql client's
+    DELIMITER command (needed for trigger and routine bodies), quoted strings
+    and -- / # / /* */ comments."""
+    statements, current = [], []
+    delimiter = ";"
+    quote = None
+    i, n = 0, len(script)
+    at_line_start = True
+    while i < n:
+        if quote is None and at_line_start:
+            line_end = script.find("\n", i)
+            line = script[i:line_end if line_end != -1 else n]
+            if line.strip().upper().startswith("DELIMITER ") and not "".join(current).strip():
+                delimiter = line.split()[1]
+                i = n if line_end == -1 else line_end + 1
+                continue
+        ch = script[i]
+        at_line_start = ch == "\n"
+        if quote:
+            current.append(ch)
+            if ch == "\\" and i + 1 < n:
+                current.append(script[i + 1])
+                i += 2
+                continue
+            if ch == quote:
+                quote = None
+            i += 1
+        elif ch in ("'", '"', "`"):
+            quote = ch
+            current.append(ch)
+            i += 1
+        elif script.startswith("--", i) or ch == "#":
+            line_end = script.find("\n", i)
+            i = n if line_end == -1 else line_end
+        elif script.startswith("/*", i):
+            end = script.find("*/", i + 2)
+            i = n if end == -1 else end + 2
+        elif script.startswith(delimiter, i):
+            statements.append("".join(current).strip())
+            current = []
+            i += len(delimiter)
+        else:
+            current.append(ch)
+            i += 1
+    statements.append("".join(current).strip())
+    return [s for s in statements if s]
+
+
+def applied_versions(cursor):
+    cursor.execute(CREATE_TRACKING_TABLE)
+    cursor.execute("SELECT version, name, applied_at FROM schema_migrations ORDER BY version")
+    return {version: (name, applied_at) for version, name, applied_at in cursor.fetchall()}
+
+
+def run_script(cursor, path):
+    with open(path, encoding="utf-8") as f:
+        statements = split_statements(f.read())
+    for statement in statements:
+        try:
+            cursor.execute(statement)
+            if cursor.with_rows:
+                cursor.fetchall()
+        except Error as e:
+            if e.errno in SKIPPABLE_ERRORS:
+                print(f"    skipped: {e.msg}")
+                continue
+            summary = " ".join(statement.split())[:120]
+            raise MigrationError(f"{os.path.basename(path)} failed at: {summary}\n    {e}") from e
+
+
+def migrate_up(target=None):
+    migrations = discover()
+    with db_connection() as conn, conn.cursor() as cursor:
+        applied = applied_versions(cursor)
+        pending = [v for v in migrations if v not in applied and (target is None or v <= target)]
+        if not pending:
+            print("Nothing to apply.")
+            return
+        for version in pending:
+            entry = migrations[version]
+            print(f"Applying {version:04d}_{entry['name']}")
+            run_script(cursor, entry["up"])
+            cursor.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                           (version, entry["name"]))
+            conn.commit()
+
+
+def migrate_down(target=None):
+    migrations = discover()
+    with db_connection() as conn, conn.cursor() as cursor:
+        applied = applied_versions(cursor)
+        if target is None:
+            rollback = sorted(applied)[-1:]
+        else:
+            rollback = [v for v in sorted(applied, reverse=True) if v > target]
+        if not rollback:
+            print("Nothing to roll back.")
+            return
+        for version in sorted(rollback, reverse=True):
+            entry = migrations.get(version)
+            if entry is None or "down" not in entry:
+                raise MigrationError(f"Migration {version} has no .down.sql script")
+            print(f"Reverting {version:04d}_{entry['name']}")
+            run_script(cursor, entry["down"])
+            cursor.execute("DELETE FROM schema_migrations WHERE version = %s", (version,))
+            conn.commit()
+
+
+def stamp(target):
+    """Record every migration up to `target` as applied without running it."""
+    migrations = discover()
+    if target not in migrations:
+        raise MigrationError(f"Unknown migration version {target}")
+    with db_connection() as conn, conn.cursor() as cursor:
+        applied = applied_versions(cursor)
+        for version, entry in migrations.items():
+            if version <= target and version not in applied:
+                print(f"Stamping {version:04d}_{entry['name']}")
+                cursor.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                               (version, entry["name"]))
+        conn.commit()
+
+
+def status():
+    migrations = discover()
+    with db_connection() as conn, conn.cursor() as cursor:
+        applied = applied_versions(cursor)
+        conn.commit()
+    for version, entry in migrations.items():
+        state = f"applied {applied[version][1]}" if version in applied else "pending"
+        print(f"  {version:04d}_{entry['name']:<30} {state}")
+    for version in sorted(set(applied) - set(migrations)):
+        print(f"  {version:04d}_{applied[version][0]:<30} applied, but the script is missing")
+
+
+# --- Index check ---
+
+def hot_queries():
+    """(label, sql, params, table alias, table, leading columns of the index
+    it should use) for the queries the indexes in 0002 and 0004 exist for.
+
+    Indexes are matched by the columns they cover rather than by name, so a
+    database adopted with `stamp` passes as long as equivalent indexes (or
+    the ones InnoDB creates for foreign keys) are in place."""
+    from list_query import ListQuery
+    from listings import REQUEST_LIST, ORGAN_LIST, DONATION_LIST, DONOR_LIST, AVAILABLE_ORGANS_SQL
+    from matching import AVAILABLE_UNITS_SQL, PENDING_BLOOD_REQUESTS_SQL
+
+    def listing(spec, args):
+        query = ListQuery(spec, args)
+        return query.sql, query.params
+
+    return [
+        ("pending blood requests", PENDING_BLOOD_REQUESTS_SQL, (), "r", "requests", ("status", "request_type")),
+        ("available blood units", AVAILABLE_UNITS_SQL, (), "d", "donation", ("donation_type", "expiry_date")),
+        ("available organs", AVAILABLE_ORGANS_SQL, (), "o", "organ", ("status", "request_id")),
+        ("pending count per recipient",
+         "SELECT COUNT(*) FROM requests WHERE recipient_id = %s AND status = 'Pending'",
+         (1,), "requests", "requests", ("recipient_id", "status")),
+        ("requests of a recipient", *listing(REQUEST_LIST, {"recipient_id": "1"}),
+         "r", "requests", ("recipient_id",)),
+        ("requests of a hospital", *listing(REQUEST_LIST, {"hospital_id": "1"}),
+         "r", "requests", ("hospital_id",)),
+        ("organs by status", *listing(ORGAN_LIST, {"status": "Available"}),
+         "o", "organ", ("status",)),
+        ("organs -> requests join", *listing(ORGAN_LIST, {"status": "Transplanted"}),
+         "req", "requests", ("request_id",)),
+        ("donations of a donor", *listing(DONATION_LIST, {"donor_id": "1"}),
+         "d", "donation", ("donor_id",)),
+        ("donors by blood group", *listing(DONOR_LIST, {"blood_group": "O-"}),
+         "donor", "donor", ("blood_group",)),
+        ("donor typeahead",
+         "SELECT donor_id, name, blood_group FROM donor WHERE name LIKE %s ORDER BY name, donor_id LIMIT 10",
+         ("ann%",), "donor", "donor", ("name",)),
+        ("donor full-text search",
+         "SELECT donor_id FROM donor WHERE MATCH(name, contact, medical_history) AGAINST (%s IN BOOLEAN MODE)",
+         ("+ann*",), "donor", "donor", ("name", "contact", "medical_history")),
+    ]
+
+
+INDEX_COLUMNS_SQL = """
+    SELECT TABLE_NAME, INDEX_NAME, COLUMN_NAME
+    FROM information_schema.STATISTICS
+    WHERE TABLE_SCHEMA = DATABASE()
+    ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX
+"""
+
+
+def index_columns(cursor):
+    """{(table, index name): [column, ...]} for the current database."""
+    cursor.execute(INDEX_COLUMNS_SQL)
+    columns = {}
+    for row in cursor.fetchall():
+        columns.setdefault((row["TABLE_NAME"], row["INDEX_NAME"]), []).append(row["COLUMN_NAME"])
+    return columns
+
+
+def check_indexes():
+    """EXPLAIN each hot query; return the labels not using an index that
+    leads with the expected columns."""
+    failures = []
+    with db_connection() as conn, conn.cursor(dictionary=True) as cursor:
+        indexes = index_columns(cursor)
+        for label, sql, params, alias, table, expected in hot_queries():
+            cursor.execute("EXPLAIN " + sql, params)
+            plan = {row["table"]: row for row in cursor.fetchall()}
+            row = plan.get(alias)
+            used = row["key"] if row else None
+            covered = tuple(indexes.get((table, used), ()))
+            ok = covered[:len(expected)] == expected
+            if not ok:
+                failures.append(label)
+            detail = f"key={used}, rows={row['rows'] if row else '?'}"
+            if used:
+                detail += f" ({', '.join(covered)})"
+            if row and not ok and row["possible_keys"]:
+                detail += f"; possible: {row['possible_keys']} - is the table tiny?"
+            print(f"  {'ok  ' if ok else 'FAIL'} {label:<30} {alias}: {detail}")
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Apply, roll back and inspect schema migrations.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    up = commands.add_parser("up", help="apply pending migrations")
+    up.add_argument("--to", type=int, help="stop after this version")
+    down = commands.add_parser("down", help="roll back migrations (default: the latest one)")
+    down.add_argument("--to", type=int, help="roll back every version above this one (0 for all)")
+    stamp_cmd = commands.add_parser("stamp", help="mark versions up to N as applied without running them")
+    stamp_cmd.add_argument("version", type=int)
+    commands.add_parser("status", help="list applied and pending migrations")
+    commands.add_parser("check", help="EXPLAIN the hot queries and verify their indexes are used")
+    options = parser.parse_args()
+
+    try:
+        if options.command == "up":
+            migrate_up(options.to)
+        elif options.command == "down":
+            migrate_down(options.to)
+        elif options.command == "stamp":
+            stamp(options.version)
+        elif options.command == "status":
+            status()
+        elif options.command == "check":
+            failed = check_indexes()
+            if failed:
+                sys.exit(f"{len(failed)} quer{'y' if len(failed) == 1 else 'ies'} not using the expected index")
+    except MigrationError as e:
+        sys.exit(str(e))
@@ -0,0 +1,14 @@
+-- 0001 down: drops the whole schema, data included.
+DROP PROCEDURE IF EXISTS sp_FulfillBloodRequest;
+DROP FUNCTION IF EXISTS fn_GetPendingRequestCount;
+DROP FUNCTION IF EXISTS fn_IsBloodUnitExpired;
+DROP TRIGGER IF EXISTS trg_donation_set_expiry;
+DROP VIEW IF EXISTS donor_activity;
+DROP TABLE IF EXISTS donation_request;
+DROP TABLE IF EXISTS organ;
+DROP TABLE IF EXISTS donation;
+DROP TABLE IF EXISTS requests;
+DROP TABLE IF EXISTS recipient;
+DROP TABLE IF EXISTS donor;
+DROP TABLE IF EXISTS hospital;
+DROP TABLE IF EXISTS admin;
@@ -0,0 +1,181 @@
+-- 0001: baseline schema.
+--
+-- Reconstructed from the queries, stored routines and triggers the API relies
+-- on. For a database that already has this schema, record it as applied
+-- without running it:  python migrate.py stamp 1
+
+CREATE TABLE IF NOT EXISTS admin (
+    admin_code      VARCHAR(20)  NOT NULL,
+    username        VARCHAR(100) NOT NULL,
+    PRIMARY KEY (admin_code)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS hospital (
+    hospital_id     INT          NOT NULL AUTO_INCREMENT,
+    name            VARCHAR(150) NOT NULL,
+    location        VARCHAR(255) NULL,
+    PRIMARY KEY (hospital_id)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS donor (
+    donor_id        INT          NOT NULL AUTO_INCREMENT,
+    admin_code      VARCHAR(20)  NOT NULL,
+    name            VARCHAR(100) NOT NULL,
+    age             INT          NOT NULL,
+    gender          VARCHAR(10)  NOT NULL,
+    blood_group     VARCHAR(3)   NOT NULL,
+    contact         VARCHAR(20)  NOT NULL,
+    medical_history TEXT         NULL,
+    PRIMARY KEY (donor_id),
+    KEY idx_donor_admin (admin_code),
+    CONSTRAINT fk_donor_admin FOREIGN KEY (admin_code) REFERENCES admin (admin_code)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS recipient (
+    recipient_id    INT          NOT NULL AUTO_INCREMENT,
+    admin_code      VARCHAR(20)  NOT NULL,
+    name            VARCHAR(100) NOT NULL,
+    age             INT          NOT NULL,
+    gender          VARCHAR(10)  NOT NULL,
+    blood_group     VARCHAR(3)   NOT NULL,
+    organ_required  VARCHAR(50)  NULL,
+    contact         VARCHAR(20)  NOT NULL,
+    PRIMARY KEY (recipient_id),
+    KEY idx_recipient_admin (admin_code),
+    CONSTRAINT fk_recipient_admin FOREIGN KEY (admin_code) REFERENCES admin (admin_code)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS requests (
+    request_id      INT          NOT NULL AUTO_INCREMENT,
+    recipient_id    INT          NOT NULL,
+    hospital_id     INT          NOT NULL,
+    request_type    ENUM('Blood', 'Organ') NOT NULL,
+    request_date    DATE         NOT NULL,
+    status          ENUM('Pending', 'Fulfilled') NOT NULL DEFAULT 'Pending',
+    PRIMARY KEY (request_id),
+    KEY idx_requests_recipient (recipient_id),
+    KEY idx_requests_hospital (hospital_id),
+    CONSTRAINT fk_requests_recipient FOREIGN KEY (recipient_id) REFERENCES recipient (recipient_id),
+    CONSTRAINT fk_requests_hospital FOREIGN KEY (hospital_id) REFERENCES hospital (hospital_id)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS donation (
+    donation_id     INT          NOT NULL AUTO_INCREMENT,
+    donor_id        INT          NOT NULL,
+    quantity_ml     INT          NOT NULL,
+    donation_date   DATE         NOT NULL,
+    expiry_date     DATE         NULL,
+    donation_type   VARCHAR(20)  NOT NULL DEFAULT 'Blood',
+    PRIMARY KEY (donation_id),
+    KEY idx_donation_donor (donor_id),
+    CONSTRAINT fk_donation_donor FOREIGN KEY (donor_id) REFERENCES donor (donor_id)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS organ (
+    organ_id        INT          NOT NULL AUTO_INCREMENT,
+    donor_id        INT          NOT NULL,
+    organ_type      VARCHAR(50)  NOT NULL,
+    status          ENUM('Available', 'Transplanted') NOT NULL DEFAULT 'Available',
+    request_id      INT          NULL,
+    PRIMARY KEY (organ_id),
+    KEY idx_organ_donor (donor_id),
+    KEY idx_organ_request (request_id),
+    CONSTRAINT fk_organ_donor FOREIGN KEY (donor_id) REFERENCES donor (donor_id),
+    CONSTRAINT fk_organ_request FOREIGN KEY (request_id) REFERENCES requests (request_id)
+) ENGINE=InnoDB;
+
+-- M:N log of which blood unit fulfilled which request
+CREATE TABLE IF NOT EXISTS donation_request (
+    donation_id     INT          NOT NULL,
+    request_id      INT          NOT NULL,
+    PRIMARY KEY (donation_id, request_id),
+    KEY idx_donation_request_request (request_id),
+    CONSTRAINT fk_dr_donation FOREIGN KEY (donation_id) REFERENCES donation (donation_id),
+    CONSTRAINT fk_dr_request FOREIGN KEY (request_id) REFERENCES requests (request_id)
+) ENGINE=InnoDB;
+
+CREATE OR REPLACE VIEW donor_activity AS
+    SELECT dn.donor_id, dn.name, dn.blood_group,
+           COUNT(d.donation_id) AS total_donations,
+           COALESCE(SUM(d.quantity_ml), 0) AS total_quantity_ml,
+           MAX(d.donation_date) AS last_donation_date
+    FROM donor dn
+    LEFT JOIN donation d ON d.donor_id = dn.donor_id
+    GROUP BY dn.donor_id, dn.name, dn.blood_group;
+
+-- Red cells keep for 42 days
+DROP TRIGGER IF EXISTS trg_donation_set_expiry;
+DELIMITER $$
+CREATE TRIGGER trg_donation_set_expiry
+BEFORE INSERT ON donation
+FOR EACH ROW
+BEGIN
+    IF NEW.donation_type = 'Blood' AND NEW.expiry_date IS NULL THEN
+        SET NEW.expiry_date = DATE_ADD(NEW.donation_date, INTERVAL 42 DAY);
+    END IF;
+END$$
+DELIMITER ;
+
+DROP FUNCTION IF EXISTS fn_IsBloodUnitExpired;
+DELIMITER $$
+CREATE FUNCTION fn_IsBloodUnitExpired(p_donation_id INT)
+RETURNS VARCHAR(10)
+READS SQL DATA
+BEGIN
+    DECLARE v_expiry DATE;
+    SELECT expiry_date INTO v_expiry FROM donation WHERE donation_id = p_donation_id;
+    IF v_expiry IS NULL THEN
+        RETURN NULL;
+    ELSEIF v_expiry <= CURDATE() THEN
+        RETURN 'Expired';
+    END IF;
+    RETURN 'Valid';
+END$$
+DELIMITER ;
+
+DROP FUNCTION IF EXISTS fn_GetPendingRequestCount;
+DELIMITER $$
+CREATE FUNCTION fn_GetPendingRequestCount(p_recipient_id INT)
+RETURNS INT
+READS SQL DATA
+BEGIN
+    DECLARE v_count INT;
+    SELECT COUNT(*) INTO v_count FROM requests
+    WHERE recipient_id = p_recipient_id AND status = 'Pending';
+    RETURN v_count;
+END$$
+DELIMITER ;
+
+-- Links a blood unit to a pending blood request. No COMMIT inside: the caller
+-- owns the transaction (the matching engine runs many calls in one).
+DROP PROCEDURE IF EXISTS sp_FulfillBloodRequest;
+DELIMITER $$
+CREATE PROCEDURE sp_FulfillBloodRequest(IN p_donation_id INT, IN p_request_id INT)
+BEGIN
+    DECLARE v_expiry DATE;
+    DECLARE v_status VARCHAR(20);
+    DECLARE v_type VARCHAR(20);
+
+    SELECT expiry_date INTO v_expiry FROM donation
+    WHERE donation_id = p_donation_id AND donation_type = 'Blood' FOR UPDATE;
+    IF v_expiry IS NULL THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Blood unit not found';
+    END IF;
+    IF v_expiry <= CURDATE() THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Blood unit has expired';
+    END IF;
+    IF EXISTS (SELECT 1 FROM donation_request WHERE donation_id = p_donation_id) THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Blood unit has already been used';
+    END IF;
+
+    SELECT status, request_type INTO v_status, v_type FROM requests
+    WHERE request_id = p_request_id FOR UPDATE;
+    IF v_status IS NULL OR v_type <> 'Blood' OR v_status <> 'Pending' THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Request is not a pending blood request';
+    END IF;
+
+    INSERT INTO donation_request (donation_id, request_id) VALUES (p_donation_id, p_request_id);
+    UPDATE requests SET status = 'Fulfilled' WHERE request_id = p_request_id;
+    SELECT 'Blood request fulfilled successfully' AS message;
+END$$
+DELIMITER ;
@@ -0,0 +1,6 @@
+DROP INDEX idx_recipient_blood_group ON recipient;
+DROP INDEX idx_donor_blood_group ON donor;
+DROP INDEX idx_donation_type_expiry ON donation;
+DROP INDEX idx_organ_status_request ON organ;
+DROP INDEX idx_requests_recipient_status ON requests;
+DROP INDEX idx_requests_status_type ON requests;
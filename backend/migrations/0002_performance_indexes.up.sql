@@ -0,0 +1,19 @@
+-- 0002: composite indexes for the hot queries. `python migrate.py check`
+-- EXPLAINs those queries and confirms these indexes are picked.
+
+-- Pending-request work lists: dashboard stats (grouped by type), blood matching
+-- and the organ waitlist (ordered by request_date), ?status= filters.
+CREATE INDEX idx_requests_status_type ON requests (status, request_type, request_date);
+
+-- fn_GetPendingRequestCount, /api/recipients/pending_counts, ?recipient_id=
+CREATE INDEX idx_requests_recipient_status ON requests (recipient_id, status);
+
+-- /api/organs/available and the organ allocator: status = 'Available' AND request_id IS NULL
+CREATE INDEX idx_organ_status_request ON organ (status, request_id);
+
+-- Available / expiring blood: donation_type = 'Blood' AND expiry_date > CURDATE()
+CREATE INDEX idx_donation_type_expiry ON donation (donation_type, expiry_date);
+
+-- ?blood_group= filters and per-group stats
+CREATE INDEX idx_donor_blood_group ON donor (blood_group);
+CREATE INDEX idx_recipient_blood_group ON recipient (blood_group);
@@ -0,0 +1,13 @@
+DROP TRIGGER IF EXISTS trg_inventory_organ_delete;
+DROP TRIGGER IF EXISTS trg_inventory_organ_update;
+DROP TRIGGER IF EXISTS trg_inventory_organ_insert;
+DROP TRIGGER IF EXISTS trg_inventory_donor_update;
+DROP TRIGGER IF EXISTS trg_inventory_usage_delete;
+DROP TRIGGER IF EXISTS trg_inventory_usage_insert;
+DROP TRIGGER IF EXISTS trg_inventory_donation_delete;
+DROP TRIGGER IF EXISTS trg_inventory_donation_update;
+DROP TRIGGER IF EXISTS trg_inventory_donation_insert;
+DROP PROCEDURE IF EXISTS sp_InventoryOrganAdjust;
+DROP PROCEDURE IF EXISTS sp_InventoryBloodAdjust;
+DROP TABLE IF EXISTS inventory_organ;
+DROP TABLE IF EXISTS inventory_blood;
@@ -0,0 +1,197 @@
+-- 0003: incrementally maintained inventory summary.
+--
+-- inventory_blood holds unused blood units per (donor blood group, expiry day)
+-- and inventory_organ holds organ counts per (organ type, status). Triggers
+-- keep both current on every write path (API handlers, bulk import,
+-- sp_FulfillBloodRequest, manual SQL), so /api/inventory/summary never has to
+-- scan donation or organ. A unit is "unused" while it has no donation_request
+-- row. Rows for past expiry days stay until `python inventory.py --repair`
+-- prunes them; readers filter on expiry_date.
+
+CREATE TABLE IF NOT EXISTS inventory_blood (
+    blood_group     VARCHAR(3)   NOT NULL,
+    expiry_date     DATE         NOT NULL,
+    units           INT          NOT NULL DEFAULT 0,
+    quantity_ml     BIGINT       NOT NULL DEFAULT 0,
+    PRIMARY KEY (blood_group, expiry_date),
+    KEY idx_inventory_blood_expiry (expiry_date)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS inventory_organ (
+    organ_type      VARCHAR(50)  NOT NULL,
+    status          VARCHAR(20)  NOT NULL,
+    organs          INT          NOT NULL DEFAULT 0,
+    PRIMARY KEY (organ_type, status)
+) ENGINE=InnoDB;
+
+DROP PROCEDURE IF EXISTS sp_InventoryBloodAdjust;
+DELIMITER $$
+CREATE PROCEDURE sp_InventoryBloodAdjust(IN p_donor_id INT, IN p_expiry DATE, IN p_units INT, IN p_ml BIGINT)
+BEGIN
+    IF p_expiry IS NOT NULL THEN
+        INSERT INTO inventory_blood (blood_group, expiry_date, units, quantity_ml)
+        SELECT blood_group, p_expiry, p_units, p_ml FROM donor WHERE donor_id = p_donor_id
+        ON DUPLICATE KEY UPDATE units = units + VALUES(units), quantity_ml = quantity_ml + VALUES(quantity_ml);
+    END IF;
+END$$
+DELIMITER ;
+
+DROP PROCEDURE IF EXISTS sp_InventoryOrganAdjust;
+DELIMITER $$
+CREATE PROCEDURE sp_InventoryOrganAdjust(IN p_organ_type VARCHAR(50), IN p_status VARCHAR(20), IN p_organs INT)
+BEGIN
+    INSERT INTO inventory_organ (organ_type, status, organs) VALUES (p_organ_type, p_status, p_organs)
+    ON DUPLICATE KEY UPDATE organs = organs + VALUES(organs);
+END$$
+DELIMITER ;
+
+-- donation: new units are unused; deletes and edits only matter while unused
+DROP TRIGGER IF EXISTS trg_inventory_donation_insert;
+DELIMITER $$
+CREATE TRIGGER trg_inventory_donation_insert
+AFTER INSERT ON donation
+FOR EACH ROW
+BEGIN
+    IF NEW.donation_type = 'Blood' THEN
+        CALL sp_InventoryBloodAdjust(NEW.donor_id, NEW.expiry_date, 1, NEW.quantity_ml);
+    END IF;
+END$$
+DELIMITER ;
+
+DROP TRIGGER IF EXISTS trg_inventory_donation_update;
+DELIMITER $$
+CREATE TRIGGER trg_inventory_donation_update
+AFTER UPDATE ON donation
+FOR EACH ROW
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM donation_request WHERE donation_id = OLD.donation_id) THEN
+        IF OLD.donation_type = 'Blood' THEN
+            CALL sp_InventoryBloodAdjust(OLD.donor_id, OLD.expiry_date, -1, -OLD.quantity_ml);
+        END IF;
+        IF NEW.donation_type = 'Blood' THEN
+            CALL sp_InventoryBloodAdjust(NEW.donor_id, NEW.expiry_date, 1, NEW.quantity_ml);
+        END IF;
+    END IF;
+END$$
+DELIMITER ;
+
+DROP TRIGGER IF EXISTS trg_inventory_donation_delete;
+DELIMITER $$
+CREATE TRIGGER trg_inventory_donation_delete
+AFTER DELETE ON donation
+FOR EACH ROW
+BEGIN
+    IF OLD.donation_type = 'Blood'
+       AND NOT EXISTS (SELECT 1 FROM donation_request WHERE donation_id = OLD.donation_id) THEN
+        CALL sp_InventoryBloodAdjust(OLD.donor_id, OLD.expiry_date, -1, -OLD.quantity_ml);
+    END IF;
+END$$
+DELIMITER ;
+
+-- donation_request: the first link spends a unit, removing the last one returns it
+DROP TRIGGER IF EXISTS trg_inventory_usage_insert;
+DELIMITER $$
+CREATE TRIGGER trg_inventory_usage_insert
+AFTER INSERT ON donation_request
+FOR EACH ROW
+BEGIN
+    DECLARE v_donor_id INT;
+    DECLARE v_expiry DATE;
+    DECLARE v_ml INT;
+    IF (SELECT COUNT(*) FROM donation_request WHERE donation_id = NEW.donation_id) = 1 THEN
+        SELECT donor_id, expiry_date, quantity_ml INTO v_donor_id, v_expiry, v_ml
+        FROM donation WHERE donation_id = NEW.donation_id AND donation_type = 'Blood';
+        IF v_donor_id IS NOT NULL THEN
+            CALL sp_InventoryBloodAdjust(v_donor_id, v_expiry, -1, -v_ml);
+        END IF;
+    END IF;
+END$$
+DELIMITER ;
+
+DROP TRIGGER IF EXISTS trg_inventory_usage_delete;
+DELIMITER $$
+CREATE TRIGGER trg_inventory_usage_delete
+AFTER DELETE ON donation_request
+FOR EACH ROW
+BEGIN
+    DECLARE v_donor_id INT;
+    DECLARE v_expiry DATE;
+    DECLARE v_ml INT;
+    IF NOT EXISTS (SELECT 1 FROM donation_request WHERE donation_id = OLD.donation_id) THEN
+        SELECT donor_id, expiry_date, quantity_ml INTO v_donor_id, v_expiry, v_ml
+        FROM donation WHERE donation_id = OLD.donation_id AND donation_type = 'Blood';
+        IF v_donor_id IS NOT NULL THEN
+            CALL sp_InventoryBloodAdjust(v_donor_id, v_expiry, 1, v_ml);
+        END IF;
+    END IF;
+END$$
+DELIMITER ;
+
+-- donor: units are keyed by the donor's blood group, so a correction moves them
+DROP TRIGGER IF EXISTS trg_inventory_donor_update;
+DELIMITER $$
+CREATE TRIGGER trg_inventory_donor_update
+AFTER UPDATE ON donor
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.blood_group <=> NEW.blood_group) THEN
+        INSERT INTO inventory_blood (blood_group, expiry_date, units, quantity_ml)
+        SELECT g.blood_group, d.expiry_date, g.sign * COUNT(*), g.sign * SUM(d.quantity_ml)
+        FROM donation d
+        JOIN (SELECT OLD.blood_group AS blood_group, -1 AS sign
+              UNION ALL SELECT NEW.blood_group, 1) g
+        WHERE d.donor_id = NEW.donor_id AND d.donation_type = 'Blood' AND d.expiry_date IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM donation_request dr WHERE dr.donation_id = d.donation_id)
+        GROUP BY g.blood_group, g.sign, d.expiry_date
+        ON DUPLICATE KEY UPDATE units = units + VALUES(units), quantity_ml = quantity_ml + VALUES(quantity_ml);
+    END IF;
+END$$
+DELIMITER ;
+
+-- organ
+DROP TRIGGER IF EXISTS trg_inventory_organ_insert;
+DELIMITER $$
+CREATE TRIGGER trg_inventory_organ_insert
+AFTER INSERT ON organ
+FOR EACH ROW
+BEGIN
+    CALL sp_InventoryOrganAdjust(NEW.organ_type, NEW.status, 1);
+END$$
+DELIMITER ;
+
+DROP TRIGGER IF EXISTS trg_inventory_organ_update;
+DELIMITER $$
+CREATE TRIGGER trg_inventory_organ_update
+AFTER UPDATE ON organ
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.organ_type <=> NEW.organ_type AND OLD.status <=> NEW.status) THEN
+        CALL sp_InventoryOrganAdjust(OLD.organ_type, OLD.status, -1);
+        CALL sp_InventoryOrganAdjust(NEW.organ_type, NEW.status, 1);
+    END IF;
+END$$
+DELIMITER ;
+
+DROP TRIGGER IF EXISTS trg_inventory_organ_delete;
+DELIMITER $$
+CREATE TRIGGER trg_inventory_organ_delete
+AFTER DELETE ON organ
+FOR EACH ROW
+BEGIN
+    CALL sp_InventoryOrganAdjust(OLD.organ_type, OLD.status, -1);
+END$$
+DELIMITER ;
+
+-- Backfill from the current data
+DELETE FROM inventory_blood;
+INSERT INTO inventory_blood (blood_group, expiry_date, units, quantity_ml)
+SELECT dn.blood_group, d.expiry_date, COUNT(*), SUM(d.quantity_ml)
+FROM donation d
+JOIN donor dn ON d.donor_id = dn.donor_id
+WHERE d.donation_type = 'Blood' AND d.expiry_date IS NOT NULL
+  AND NOT EXISTS (SELECT 1 FROM donation_request dr WHERE dr.donation_id = d.donation_id)
+GROUP BY dn.blood_group, d.expiry_date;
+
+DELETE FROM inventory_organ;
+INSERT INTO inventory_organ (organ_type, status, organs)
+SELECT organ_type, status, COUNT(*) FROM organ GROUP BY organ_type, status;
@@ -0,0 +1,6 @@
+DROP INDEX idx_recipient_contact ON recipient;
+DROP INDEX idx_recipient_name ON recipient;
+DROP INDEX idx_donor_contact ON donor;
+DROP INDEX idx_donor_name ON donor;
+DROP INDEX ft_recipient_search ON recipient;
+DROP INDEX ft_donor_search ON donor;
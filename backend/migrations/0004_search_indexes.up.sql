@@ -0,0 +1,12 @@
+-- 0004: indexes for /api/<donors|recipients>/search and /suggest.
+--
+-- FULLTEXT for ranked search over free text; plain B-tree indexes on name and
+-- contact so typeahead (LIKE 'abc%') is a range scan rather than a table scan.
+
+CREATE FULLTEXT INDEX ft_donor_search ON donor (name, contact, medical_history);
+CREATE FULLTEXT INDEX ft_recipient_search ON recipient (name, contact, organ_required);
+
+CREATE INDEX idx_donor_name ON donor (name);
+CREATE INDEX idx_donor_contact ON donor (contact);
+CREATE INDEX idx_recipient_name ON recipient (name);
+CREATE INDEX idx_recipient_contact ON recipient (contact);
@@ -0,0 +1,4 @@
+-- 0005 down: drops the audit history.
+DROP TRIGGER IF EXISTS trg_inventory_event_no_delete;
+DROP TRIGGER IF EXISTS trg_inventory_event_no_update;
+DROP TABLE IF EXISTS inventory_event;
@@ -0,0 +1,47 @@
+-- 0005: append-only audit log of inventory and request state transitions.
+--
+-- Written in batches by the background writer in audit.py. Partitioned by
+-- month on occurred_at so time-range queries only touch the months they ask
+-- for and old months can be dropped whole. The table starts with a single
+-- catch-all partition; `python audit.py partitions` (run monthly) splits
+-- out the current and upcoming months.
+--
+-- UPDATE and DELETE are refused by triggers. ALTER TABLE ... DROP PARTITION
+-- does not fire them and is the only way to remove history (retention).
+
+CREATE TABLE IF NOT EXISTS inventory_event (
+    event_id        BIGINT       NOT NULL AUTO_INCREMENT,
+    occurred_at     DATETIME(3)  NOT NULL,
+    entity          VARCHAR(20)  NOT NULL,
+    entity_id       INT          NULL,
+    action          VARCHAR(20)  NOT NULL,
+    related_id      INT          NULL,
+    source          VARCHAR(60)  NULL,
+    data            JSON         NULL,
+    PRIMARY KEY (event_id, occurred_at),
+    KEY idx_event_time (occurred_at),
+    KEY idx_event_entity (entity, entity_id, occurred_at)
+) ENGINE=InnoDB
+PARTITION BY RANGE COLUMNS (occurred_at) (
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
+);
+
+DROP TRIGGER IF EXISTS trg_inventory_event_no_update;
+DELIMITER $$
+CREATE TRIGGER trg_inventory_event_no_update
+BEFORE UPDATE ON inventory_event
+FOR EACH ROW
+BEGIN
+    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'inventory_event is append-only';
+END$$
+DELIMITER ;
+
+DROP TRIGGER IF EXISTS trg_inventory_event_no_delete;
+DELIMITER $$
+CREATE TRIGGER trg_inventory_event_no_delete
+BEFORE DELETE ON inventory_event
+FOR EACH ROW
+BEGIN
+    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'inventory_event is append-only';
+END$$
+DELIMITER ;
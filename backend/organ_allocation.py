@@ -0,0 +1,130 @@
+# organ_allocation.py
+# Allocates available organs to the organ waitlist.
+#
+# The waitlist is every Pending organ request, bucketed by (organ_required,
+# recipient ABO group) into heaps ordered by priority: oldest request first,
+# request_id as the tie-break. (requests has no urgency column; once one is
+# added it belongs at the front of the priority key.) An organ is offered to
+# the best-placed request across all buckets whose ABO group can receive it.
+#
+# Both the organ rows and the waitlist rows are read with SELECT ... FOR UPDATE
+# before anything is changed, and the UPDATEs re-check the old status, so two
+# concurrent callers can never hand out the same organ or fill the same request
+# twice: the second one waits for the first to commit and then sees the rows
+# as already taken.
+import heapq
+
+# Solid organ ABO compatibility (Rh does not matter): recipient -> donor groups
+ABO_DONORS = {
+    "O": ("O",),
+    "A": ("A", "O"),
+    "B": ("B", "O"),
+    "AB": ("AB", "A", "B", "O"),
+}
+
+
+class AllocationConflict(Exception):
+    pass
+
+
+def abo(blood_group):
+    return blood_group.rstrip("+-").upper() if blood_group else None
+
+
+def organ_key(organ):
+    """Organ types are free text; lock_waitlist's IN (...) compares them
+    case-insensitively, so the buckets must too."""
+    return organ.strip().casefold() if organ else None
+
+
+class Waitlist:
+    def __init__(self, pending):
+        self._queues = {}
+        for request_id, request_date, organ_required, blood_group in pending:
+            key = (organ_key(organ_required), abo(blood_group))
+            heapq.heappush(self._queues.setdefault(key, []), (request_date, request_id))
+
+    def pop_for(self, organ_type, donor_blood_group):
+        """Remove and return the highest-priority request that can take this organ."""
+        donor_abo = abo(donor_blood_group)
+        organ_type = organ_key(organ_type)
+        best = None
+        for recipient_abo, donors in ABO_DONORS.items():
+            if donor_abo not in donors:
+                continue
+            queue = self._queues.get((organ_type, recipient_abo))
+            if queue and (best is None or queue[0] < best[0]):
+                best = (queue[0], queue)
+        if best is None:
+            return None
+        return heapq.heappop(best[1])[1]
+
+
+def _placeholders(values):
+    return ", ".join(["%s"] * len(values))
+
+
+def lock_available_organs(cursor, organ_ids=None):
+    sql = """
+        SELECT o.organ_id, o.organ_type, dn.blood_group
+        FROM organ o
+        JOIN donor dn ON o.donor_id = dn.donor_id
+        WHERE o.status = 'Available' AND o.request_id IS NULL
+    """
+    params = ()
+    if organ_ids is not None:
+        sql += f" AND o.organ_id IN ({_placeholders(organ_ids)})"
+        params = tuple(organ_ids)
+    cursor.execute(sql + " ORDER BY o.organ_id FOR UPDATE", params)
+    return cursor.fetchall()
+
+
+def lock_waitlist(cursor, organ_types):
+    cursor.execute(f"""
+        SELECT r.request_id, r.request_date, rec.organ_required, rec.blood_group
+        FROM requests r
+        JOIN recipient rec ON r.recipient_id = rec.recipient_id
+        WHERE r.request_type = 'Organ' AND r.status = 'Pending'
+          AND rec.organ_required IN ({_placeholders(organ_types)})
+        ORDER BY r.request_id
+        FOR UPDATE
+    """, tuple(organ_types))
+    return cursor.fetchall()
+
+
+def allocate(cursor, organ_id, request_id):
+    """Link one organ to one request; both must still be open."""
+    cursor.execute(
+        "UPDATE organ SET request_id = %s, status = 'Transplanted' "
+        "WHERE organ_id = %s AND status = 'Available' AND request_id IS NULL",
+        (request_id, organ_id),
+    )
+    if cursor.rowcount != 1:
+        raise AllocationConflict(f"Organ {organ_id} is not available")
+    cursor.execute(
+        "UPDATE requests SET status = 'Fulfilled' WHERE request_id = %s AND status = 'Pending'",
+        (request_id,),
+    )
+    if cursor.rowcount != 1:
+        raise AllocationConflict(f"Request {request_id} is not pending")
+
+
+def allocate_batch(cursor, organ_ids=None):
+    """Match available organs (all, or just `organ_ids`) against the waitlist.
+
+    Runs inside the caller's transaction; returns (allocations, unallocated).
+    """
+    organs = lock_available_organs(cursor, organ_ids)
+    if not organs:
+        return [], []
+    waitlist = Waitlist(lock_waitlist(cursor, sorted({o[1] for o in organs})))
+
+    allocations, unallocated = [], []
+    for organ_id, organ_type, blood_group in organs:
+        request_id = waitlist.pop_for(organ_type, blood_group)
+        if request_id is None:
+            unallocated.append(organ_id)
+            continue
+        allocate(cursor, organ_id, request_id)
+        allocations.append({"organ_id": organ_id, "request_id": request_id, "organ_type": organ_type})
+    return allocations, unallocated
@@ -0,0 +1,89 @@
+# search.py
+# Server-side search and typeahead for donors and recipients (migration 0004).
+#
+#  * search():  ranked search over name / contact / free text with the
+#               FULLTEXT index. Every word must match (as a prefix); rows
+#               whose name starts with the query come first, then by
+#               relevance.
+#  * suggest(): typeahead on the B-tree name (or, for digits, contact) index:
+#               LIKE 'abc%' range scan, alphabetical, a handful of rows with
+#               only the columns a dropdown needs.
+#
+# Words shorter than the FULLTEXT minimum token size are not in the index;
+# they are applied as substring filters on top of the FULLTEXT match, or
+# served by the typeahead path when the query has no longer word at all.
+import re
+from collections import namedtuple
+
+SEARCH_MAX_QUERY = 100
+SEARCH_MAX_LIMIT = 100
+SEARCH_MAX_OFFSET = 1000
+FT_MIN_TOKEN = 3    # innodb_ft_min_token_size (server default)
+
+# table, primary key, FULLTEXT columns (as indexed), columns returned by
+# search(), columns returned by suggest()
+SearchSpec = namedtuple("SearchSpec", "table pk fulltext columns suggest_columns")
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_CONTACT_RE = re.compile(r"^[\d+\-\s()]+$")
+
+
+class SearchError(ValueError):
+    pass
+
+
+def parse_query(raw):
+    query = (raw or "").strip()
+    if not query:
+        raise SearchError("'q' is required")
+    if len(query) > SEARCH_MAX_QUERY:
+        raise SearchError(f"'q' must be at most {SEARCH_MAX_QUERY} characters")
+    return query
+
+
+def _escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search(cursor, spec, query, limit, offset=0):
+    """Up to `limit` ranked rows plus whether more exist."""
+    words = [w.lower() for w in _WORD_RE.findall(query)]
+    long_words = [w for w in words if len(w) >= FT_MIN_TOKEN]
+    if not long_words:
+        rows = suggest(cursor, spec, query, limit + 1, offset, columns=spec.columns)
+        return rows[:limit], len(rows) > limit
+
+    match = f"MATCH({', '.join(spec.fulltext)}) AGAINST (%s IN BOOLEAN MODE)"
+    boolean_query = " ".join(f"+{w}*" for w in long_words)
+    conditions, params = [match], [boolean_query]
+    for word in words:
+        if len(word) < FT_MIN_TOKEN:
+            conditions.append("(" + " OR ".join(f"{c} LIKE %s" for c in spec.fulltext) + ")")
+            params.extend([f"%{_escape_like(word)}%"] * len(spec.fulltext))
+
+    cursor.execute(f"""
+        SELECT {", ".join(spec.columns)}, {match} AS score, name LIKE %s AS name_prefix
+        FROM {spec.table}
+        WHERE {" AND ".join(conditions)}
+        ORDER BY name_prefix DESC, score DESC, {spec.pk} DESC
+        LIMIT %s OFFSET %s
+    """, (boolean_query, _escape_like(query) + "%", *params, limit + 1, offset))
+    rows = cursor.fetchall()
+    for row in rows:
+        row["score"] = round(float(row["score"]), 4)
+        del row["name_prefix"]
+    return rows[:limit], len(rows) > limit
+
+
+def suggest(cursor, spec, prefix, limit, offset=0, columns=None):
+    """Rows whose name (or contact, for a phone-number-like prefix) starts
+    with `prefix`."""
+    column = "contact" if _CONTACT_RE.match(prefix) else "name"
+    cursor.execute(f"""
+        SELECT {", ".join(columns or spec.suggest_columns)}
+        FROM {spec.table}
+        WHERE {column} LIKE %s
+        ORDER BY {column}, {spec.pk}
+        LIMIT %s OFFSET %s
+    """, (_escape_like(prefix) + "%", limit, offset))
+    return cursor.fetchall()
@@ -0,0 +1,68 @@
+# serve.py
+# Production launcher: `python serve.py` instead of `python app.py`.
+#
+# Runs gunicorn with gunicorn.conf.py (multi-process, threaded workers) where
+# it is available, and falls back to waitress (a single multi-threaded process)
+# on Windows or when gunicorn is not installed. Both drain in-flight requests
+# on SIGTERM / Ctrl+C before exiting.
+import argparse
+import os
+import sys
+
+import db_config
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Blood Bank API with a production server.")
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 5000)))
+    parser.add_argument("--workers", type=int, help="worker processes (gunicorn only)")
+    parser.add_argument("--threads", type=int, default=int(os.environ.get("WEB_THREADS", 4)),
+                        help="threads per worker (default %(default)s)")
+    parser.add_argument("--server", choices=("auto", "gunicorn", "waitress"), default="auto")
+    parser.add_argument("--skip-db-check", action="store_true",
+                        help="start even if MySQL is unreachable or routines are missing")
+    options = parser.parse_args()
+
+    server = options.server
+    if server == "auto":
+        server = "gunicorn" if os.name != "nt" and _installed("gunicorn") else "waitress"
+
+    os.environ["BIND"] = f"{options.host}:{options.port}"
+    os.environ["WEB_THREADS"] = str(options.threads)
+
+    if server == "gunicorn":
+        if options.workers:
+            os.environ["WEB_CONCURRENCY"] = str(options.workers)
+        # gunicorn.conf.py's on_starting hook runs the startup check
+        if options.skip_db_check:
+            os.environ["SKIP_DB_CHECK"] = "1"
+        here = os.path.dirname(os.path.abspath(__file__))
+        os.chdir(here)
+        os.execvp(sys.executable, [
+            sys.executable, "-m", "gunicorn", "-c", os.path.join(here, "gunicorn.conf.py"), "wsgi:app",
+        ])
+
+    if not options.skip_db_check:
+        problems = db_config.check_database()
+        if problems:
+            for problem in problems:
+                print(problem, file=sys.stderr)
+            sys.exit(1)
+
+    os.environ["WEB_CONCURRENCY"] = "1"   # one process: in-memory versions and cache are coherent
+    from waitress import serve
+    from wsgi import app
+    try:
+        serve(app, host=options.host, port=options.port, threads=options.threads)
+    finally:
+        db_config.pool.dispose()
+
+
+def _installed(module):
+    import importlib.util
+    return importlib.util.find_spec(module) is not None
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,5 @@
+# Backend modules are imported flat (from db_config import ...), as app.py does
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,142 @@
+import json
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import audit
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def execute(self, sql, params=()):
+        self.pos = 0
+
+    def fetchmany(self, size):
+        rows = self.rows[self.pos:self.pos + size]
+        self.pos += size
+        return rows
+
+
+class FakeConnection:
+    def __init__(self, events):
+        self.rows = [(entity, entity_id, action, json.dumps(data) if data else None)
+                     for entity, entity_id, action, data in events]
+
+    def cursor(self):
+        return FakeCursor(self.rows)
+
+
+TODAY = date(2026, 10, 18)
+FRESH = str(TODAY + timedelta(days=30))
+STALE = str(TODAY - timedelta(days=1))
+
+
+def donation(donation_id, donor_id, expiry_date=FRESH, group="A+", ml=450):
+    return ("donation", donation_id, "created",
+            {"donor_id": donor_id, "quantity_ml": ml, "blood_group": group, "expiry_date": expiry_date})
+
+
+def replay(*events):
+    return audit.replay(FakeConnection(events), until=datetime(2026, 10, 18, 12))
+
+
+def test_replay_counts_usable_blood():
+    state = replay(donation(1, 5), donation(2, 5, ml=300), donation(3, 5, expiry_date=STALE))
+    assert state["blood"] == {("A+", date.fromisoformat(FRESH)): (2, 750)}
+
+
+def test_replay_applies_consumption_and_deletion():
+    state = replay(donation(1, 5), donation(2, 5), donation(3, 5),
+                   ("donation", 1, "consumed", None), ("donation", 2, "deleted", None))
+    assert state["blood"] == {("A+", date.fromisoformat(FRESH)): (1, 450)}
+
+
+def test_donor_regroup_moves_their_units():
+    state = replay(donation(1, 5), ("donor", 5, "updated", {"blood_group": "O-"}))
+    assert state["blood"] == {("O-", date.fromisoformat(FRESH)): (1, 450)}
+
+
+def test_replay_tracks_organs_and_requests():
+    state = replay(
+        ("organ", 1, "created", {"organ_type": "Kidney", "status": "Available"}),
+        ("organ", 2, "created", {"organ_type": "Kidney", "status": "Available"}),
+        ("requests", 7, "created", {"request_type": "Organ"}),
+        ("requests", 8, "created", {"request_type": "Blood"}),
+        ("organ", 1, "transplanted", None),
+        ("requests", 7, "fulfilled", {"item": "organ"}),
+    )
+    assert state["organs"] == {("Kidney", "Available"): (1,), ("Kidney", "Transplanted"): (1,)}
+    assert state["pending_requests"] == {"Blood": 1}
+
+
+def test_parse_window_caps_the_span():
+    now = datetime(2026, 10, 18)
+    assert audit.parse_window(None, None, now) == (now - timedelta(days=1), now)
+    with pytest.raises(audit.AuditQueryError):
+        audit.parse_window("2026-01-01", "2026-10-01")
+    with pytest.raises(audit.AuditQueryError):
+        audit.parse_window("2026-10-02", "2026-10-01")
+
+
+def test_parse_window_converts_offsets_to_utc():
+    start, end = audit.parse_window("2026-10-18T09:30:00+02:00", "2026-10-18T10:00:00Z")
+    assert (start, end) == (datetime(2026, 10, 18, 7, 30), datetime(2026, 10, 18, 10, 0))
+
+
+def test_query_returns_utc_timestamps():
+    class Cursor:
+        def execute(self, sql, params):
+            pass
+
+        def fetchall(self):
+            return [{"event_id": 1, "occurred_at": datetime(2026, 10, 18, 9, 30), "data": None}]
+
+    events, next_cursor = audit.query(Cursor(), datetime(2026, 10, 18), datetime(2026, 10, 19))
+    assert events[0]["occurred_at"].isoformat() == "2026-10-18T09:30:00+00:00"
+    assert next_cursor is None
+
+
+class RecordingConnection:
+    def __init__(self, batches):
+        self.batches = batches
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def execute(self, sql, params=()):
+        pass
+
+    def fetchall(self):
+        return []
+
+    def executemany(self, sql, rows):
+        self.batches.append(rows)
+
+    def commit(self):
+        pass
+
+
+def test_writer_writes_bulk_events_in_batches(monkeypatch):
+    batches = []
+    connection = RecordingConnection(batches)
+    monkeypatch.setattr(audit, "db_connection", lambda: connection)
+    log = audit.AuditLog(batch_size=2, flush_interval=0.05)
+    log.record_many("donor", "created", [(i, {"blood_group": "O+"}) for i in range(1, 6)])
+    log.record("donor", 1, "deleted")
+    log.close()
+    assert all(len(batch) <= 2 for batch in batches)
+    assert [row[2] for batch in batches for row in batch] == [1, 2, 3, 4, 5, 1]
@@ -0,0 +1,86 @@
+from datetime import date
+
+import pytest
+from mysql.connector import Error
+
+from bulk_import import ImportSpec, blood_group, insert_rows, iso_date, positive_int, text, validate
+from transactions import RETRYABLE_ERRNOS
+
+SPEC = ImportSpec(
+    "INSERT INTO donation (donor_id, quantity_ml, donation_date) VALUES (%s, %s, %s)",
+    [("donor_id", positive_int), ("quantity_ml", positive_int), ("donation_date", iso_date)],
+)
+
+
+def test_validate_cleans_rows_and_reports_every_error():
+    rows = [
+        {"donor_id": " 7 ", "quantity_ml": 450, "donation_date": "2026-10-18"},
+        {"donor_id": "x", "quantity_ml": 0, "donation_date": "2026-10-18"},
+        "not a row",
+    ]
+    valid, errors = validate(SPEC, rows)
+    assert valid == [(1, (7, 450, date(2026, 10, 18)))]
+    assert errors == [
+        {"row": 2, "errors": ["donor_id must be an integer", "quantity_ml must be greater than 0"]},
+        {"row": 3, "errors": ["row must be an object"]},
+    ]
+
+
+def test_field_validators():
+    assert blood_group(" ab+ ") == "AB+"
+    with pytest.raises(ValueError):
+        blood_group("C+")
+    with pytest.raises(ValueError, match="is required"):
+        text("   ")
+
+
+class FakeCursor:
+    """Assigns consecutive ids; rows whose first value is in `bad` fail."""
+
+    def __init__(self, bad=(), errno=1452):
+        self.bad, self.errno = set(bad), errno
+        self.next_id = 100
+        self.statements = []
+
+    def _insert(self, rows):
+        if any(args[0] in self.bad for args in rows):
+            raise Error(msg="foreign key", errno=self.errno)
+        self.lastrowid = self.next_id
+        self.next_id += len(rows)
+
+    def execute(self, sql, args=None):
+        self.statements.append(sql)
+        if args is not None:
+            self._insert([args])
+
+    def executemany(self, sql, rows):
+        self.statements.append("executemany")
+        self._insert(rows)
+
+
+def numbered(*first_values):
+    return [(i, (value, 450, date(2026, 10, 18))) for i, value in enumerate(first_values, start=1)]
+
+
+def test_batches_report_consecutive_ids():
+    cursor = FakeCursor()
+    inserted, errors = insert_rows(cursor, SPEC, numbered(1, 2, 3), batch_size=2)
+    assert [row_id for row_id, _ in inserted] == [100, 101, 102]
+    assert [args[0] for _, args in inserted] == [1, 2, 3]
+    assert errors == []
+    assert cursor.statements.count("executemany") == 2
+
+
+def test_rejected_batch_is_replayed_row_by_row():
+    cursor = FakeCursor(bad={2})
+    inserted, errors = insert_rows(cursor, SPEC, numbered(1, 2, 3), batch_size=5)
+    assert [args[0] for _, args in inserted] == [1, 3]
+    assert [e["row"] for e in errors] == [2]
+    assert "ROLLBACK TO SAVEPOINT bulk_batch" in cursor.statements
+    assert "ROLLBACK TO SAVEPOINT bulk_row" in cursor.statements
+
+
+def test_deadlock_is_left_to_the_caller():
+    cursor = FakeCursor(bad={1}, errno=RETRYABLE_ERRNOS[0])
+    with pytest.raises(Error):
+        insert_rows(cursor, SPEC, numbered(1), batch_size=5)
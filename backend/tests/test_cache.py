@@ -0,0 +1,46 @@
+import time
+
+from cache import LRUCache, create_cache
+
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.set("a", 1, 60)
+    cache.set("b", 2, 60)
+    cache.get("a")
+    cache.set("c", 3, 60)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+
+
+def test_entries_expire():
+    cache = LRUCache()
+    cache.set("a", 1, 0.01)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+
+
+def test_add_only_sets_absent_keys():
+    cache = LRUCache()
+    assert cache.add("k", 1, 60)
+    assert not cache.add("k", 2, 60)
+    cache.delete("k")
+    assert cache.add("k", 3, 60)
+    assert cache.get("k") == 3
+
+
+def test_get_or_load_caches_values_but_not_none():
+    cache = LRUCache()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return None if len(calls) == 1 else "row"
+
+    assert cache.get_or_load("k", loader, 60) is None
+    assert cache.get_or_load("k", loader, 60) == "row"
+    assert cache.get_or_load("k", loader, 60) == "row"
+    assert len(calls) == 2
+
+
+def test_without_a_redis_url_the_cache_is_in_process():
+    assert isinstance(create_cache(url=""), LRUCache)
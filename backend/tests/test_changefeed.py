@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from changefeed import ChangeFeed, TooManySubscribers
+
+
+def parse(frame):
+    fields = dict(line.split(": ", 1) for line in frame.strip().split("\n"))
+    return fields["id"], fields["event"], json.loads(fields["data"])
+
+
+def test_stream_replays_events_after_the_cursor_for_chosen_topics():
+    feed = ChangeFeed(history=10, max_subscribers=2, redis_url="")
+    start = feed.current()
+    feed.publish("donor", "create", [1])
+    feed.publish("organ", "update", [2], status="Transplanted")
+    feed.publish("donor", "delete", [3])
+
+    frames = iter(feed.stream({"donor"}, start, heartbeat=0.01, max_duration=1))
+    assert next(frames).startswith("retry: ")
+    changes = [parse(next(frames)) for _ in range(2)]
+    assert [(kind, data["op"], data["ids"]) for _, kind, data in changes] == [
+        ("change", "create", [1]), ("change", "delete", [3])]
+    assert changes[-1][0] == f"{feed.boot_id}-3"
+    assert next(frames) == ": keep-alive\n\n"
+    frames.close()
+
+
+def test_unknown_or_foreign_last_event_id_resets():
+    feed = ChangeFeed(history=10, redis_url="")
+    feed.publish("donor", "create", [1])
+    assert feed.parse_last_event_id("") == feed.current()
+    assert feed.parse_last_event_id(f"{feed.boot_id}-1") == 1
+    assert feed.parse_last_event_id("otherboot-1") is None
+
+    frames = iter(feed.stream({"donor"}, None, heartbeat=0.01, max_duration=1))
+    next(frames)
+    _, kind, _ = parse(next(frames))
+    assert kind == "reset"
+    frames.close()
+
+
+def test_overflowed_history_resets():
+    feed = ChangeFeed(history=2, redis_url="")
+    for i in range(5):
+        feed.publish("donor", "create", [i])
+    frames = iter(feed.stream({"donor"}, 1, heartbeat=0.01, max_duration=1))
+    next(frames)
+    stream_id, kind, _ = parse(next(frames))
+    assert (stream_id, kind) == (f"{feed.boot_id}-5", "reset")
+    frames.close()
+
+
+def test_subscriber_cap_and_release_on_close():
+    feed = ChangeFeed(max_subscribers=1, redis_url="")
+    first = feed.stream({"donor"}, 0)
+    with pytest.raises(TooManySubscribers):
+        feed.stream({"donor"}, 0)
+    first.close()
+    first.close()   # closing twice frees the slot once
+    feed.stream({"donor"}, 0).close()
@@ -0,0 +1,110 @@
+import threading
+import time
+
+import pytest
+
+from db_pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.in_transaction = False
+
+    def ping(self, reconnect=False):
+        pass
+
+    def rollback(self):
+        self.in_transaction = False
+
+    def close(self):
+        self.closed = True
+
+    def shutdown(self):
+        self.closed = True
+
+
+def make_pool(**kwargs):
+    opened = []
+
+    def creator():
+        conn = FakeConnection()
+        opened.append(conn)
+        return conn
+
+    options = dict(size=2, max_overflow=0, timeout=1.0, recycle=None, pre_ping=False)
+    options.update(kwargs)
+    return ConnectionPool(creator, **options), opened
+
+
+def test_reuses_most_recently_returned_connection():
+    pool, opened = make_pool()
+    a = pool.acquire()
+    b = pool.acquire()
+    pool.release(a)
+    pool.release(b)
+    assert pool.acquire() is b
+    assert len(opened) == 2
+
+
+def test_times_out_when_exhausted():
+    pool, _ = make_pool(size=1, timeout=0.1)
+    pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+
+
+def test_overflow_connections_are_closed_on_return():
+    pool, opened = make_pool(size=1, max_overflow=1)
+    a, b = pool.acquire(), pool.acquire()
+    pool.release(a)
+    pool.release(b)
+    assert pool.status()["idle"] == 1
+    assert opened[1].closed
+
+
+def test_open_transaction_is_rolled_back_on_return():
+    pool, opened = make_pool(size=1)
+    entry = pool.acquire()
+    entry.conn.in_transaction = True
+    pool.release(entry)
+    assert not pool.acquire().conn.in_transaction
+
+
+def test_discard_wakes_a_waiter():
+    pool, opened = make_pool(size=1, timeout=3.0)
+    entry = pool.acquire()
+    timer = threading.Timer(0.2, pool.release, (entry,), {"discard": True})
+    timer.start()
+    started = time.monotonic()
+    replacement = pool.acquire()
+    waited = time.monotonic() - started
+    timer.join()
+    assert waited < 1.0
+    assert replacement.conn is opened[1]
+    assert opened[0].closed
+
+
+def test_release_wakes_a_waiter():
+    pool, _ = make_pool(size=1, timeout=3.0)
+    entry = pool.acquire()
+    threading.Timer(0.2, pool.release, (entry,)).start()
+    started = time.monotonic()
+    assert pool.acquire() is entry
+    assert time.monotonic() - started < 1.0
+
+
+def test_failed_open_frees_the_slot():
+    calls = []
+
+    def creator():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("connection refused")
+        return FakeConnection()
+
+    pool = ConnectionPool(creator, size=1, max_overflow=0, timeout=0.5, recycle=None, pre_ping=False)
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+    assert pool.acquire().conn is not None
+    assert pool.status()["open"] == 1
@@ -0,0 +1,20 @@
+import pytest
+
+from expiry import MAX_BATCH_IDS, parse_ids
+
+
+def test_accepts_lists_and_comma_separated_strings():
+    assert parse_ids([3, "1", 2, 3]) == [1, 2, 3]
+    assert parse_ids("5, 4,,4") == [4, 5]
+
+
+@pytest.mark.parametrize("raw", [None, [], "", ",", "1,x", [1.5j], {"ids": [1]}])
+def test_rejects_anything_else(raw):
+    with pytest.raises(ValueError, match="non-empty list of integers"):
+        parse_ids(raw)
+
+
+def test_caps_the_batch():
+    parse_ids(list(range(MAX_BATCH_IDS)))
+    with pytest.raises(ValueError, match="At most"):
+        parse_ids(list(range(MAX_BATCH_IDS + 1)))
@@ -0,0 +1,79 @@
+import pytest
+from flask import Flask, jsonify, request
+
+from cache import LRUCache
+from idempotency import IdempotencyStore
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    idempotent = IdempotencyStore(LRUCache())
+    app.calls = []
+
+    @app.route("/api/things", methods=["POST"])
+    @idempotent
+    def create():
+        app.calls.append(request.json)
+        if request.json.get("fail"):
+            return jsonify({"error": "database down"}), 503
+        return jsonify({"created": len(app.calls)}), 201
+
+    client = app.test_client()
+    client.calls = app.calls
+    client.store = idempotent
+    return client
+
+
+def post(client, body, key="k1"):
+    return client.post("/api/things", json=body, headers={"Idempotency-Key": key} if key else {})
+
+
+def test_retry_with_same_key_replays_the_stored_response(client):
+    first = post(client, {"name": "a"})
+    second = post(client, {"name": "a"})
+    assert first.status_code == second.status_code == 201
+    assert second.get_json() == first.get_json() == {"created": 1}
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert len(client.calls) == 1
+
+
+def test_without_a_key_every_request_runs(client):
+    post(client, {"name": "a"}, key=None)
+    post(client, {"name": "a"}, key=None)
+    assert len(client.calls) == 2
+
+
+def test_same_key_with_a_different_body_is_rejected(client):
+    post(client, {"name": "a"})
+    response = post(client, {"name": "b"})
+    assert response.status_code == 422
+    assert len(client.calls) == 1
+
+
+def test_same_key_with_a_different_query_string_is_rejected(client):
+    client.post("/api/things?skip_invalid=true", json={"name": "a"}, headers={"Idempotency-Key": "k1"})
+    response = client.post("/api/things?skip_invalid=false", json={"name": "a"},
+                           headers={"Idempotency-Key": "k1"})
+    assert response.status_code == 422
+    assert len(client.calls) == 1
+
+
+def test_server_errors_are_not_stored(client):
+    assert post(client, {"fail": True}).status_code == 503
+    assert post(client, {"fail": True}).status_code == 503
+    assert len(client.calls) == 2
+
+
+def test_request_still_in_progress_gets_409(client):
+    # What the first request leaves behind until its response is stored
+    client.store.cache.add("idempotency:POST:/api/things:k1", {"fingerprint": "pending"}, 60)
+    response = post(client, {"name": "a"})
+    assert response.status_code == 409
+    assert response.headers["Retry-After"] == "1"
+    assert client.calls == []
+
+
+def test_overlong_key_is_rejected(client):
+    assert post(client, {"name": "a"}, key="k" * 256).status_code == 400
+    assert client.calls == []
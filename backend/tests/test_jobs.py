@@ -0,0 +1,49 @@
+import itertools
+import threading
+import time
+
+import jobs
+
+
+class LockConnection:
+    """Fake session; the first one to ask gets the (server-wide) lock."""
+    holder = None
+
+    def __init__(self, session):
+        self.session = session
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def execute(self, sql, params=()):
+        if LockConnection.holder is None:
+            LockConnection.holder = self.session
+        self.result = (1 if LockConnection.holder == self.session else 0,)
+
+    def fetchone(self):
+        return self.result
+
+    def ping(self, reconnect=False):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_only_the_lock_holder_runs_the_job(monkeypatch):
+    sessions = itertools.count()
+    monkeypatch.setattr(jobs, "get_db_connection", lambda: LockConnection(next(sessions)))
+    runs, stop = [], threading.Event()
+    threads = [jobs.start_job(f"test-job-{worker}", 0.02, lambda worker=worker: runs.append(worker), stop)
+               for worker in range(3)]
+    time.sleep(0.2)
+    stop.set()
+    for thread in threads:
+        thread.join(1)
+    assert runs and set(runs) == {0}
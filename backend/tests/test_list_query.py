@@ -0,0 +1,88 @@
+from datetime import date
+
+import pytest
+
+from list_query import MAX_LIMIT, ListQuery, ListQueryError, ListSpec, date_from, eq
+
+DONORS = ListSpec(
+    "FROM donor",
+    pk=("donor_id", "donor_id"),
+    columns={c: c for c in ("donor_id", "name", "blood_group")},
+    default_select="*",
+    filters={"blood_group": eq("blood_group")},
+)
+DONATIONS = ListSpec(
+    """
+    FROM donation d
+    JOIN donor dn ON d.donor_id = dn.donor_id
+    """,
+    pk=("donation_id", "d.donation_id"),
+    columns={
+        "donation_id": "d.donation_id",
+        "expiry_date": "d.expiry_date",
+        "donor_name": "dn.name",
+        "donor_id": "d.donor_id",
+        "blood_group": "dn.blood_group",
+    },
+    default_fields=["donation_id", "expiry_date", "donor_name"],
+    filters={
+        "blood_group": eq("dn.blood_group"),
+        "donor_id": eq("d.donor_id"),
+        "expiry_from": date_from("d.expiry_date"),
+    },
+)
+
+
+def test_default_listing_is_unpaginated_and_newest_first():
+    query = ListQuery(DONORS, {})
+    assert query.sql == "SELECT * FROM donor ORDER BY donor_id DESC"
+    assert query.params == ()
+    assert not query.paginated
+
+
+def test_fields_are_whitelisted_and_always_include_the_key():
+    query = ListQuery(DONATIONS, {"fields": "donor_name, expiry_date"})
+    assert query.sql.startswith(
+        "SELECT d.donation_id AS donation_id, dn.name AS donor_name, d.expiry_date AS expiry_date ")
+    with pytest.raises(ListQueryError, match="Unknown field"):
+        ListQuery(DONATIONS, {"fields": "donor_name,password"})
+
+
+def test_filters_become_equality_in_and_date_conditions():
+    query = ListQuery(DONATIONS, {
+        "blood_group": "O-,O+", "donor_id": "7", "expiry_from": "2026-10-01"})
+    assert "dn.blood_group IN (%s, %s)" in query.sql
+    assert "d.donor_id = %s" in query.sql
+    assert "d.expiry_date >= %s" in query.sql
+    assert query.params == ("O-", "O+", "7", date(2026, 10, 1))
+
+
+@pytest.mark.parametrize("args, message", [
+    ({"colour": "red"}, "Unknown filter"),
+    ({"expiry_from": "yesterday"}, "must be a date"),
+    ({"limit": "ten"}, "'limit' must be an integer"),
+    ({"limit": "0"}, "'limit' must be at least 1"),
+    ({"cursor": "-1"}, "'cursor' must be at least 0"),
+])
+def test_bad_arguments_are_rejected(args, message):
+    with pytest.raises(ListQueryError, match=message):
+        ListQuery(DONATIONS, args)
+
+
+def test_keyset_page_fetches_one_extra_row_below_the_cursor():
+    query = ListQuery(DONORS, {"limit": "2", "cursor": "100"})
+    assert query.sql.endswith("WHERE donor_id < %s ORDER BY donor_id DESC LIMIT %s")
+    assert query.params == (100, 3)
+
+
+def test_limit_is_capped():
+    assert ListQuery(DONORS, {"limit": str(MAX_LIMIT * 10)}).limit == MAX_LIMIT
+
+
+def test_page_returns_next_cursor_only_when_more_rows_exist():
+    query = ListQuery(DONORS, {"limit": "2"})
+    rows = [{"donor_id": 9}, {"donor_id": 8}, {"donor_id": 7}]
+    assert query.page(rows) == (rows[:2], 8)
+    assert query.page(rows[:2]) == (rows[:2], None)
+    assert query.page([(9, "a"), (8, "b"), (7, "c")], columns=("donor_id", "name")) == (
+        [(9, "a"), (8, "b")], 8)
@@ -0,0 +1,65 @@
+from datetime import date
+
+import pytest
+
+from matching import COMPATIBLE_DONORS, plan_allocations
+
+GROUPS = ["O-", "O+", "A-", "A+", "B-", "B+", "AB-", "AB+"]
+
+
+def can_donate(donor, recipient):
+    """Red cell rule: the donor may not carry an antigen the recipient lacks."""
+    donor_abo, recipient_abo = donor.rstrip("+-"), recipient.rstrip("+-")
+    abo_ok = donor_abo == "O" or donor_abo == recipient_abo or recipient_abo == "AB"
+    rh_ok = donor.endswith("-") or recipient.endswith("+")
+    return abo_ok and rh_ok
+
+
+@pytest.mark.parametrize("recipient", GROUPS)
+def test_blood_table_matches_red_cell_rules(recipient):
+    donors = COMPATIBLE_DONORS[recipient]
+    assert sorted(donors) == sorted(g for g in GROUPS if can_donate(g, recipient))
+    assert donors[0] == recipient          # identical group preferred
+    assert donors[-1] == "O-"              # universal donor kept for last
+
+
+def test_blood_table_covers_every_group():
+    assert set(COMPATIBLE_DONORS) == set(GROUPS)
+
+
+def test_plan_serves_first_expiring_unit_of_the_same_group():
+    units = [
+        (1, "A+", date(2026, 11, 30)),
+        (2, "A+", date(2026, 11, 1)),
+        (3, "O-", date(2026, 10, 20)),
+    ]
+    allocations, unmatched = plan_allocations(units, [(10, date(2026, 10, 1), "A+")])
+    assert [(a["request_id"], a["donation_id"]) for a in allocations] == [(10, 2)]
+    assert allocations[0]["donor_blood_group"] == "A+"
+    assert unmatched == []
+
+
+def test_plan_falls_back_to_compatible_groups_and_reports_unmatched():
+    units = [(1, "O-", date(2026, 11, 1))]
+    pending = [
+        (10, date(2026, 10, 1), "AB+"),   # oldest request takes the only unit
+        (11, date(2026, 10, 2), "O-"),
+    ]
+    allocations, unmatched = plan_allocations(units, pending)
+    assert [(a["request_id"], a["donation_id"]) for a in allocations] == [(10, 1)]
+    assert unmatched == [11]
+
+
+def test_plan_never_gives_an_incompatible_unit():
+    units = [(1, "A+", date(2026, 11, 1)), (2, "B-", date(2026, 11, 1))]
+    allocations, unmatched = plan_allocations(units, [(10, date(2026, 10, 1), "O+")])
+    assert allocations == []
+    assert unmatched == [10]
+
+
+def test_plan_stops_at_limit():
+    units = [(i, "O+", date(2026, 11, i)) for i in range(1, 6)]
+    pending = [(10 + i, date(2026, 10, i), "O+") for i in range(1, 6)]
+    allocations, unmatched = plan_allocations(units, pending, limit=2)
+    assert [a["request_id"] for a in allocations] == [11, 12]
+    assert unmatched == []
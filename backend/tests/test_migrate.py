@@ -0,0 +1,50 @@
+import pytest
+
+from migrate import MigrationError, discover, split_statements
+
+
+def test_splits_on_semicolons_and_drops_comments():
+    script = """
+        -- create things
+        CREATE TABLE a (id INT); # trailing comment
+        /* block
+           comment; with a semicolon */
+        INSERT INTO a VALUES (1);
+    """
+    assert split_statements(script) == ["CREATE TABLE a (id INT)", "INSERT INTO a VALUES (1)"]
+
+
+def test_semicolons_inside_quotes_do_not_split():
+    script = "INSERT INTO a VALUES ('x;y', \"it\\'s;\"); SELECT `odd;name` FROM a;"
+    assert split_statements(script) == [
+        "INSERT INTO a VALUES ('x;y', \"it\\'s;\")",
+        "SELECT `odd;name` FROM a",
+    ]
+
+
+def test_delimiter_command_keeps_routine_bodies_whole():
+    script = """DELIMITER //
+CREATE TRIGGER t BEFORE INSERT ON a FOR EACH ROW
+BEGIN
+    SET NEW.id = 1;
+END //
+DELIMITER ;
+SELECT 1;
+"""
+    statements = split_statements(script)
+    assert len(statements) == 2
+    assert statements[0].startswith("CREATE TRIGGER t")
+    assert statements[0].endswith("SET NEW.id = 1;\nEND")
+    assert statements[1] == "SELECT 1"
+
+
+def test_discover_orders_versions_and_requires_up_scripts(tmp_path):
+    for name in ("0002_b.up.sql", "0002_b.down.sql", "0001_a.up.sql", "notes.txt"):
+        (tmp_path / name).write_text("SELECT 1;")
+    migrations = discover(str(tmp_path))
+    assert list(migrations) == [1, 2]
+    assert sorted(migrations[2]) == ["down", "name", "up"]
+
+    (tmp_path / "0003_c.down.sql").write_text("SELECT 1;")
+    with pytest.raises(MigrationError):
+        discover(str(tmp_path))
@@ -0,0 +1,44 @@
+from datetime import date
+
+import pytest
+
+from organ_allocation import ABO_DONORS, Waitlist, abo
+
+
+@pytest.mark.parametrize("recipient", ["O", "A", "B", "AB"])
+def test_organ_table_matches_abo_rules(recipient):
+    donors = ABO_DONORS[recipient]
+    assert donors[0] == recipient
+    assert sorted(donors) == sorted(g for g in ("O", "A", "B", "AB")
+                                    if g == "O" or g == recipient or recipient == "AB")
+
+
+def test_abo_ignores_rh_and_case():
+    assert abo("AB+") == "AB"
+    assert abo("o-") == "O"
+    assert abo(None) is None
+
+
+def test_waitlist_offers_organ_to_oldest_compatible_request():
+    waitlist = Waitlist([
+        (1, date(2026, 10, 5), "Kidney", "A+"),
+        (2, date(2026, 10, 1), "Kidney", "AB-"),
+        (3, date(2026, 9, 1), "Liver", "A+"),
+        (4, date(2026, 9, 1), "Kidney", "O+"),   # cannot take an A organ
+    ])
+    assert waitlist.pop_for("Kidney", "A-") == 2
+    assert waitlist.pop_for("Kidney", "A+") == 1
+    assert waitlist.pop_for("Kidney", "A+") is None
+    assert waitlist.pop_for("Kidney", "O-") == 4
+
+
+def test_waitlist_breaks_date_ties_by_request_id():
+    day = date(2026, 10, 1)
+    waitlist = Waitlist([(7, day, "Heart", "B+"), (5, day, "Heart", "B-")])
+    assert [waitlist.pop_for("Heart", "O+") for _ in range(3)] == [5, 7, None]
+
+
+def test_waitlist_matches_organ_types_regardless_of_case_and_spacing():
+    waitlist = Waitlist([(1, date(2026, 10, 1), "Kidney", "A+"), (2, date(2026, 10, 2), " kidney ", "O+")])
+    assert waitlist.pop_for("kidney", "O-") == 1
+    assert waitlist.pop_for("KIDNEY ", "O-") == 2
@@ -0,0 +1,49 @@
+# transactions.py
+# Deadlock / lock-wait retry for write transactions.
+#
+# InnoDB resolves a deadlock by rolling back one of the transactions (errno
+# 1213), and gives up on a row lock after innodb_lock_wait_timeout (1205).
+# Neither means the request was wrong: run the whole transaction again after a
+# short, jittered pause so the competing transactions do not collide in
+# lockstep. Only the transaction body is retried, never a commit that
+# succeeded, so a retry cannot apply a write twice.
+import os
+import random
+import time
+
+from mysql.connector import Error
+
+from metrics import TX_RETRIES
+
+ER_LOCK_WAIT_TIMEOUT = 1205
+ER_LOCK_DEADLOCK = 1213
+RETRYABLE_ERRNOS = (ER_LOCK_WAIT_TIMEOUT, ER_LOCK_DEADLOCK)
+
+TX_MAX_ATTEMPTS = int(os.environ.get("TX_MAX_ATTEMPTS", 4))
+TX_BACKOFF_BASE = float(os.environ.get("TX_BACKOFF_BASE", 0.02))   # seconds
+TX_BACKOFF_MAX = float(os.environ.get("TX_BACKOFF_MAX", 0.5))
+
+
+def backoff(attempt):
+    """Full jitter: uniform in [0, min(max, base * 2^attempt))."""
+    return random.uniform(0, min(TX_BACKOFF_MAX, TX_BACKOFF_BASE * 2 ** attempt))
+
+
+def in_transaction(conn, work, attempts=TX_MAX_ATTEMPTS):
+    """Run work() and commit, retrying deadlocks and lock-wait timeouts.
+
+    work() must do everything the transaction needs (it is called again from
+    scratch on a retry) and should not commit itself. Returns work()'s result.
+    Any other error, or the last retryable one, is raised with the
+    transaction rolled back."""
+    for attempt in range(1, attempts + 1):
+        try:
+            result = work()
+            conn.commit()
+            return result
+        except Error as e:
+            conn.rollback()
+            if e.errno not in RETRYABLE_ERRNOS or attempt == attempts:
+                raise
+            TX_RETRIES.inc((str(e.errno),))
+            time.sleep(backoff(attempt))
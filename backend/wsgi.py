@@ -0,0 +1,5 @@
+# wsgi.py
+# WSGI entry point for production servers: gunicorn wsgi:app, waitress-serve wsgi:app
+from app import app
+
+application = app
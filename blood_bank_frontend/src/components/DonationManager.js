@@ -17,14 +17,13 @@ function DonationManager() {
     // --- 1. FETCH DATA ---
     const fetchData = async () => {
         try {
-            const donationsRes = await axios.get(`${API_URL}/donations`);
-            setDonations(donationsRes.data);
+            // Inventory plus a compact donor list for the dropdown, in one request
+            const { data } = await axios.get(`${API_URL}/pages/donations`);
+            setDonations(data.donations);
+            setDonors(data.donors);
 
-            const donorsRes = await axios.get(`${API_URL}/donors`);
-            setDonors(donorsRes.data);
-            
-            if (donorsRes.data.length > 0 && !formData.donor_id) {
-                setFormData(prev => ({ ...prev, donor_id: donorsRes.data[0].donor_id }));
+            if (data.donors.length > 0 && !formData.donor_id) {
+                setFormData(prev => ({ ...prev, donor_id: data.donors[0].donor_id }));
             }
         } catch (error) {
             console.error('Error fetching data:', error);
@@ -93,14 +93,13 @@ function DonorManager() {
     // --- 1. FETCH DATA (READ) ---
     const fetchData = async () => {
         try {
-            const donorsResponse = await axios.get(`${API_URL}/donors`);
-            setDonors(donorsResponse.data);
+            // One round trip for the table and the admin dropdown
+            const { data } = await axios.get(`${API_URL}/pages/donors`);
+            setDonors(data.donors);
+            setAdmins(data.admins);
 
-            const adminsResponse = await axios.get(`${API_URL}/admins`);
-            setAdmins(adminsResponse.data);
-            
-            if (adminsResponse.data.length > 0 && !initialFormState.admin_code) {
-                initialFormState.admin_code = adminsResponse.data[0].admin_code;
+            if (data.admins.length > 0 && !initialFormState.admin_code) {
+                initialFormState.admin_code = data.admins[0].admin_code;
             }
         } catch (error) {
             console.error('Error fetching data:', error);
@@ -16,14 +16,13 @@ function OrganManager() {
     // --- 1. FETCH DATA ---
     const fetchData = async () => {
         try {
-            const organsRes = await axios.get(`${API_URL}/organs`);
-            setOrgans(organsRes.data);
+            // Inventory plus a compact donor list for the dropdown, in one request
+            const { data } = await axios.get(`${API_URL}/pages/organs`);
+            setOrgans(data.organs);
+            setDonors(data.donors);
 
-            const donorsRes = await axios.get(`${API_URL}/donors`);
-            setDonors(donorsRes.data);
-            
-            if (donorsRes.data.length > 0 && !formData.donor_id) {
-                setFormData(prev => ({ ...prev, donor_id: donorsRes.data[0].donor_id }));
+            if (data.donors.length > 0 && !formData.donor_id) {
+                setFormData(prev => ({ ...prev, donor_id: data.donors[0].donor_id }));
             }
         } catch (error) {
             console.error('Error fetching data:', error);
@@ -93,15 +93,13 @@ function RecipientManager() {
     // --- 1. FETCH DATA (READ) ---
     const fetchData = async () => {
         try {
-            const recipientsResponse = await axios.get(`${API_URL}/recipients`);
-            setRecipients(recipientsResponse.data);
+            // One round trip for the table and the admin dropdown
+            const { data } = await axios.get(`${API_URL}/pages/recipients`);
+            setRecipients(data.recipients);
+            setAdmins(data.admins);
 
-            const adminsResponse = await axios.get(`${API_URL}/admins`);
-            setAdmins(adminsResponse.data);
-            
-            // --- THIS IS THE CORRECTED LINE ---
-            if (adminsResponse.data.length > 0 && !initialFormState.admin_code) {
-                initialFormState.admin_code = adminsResponse.data[0].admin_code;
+            if (data.admins.length > 0 && !initialFormState.admin_code) {
+                initialFormState.admin_code = data.admins[0].admin_code;
             }
         } catch (error) {
             console.error('Error fetching data:', error);
@@ -13,6 +13,7 @@ function RequestManager() {
     const [isModalOpen, setIsModalOpen] = useState(false);
     const [currentRequest, setCurrentRequest] = useState(null);
     const [availableItems, setAvailableItems] = useState([]);
+    const [available, setAvailable] = useState({ Blood: [], Organ: [] });
     const [selectedItemId, setSelectedItemId] = useState('');
 
     const [formData, setFormData] = useState({
@@ -25,20 +26,18 @@ function RequestManager() {
     // read
     const fetchData = async () => {
         try {
-            const reqRes = await axios.get(`${API_URL}/requests`);
-            setRequests(reqRes.data);
+            // Requests, both dropdowns and the fulfillment options in one request
+            const { data } = await axios.get(`${API_URL}/pages/requests`);
+            setRequests(data.requests);
+            setRecipients(data.recipients);
+            setHospitals(data.hospitals);
+            setAvailable({ Blood: data.available_donations, Organ: data.available_organs });
 
-            const recRes = await axios.get(`${API_URL}/recipients`);
-            setRecipients(recRes.data);
-
-            const hosRes = await axios.get(`${API_URL}/hospitals`);
-            setHospitals(hosRes.data);
-
-            if (recRes.data.length > 0 && !formData.recipient_id) {
-                setFormData(prev => ({ ...prev, recipient_id: recRes.data[0].recipient_id }));
+            if (data.recipients.length > 0 && !formData.recipient_id) {
+                setFormData(prev => ({ ...prev, recipient_id: data.recipients[0].recipient_id }));
             }
-            if (hosRes.data.length > 0 && !formData.hospital_id) {
-                setFormData(prev => ({ ...prev, hospital_id: hosRes.data[0].hospital_id }));
+            if (data.hospitals.length > 0 && !formData.hospital_id) {
+                setFormData(prev => ({ ...prev, hospital_id: data.hospitals[0].hospital_id }));
             }
         } catch (error) {
             console.error('Error fetching data:', error);
@@ -82,23 +81,13 @@ function RequestManager() {
     };
 
     // fullfillment modal logic
-    const handleOpenModal = async (request) => {
+    // Options come with the page bundle and are refreshed after every fulfillment;
+    // the server still rejects an item someone else took in the meantime.
+    const handleOpenModal = (request) => {
         setCurrentRequest(request);
         setIsModalOpen(true);
         setSelectedItemId('');
-        setAvailableItems([]);
-
-        try {
-            if (request.request_type === 'Blood') {
-                const response = await axios.get(`${API_URL}/donations/available`);
-                setAvailableItems(response.data);
-            } else if (request.request_type === 'Organ') {
-                const response = await axios.get(`${API_URL}/organs/available`);
-                setAvailableItems(response.data);
-            }
-        } catch (error) {
-            console.error('Error fetching available items:', error);
-        }
+        setAvailableItems(available[request.request_type] || []);
     };
 
     const handleCloseModal = () => {